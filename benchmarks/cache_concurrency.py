@@ -0,0 +1,125 @@
+"""Сравнение бэкендов кэша под нагрузкой из нескольких процессов.
+
+Каждый процесс выполняет смесь операций, похожую на работу сайта:
+чтения (``get``/``get_many``), записи и ``incr`` общего счётчика, как у
+поколений лент. В конце печатаются пропускная способность и две проверки
+согласованности: сколько увеличений счётчика дошло до родительского
+процесса и видит ли он записи, сделанные воркерами.
+
+Запуск из корня репозитория::
+
+    python benchmarks/cache_concurrency.py --processes 4 --ops 5000
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'yatube'))
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+settings.configure()
+django.setup()
+
+from django.core.cache.backends.filebased import FileBasedCache  # noqa
+from django.core.cache.backends.locmem import LocMemCache  # noqa: E402
+
+from yatube.cache import SQLiteCache  # noqa: E402
+
+COUNTER = 'generation'
+PARAMS = {'OPTIONS': {'MAX_ENTRIES': 100000}}
+
+
+def make_cache(name, directory):
+    if name == 'locmem':
+        return LocMemCache('benchmark', PARAMS)
+    if name == 'filebased':
+        return FileBasedCache(os.path.join(directory, 'files'), PARAMS)
+    return SQLiteCache(os.path.join(directory, 'cache.sqlite3'), PARAMS)
+
+
+def worker(args):
+    name, directory, worker_id, ops, keys, value_size = args
+    cache = make_cache(name, directory)
+    rng = random.Random(worker_id)
+    value = 'x' * value_size
+    increments = 0
+    started = time.perf_counter()
+    for i in range(ops):
+        roll = rng.random()
+        key = f'post_card:{rng.randrange(keys)}'
+        if roll < 0.6:
+            cache.get(key)
+        elif roll < 0.8:
+            cache.get_many([f'post_card:{rng.randrange(keys)}'
+                            for _ in range(10)])
+        elif roll < 0.95:
+            cache.set(key, value)
+        else:
+            try:
+                cache.incr(COUNTER)
+            except ValueError:
+                cache.add(COUNTER, 0)
+                cache.incr(COUNTER)
+            increments += 1
+    cache.set(f'worker:{worker_id}', 'done')
+    return time.perf_counter() - started, increments
+
+
+def run(name, processes, ops, keys, value_size):
+    directory = tempfile.mkdtemp()
+    try:
+        cache = make_cache(name, directory)
+        cache.set(COUNTER, 0)
+        started = time.perf_counter()
+        with Pool(processes) as pool:
+            results = pool.map(worker, [
+                (name, directory, worker_id, ops, keys, value_size)
+                for worker_id in range(processes)
+            ])
+        elapsed = time.perf_counter() - started
+        expected = sum(increments for _, increments in results)
+        counted = cache.get(COUNTER, 0)
+        visible = len(cache.get_many(
+            [f'worker:{worker_id}' for worker_id in range(processes)]
+        ))
+        return {
+            'backend': name,
+            'ops_per_sec': processes * ops / elapsed,
+            'increments': f'{counted}/{expected}',
+            'visible': f'{visible}/{processes}',
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--ops', type=int, default=2000,
+                        help='Операций на процесс.')
+    parser.add_argument('--keys', type=int, default=1000)
+    parser.add_argument('--value-size', type=int, default=2000,
+                        help='Размер значения в байтах (как у карточки).')
+    parser.add_argument('--backends', nargs='+',
+                        default=['locmem', 'filebased', 'sqlite'],
+                        choices=['locmem', 'filebased', 'sqlite'])
+    options = parser.parse_args()
+
+    print(f'{"бэкенд":<10} {"оп/с":>10} {"incr дошло":>14} '
+          f'{"видно записей":>14}')
+    for name in options.backends:
+        row = run(name, options.processes, options.ops, options.keys,
+                  options.value_size)
+        print(f'{row["backend"]:<10} {row["ops_per_sec"]:>10.0f} '
+              f'{row["increments"]:>14} {row["visible"]:>14}')
+
+
+if __name__ == '__main__':
+    main()
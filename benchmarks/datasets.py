@@ -0,0 +1,136 @@
+"""Генераторы наборов данных для бенчмарков страниц.
+
+Набор задаётся масштабом из ``SCALES`` и строится детерминированно:
+одинаковые масштаб и зерно дают одинаковую базу. Имена, по которым
+бенчмарк находит «интересные» объекты, фиксированы:
+
+* ``user0`` — популярный автор с ``followers`` подписчиками и заметной
+  долей всех постов;
+* ``user1`` — читатель, подписанный на ``user0`` и ещё на ``following``
+  авторов; его лента подписок собирается сразу;
+* ``group0`` — самая большая группа;
+* последний пост ``user0`` — пост с ``comments`` комментариями.
+
+Записи вставляются через ``bulk_create`` пачками, поэтому сигналы не
+срабатывают: ленты подписок собираются только для ``user1``, а счётчики
+профилей посчитаются лениво при первом чтении. Полнотекстовый индекс
+заполняют триггеры SQLite.
+"""
+import random
+
+BATCH_SIZE = 5000
+
+SCALES = {
+    'tiny': {'users': 200, 'posts': 2000, 'groups': 5,
+             'followers': 100, 'following': 10, 'comments': 20},
+    'small': {'users': 2000, 'posts': 20000, 'groups': 20,
+              'followers': 1000, 'following': 20, 'comments': 100},
+    'medium': {'users': 20000, 'posts': 200000, 'groups': 50,
+               'followers': 10000, 'following': 50, 'comments': 300},
+    'large': {'users': 100000, 'posts': 1000000, 'groups': 100,
+              'followers': 50000, 'following': 100, 'comments': 1000},
+}
+
+# Доля постов популярного автора и самой большой группы.
+CELEBRITY_SHARE = 0.05
+TOP_GROUP_SHARE = 0.2
+WORDS = ('кот', 'пёс', 'город', 'лес', 'утро', 'дорога', 'книга', 'море',
+         'снег', 'чай', 'письмо', 'поезд', 'окно', 'сад', 'ветер', 'дом')
+
+
+def _batches(objects):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) == BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _text(rng):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 40)))
+
+
+def _seed_users(config):
+    from django.contrib.auth import get_user_model
+
+    User = get_user_model()
+    for batch in _batches(
+        User(username=f'user{i}') for i in range(config['users'])
+    ):
+        User.objects.bulk_create(batch)
+    return list(User.objects.order_by('pk').values_list('pk', flat=True))
+
+
+def _seed_groups(config):
+    from posts.models import Group
+
+    Group.objects.bulk_create([
+        Group(title=f'Группа {i}', slug=f'group{i}',
+              description='Сгенерировано для бенчмарка')
+        for i in range(config['groups'])
+    ])
+    return list(Group.objects.order_by('pk').values_list('pk', flat=True))
+
+
+def _posts(config, rng, user_ids, group_ids):
+    from posts.models import Post
+
+    for _ in range(config['posts']):
+        author = user_ids[0]
+        if rng.random() >= CELEBRITY_SHARE:
+            author = rng.choice(user_ids)
+        group = None
+        roll = rng.random()
+        if roll < TOP_GROUP_SHARE:
+            group = group_ids[0]
+        elif roll < 0.6:
+            group = rng.choice(group_ids)
+        yield Post(text=_text(rng), author_id=author, group_id=group)
+
+
+def _follows(config, rng, user_ids):
+    from posts.models import Follow
+
+    for user_id in user_ids[1:config['followers'] + 1]:
+        yield Follow(user_id=user_id, author_id=user_ids[0])
+    for author_id in rng.sample(user_ids[2:], config['following']):
+        yield Follow(user_id=user_ids[1], author_id=author_id)
+
+
+def seed(scale, random_seed=0, stdout=None):
+    """Заполняет пустую базу набором данных масштаба ``scale``."""
+    from django.db import transaction
+
+    from posts import timeline
+    from posts.models import Comment, Follow, Post
+
+    config = SCALES[scale]
+    rng = random.Random(random_seed)
+
+    def log(message):
+        if stdout is not None:
+            stdout.write(f'{message}\n')
+
+    with transaction.atomic():
+        user_ids = _seed_users(config)
+        log(f'пользователей: {len(user_ids)}')
+        group_ids = _seed_groups(config)
+        for batch in _batches(_posts(config, rng, user_ids, group_ids)):
+            Post.objects.bulk_create(batch)
+        log(f'постов: {config["posts"]}')
+        for batch in _batches(_follows(config, rng, user_ids)):
+            Follow.objects.bulk_create(batch, ignore_conflicts=True)
+        log(f'подписок: {config["followers"] + config["following"]}')
+        post = Post.objects.filter(author_id=user_ids[0]).latest(
+            'pub_date', 'id')
+        Comment.objects.bulk_create([
+            Comment(post=post, author_id=rng.choice(user_ids),
+                    text=_text(rng))
+            for _ in range(config['comments'])
+        ])
+
+    timeline.rebuild(user_ids[1])
+    log('лента подписок user1 собрана')
@@ -0,0 +1,236 @@
+"""Бенчмарк страниц лент на сгенерированных наборах данных.
+
+Для каждой страницы (``index``, ``group_posts``, ``profile``,
+``post_view``, ``follow_index``) и глубины листания — первая страница,
+страница по номеру и страницы по курсору далеко от начала — меряются
+перцентили времени ответа, число SQL-запросов и пиковая память
+(tracemalloc, отдельным запросом). По умолчанию перед каждым запросом
+кэш очищается, то есть меряется холодный рендер; ``--warm`` оставляет
+кэш между запросами.
+
+База для масштаба создаётся один раз в ``benchmarks/data/`` и потом
+переиспользуется. Результаты можно сохранить как базовые и сравнивать
+с ними следующие прогоны: рост числа запросов или выход медианы и памяти
+за допуск считается регрессией, и скрипт завершается с кодом 1.
+
+Примеры запуска из корня репозитория::
+
+    python benchmarks/view_benchmark.py --scale small \\
+        --save-baseline benchmarks/baselines/small.json
+    python benchmarks/view_benchmark.py --scale small \\
+        --baseline benchmarks/baselines/small.json
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, '..', 'yatube'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+import datasets  # noqa: E402
+
+DATA_DIR = os.path.join(ROOT, 'data')
+PAGE_DEPTHS = (10, 100, 1000)
+
+
+def setup(scale, random_seed):
+    """Подключает проект к базе набора данных; при нужде создаёт её."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    name = f'{scale}-{random_seed}'
+    path = os.path.join(DATA_DIR, f'{name}.sqlite3')
+    settings.DATABASES['default']['NAME'] = path
+    settings.CACHES['default']['LOCATION'] = os.path.join(
+        DATA_DIR, f'{name}-cache.sqlite3'
+    )
+    settings.DEBUG = False
+    django.setup()
+    return path
+
+
+def prepare_database(path, scale, random_seed, reseed):
+    from django.core.management import call_command
+    from django.db import connection
+
+    if reseed and os.path.exists(path):
+        connection.close()
+        os.remove(path)
+    if os.path.exists(path):
+        return
+    call_command('migrate', verbosity=0)
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode = WAL')
+    started = time.perf_counter()
+    datasets.seed(scale, random_seed, stdout=sys.stdout)
+    print(f'набор {scale} создан за {time.perf_counter() - started:.1f} с')
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    rank = max(0, math.ceil(percent / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def cursor_token(rows, offset):
+    """Курсор, с которого начинается страница после ``offset`` записей."""
+    from posts.paginators import encode_cursor
+
+    row = rows[offset - 1:offset]
+    return encode_cursor(list(row[0])) if row else None
+
+
+def scenarios():
+    """Пары «имя, URL» для всех страниц и глубин листания."""
+    from django.contrib.auth import get_user_model
+    from django.urls import reverse
+
+    from posts.models import Post, TimelineEntry
+
+    User = get_user_model()
+    per_page = settings.POSTS_PER_PAGE
+    celebrity = User.objects.get(username='user0')
+    post = Post.objects.filter(author=celebrity).latest('pub_date', 'id')
+    feeds = {
+        'index': (reverse('index'), Post.objects.all()),
+        'group_posts': (reverse('group_name', args=['group0']),
+                        Post.objects.filter(group__slug='group0')),
+        'profile': (reverse('profile', args=['user0']),
+                    Post.objects.filter(author=celebrity)),
+        'follow_index': (
+            reverse('follow_index'),
+            TimelineEntry.objects.filter(user__username='user1'),
+        ),
+    }
+    for view, (url, queryset) in feeds.items():
+        field = 'post_id' if view == 'follow_index' else 'id'
+        rows = queryset.order_by('-pub_date', f'-{field}').values_list(
+            'pub_date', field)
+        yield view, 'page=1', url
+        yield view, 'page=5', f'{url}?page=5'
+        for depth in PAGE_DEPTHS:
+            token = cursor_token(rows, depth * per_page)
+            if token is not None:
+                yield view, f'after={depth}', f'{url}?after={token}'
+    yield 'post_view', 'post', reverse('post', args=['user0', post.pk])
+
+
+def measure(client, url, iterations, warm):
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from posts import objects
+
+    def clear():
+        cache.clear()
+        objects.local.clear()
+
+    client.get(url)
+    timings, queries = [], 0
+    for _ in range(iterations):
+        if not warm:
+            clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f'{url}: ответ {response.status_code}')
+        queries = max(queries, len(captured))
+    if not warm:
+        clear()
+    tracemalloc.start()
+    client.get(url)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'p50_ms': round(percentile(timings, 50), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'p99_ms': round(percentile(timings, 99), 2),
+        'queries': queries,
+        'peak_kb': round(peak / 1024),
+    }
+
+
+def run(iterations, warm):
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+
+    client = Client()
+    client.force_login(get_user_model().objects.get(username='user1'))
+    results = {}
+    for view, depth, url in scenarios():
+        key = f'{view} {depth}'
+        results[key] = measure(client, url, iterations, warm)
+        row = results[key]
+        print(f'{key:<26} {row["p50_ms"]:>8.1f} {row["p95_ms"]:>8.1f} '
+              f'{row["p99_ms"]:>8.1f} {row["queries"]:>8} '
+              f'{row["peak_kb"]:>9}')
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Список регрессий относительно базовых результатов."""
+    regressions = []
+    for key, row in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if row['queries'] > base['queries']:
+            regressions.append(
+                f'{key}: запросов {base["queries"]} -> {row["queries"]}')
+        for metric in ('p50_ms', 'peak_kb'):
+            if row[metric] > base[metric] * (1 + tolerance):
+                regressions.append(
+                    f'{key}: {metric} {base[metric]} -> {row[metric]}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=datasets.SCALES, default='tiny')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--reseed', action='store_true',
+                        help='Пересоздать базу набора данных.')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--warm', action='store_true',
+                        help='Не очищать кэш между запросами.')
+    parser.add_argument('--baseline', help='JSON с базовыми результатами.')
+    parser.add_argument('--save-baseline',
+                        help='Куда сохранить результаты как базовые.')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='Допустимый рост медианы и памяти (доля).')
+    options = parser.parse_args()
+
+    path = setup(options.scale, options.seed)
+    prepare_database(path, options.scale, options.seed, options.reseed)
+
+    print(f'{"страница":<26} {"p50 мс":>8} {"p95 мс":>8} {"p99 мс":>8} '
+          f'{"запросы":>8} {"пик КБ":>9}')
+    results = run(options.iterations, options.warm)
+
+    if options.save_baseline:
+        os.makedirs(os.path.dirname(options.save_baseline) or '.',
+                    exist_ok=True)
+        with open(options.save_baseline, 'w') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2,
+                      sort_keys=True)
+    if options.baseline:
+        with open(options.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, options.tolerance)
+        for regression in regressions:
+            print(f'РЕГРЕССИЯ {regression}')
+        if regressions:
+            sys.exit(1)
+        print('регрессий нет')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""Чтение и запись из нескольких потоков: SQLite с профилем и без него.
+
+Каждый поток — залогиненный клиент, который в цикле открывает страницы
+(лента, пост) и с вероятностью ``--write-ratio`` пишет: комментарий или
+новый пост. Перед запросом и после него соединения закрываются так же,
+как в обычном цикле запроса Django (``close_old_connections``), поэтому
+``CONN_MAX_AGE`` профиля влияет на результат.
+
+Каждый профиль запускается в отдельном процессе на свежей базе во
+временной папке:
+
+* ``default`` — настройки SQLite Django по умолчанию;
+* ``production`` — ``SQLITE_PRODUCTION = True`` (``yatube.sqlite``) и
+  постоянные соединения.
+
+Печатаются пропускная способность чтений и записей, p95 времени записи
+и число ошибок «database is locked».
+
+Запуск из корня репозитория::
+
+    python benchmarks/write_contention.py --threads 8 --duration 10
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PROFILES = ('default', 'production')
+
+
+def percentile(values, percent):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(len(values) * percent / 100))
+    return values[index]
+
+
+def setup(profile, directory):
+    sys.path.insert(0, os.path.join(ROOT, '..', 'yatube'))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    import django
+    from django.conf import settings
+
+    database = settings.DATABASES['default']
+    database['NAME'] = os.path.join(directory, 'db.sqlite3')
+    settings.CACHES['default']['LOCATION'] = os.path.join(
+        directory, 'cache.sqlite3'
+    )
+    settings.DEBUG = False
+    settings.POSTS_THUMBNAILS_ASYNC = False
+    settings.SQLITE_PRODUCTION = profile == 'production'
+    if settings.SQLITE_PRODUCTION:
+        database['CONN_MAX_AGE'] = 60
+    django.setup()
+
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+
+def client_loop(user, post, deadline, write_ratio, seed, stats, lock):
+    from django.db import close_old_connections, connection
+    from django.test import Client
+    from django.urls import reverse
+
+    from yatube.sqlite import is_locked
+
+    rng = random.Random(seed)
+    client = Client()
+    client.force_login(user)
+    read_urls = [reverse('index'),
+                 reverse('post', args=[post.author.username, post.pk])]
+    comment_url = reverse('add_comment',
+                          args=[post.author.username, post.pk])
+    reads = writes = errors = 0
+    write_times = []
+    while time.monotonic() < deadline:
+        write = rng.random() < write_ratio
+        close_old_connections()
+        started = time.perf_counter()
+        try:
+            if not write:
+                client.get(rng.choice(read_urls))
+            elif rng.random() < 0.5:
+                client.post(comment_url, {'text': 'Комментарий'})
+            else:
+                client.post(reverse('new_post'), {'text': 'Новый пост'})
+        except Exception as error:
+            if not is_locked(error):
+                raise
+            errors += 1
+            continue
+        finally:
+            close_old_connections()
+        if write:
+            writes += 1
+            write_times.append(time.perf_counter() - started)
+        else:
+            reads += 1
+    connection.close()
+    with lock:
+        stats['reads'] += reads
+        stats['writes'] += writes
+        stats['errors'] += errors
+        stats['write_times'] += write_times
+
+
+def run(args):
+    profile, threads, duration, write_ratio = args
+    directory = tempfile.mkdtemp()
+    try:
+        setup(profile, directory)
+        from django.contrib.auth import get_user_model
+        from django.db import connections
+
+        from posts.models import Post
+
+        User = get_user_model()
+        users = [User.objects.create(username=f'user{i}')
+                 for i in range(threads)]
+        post = Post.objects.create(text='Пост', author=users[0])
+        connections.close_all()
+
+        stats = {'reads': 0, 'writes': 0, 'errors': 0, 'write_times': []}
+        lock = threading.Lock()
+        deadline = time.monotonic() + duration
+        workers = [
+            threading.Thread(target=client_loop, args=(
+                user, post, deadline, write_ratio, i, stats, lock
+            ))
+            for i, user in enumerate(users)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return {
+            'profile': profile,
+            'reads_per_sec': stats['reads'] / duration,
+            'writes_per_sec': stats['writes'] / duration,
+            'write_p95_ms': percentile(stats['write_times'], 95) * 1000,
+            'errors': stats['errors'],
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10,
+                        help='Сколько секунд гонять каждый профиль.')
+    parser.add_argument('--write-ratio', type=float, default=0.3,
+                        help='Доля запросов на запись.')
+    parser.add_argument('--profiles', nargs='+', default=list(PROFILES),
+                        choices=PROFILES)
+    options = parser.parse_args()
+
+    print(f'{"профиль":<11} {"чтений/с":>9} {"записей/с":>10} '
+          f'{"p95 записи мс":>14} {"ошибок":>7}')
+    # Каждый профиль — в чистом процессе: настройки читаются при старте.
+    context = multiprocessing.get_context('spawn')
+    for profile in options.profiles:
+        with context.Pool(1) as pool:
+            row = pool.apply(run, [(profile, options.threads,
+                                    options.duration, options.write_ratio)])
+        print(f'{row["profile"]:<11} {row["reads_per_sec"]:>9.0f} '
+              f'{row["writes_per_sec"]:>10.0f} {row["write_p95_ms"]:>14.1f} '
+              f'{row["errors"]:>7}')
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,8 @@ import sys
 import os
 from subprocess import Popen, PIPE
 
+import pytest
+
 
 root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(root_dir)
@@ -37,3 +39,10 @@ pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(autouse=True)
+def sync_thumbnails(settings):
+    # Воркер очереди в тестах не запущен: миниатюры строятся сразу, пока
+    # фикстура mock_media держит временную папку.
+    settings.POSTS_THUMBNAILS_ASYNC = False
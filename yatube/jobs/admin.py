@@ -0,0 +1,31 @@
+from django.contrib import admin, messages
+from django.db import IntegrityError
+from django.utils import timezone
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'run_at', 'locked_by',
+                    'created')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'key')
+    empty_value_display = '-пусто-'
+    actions = ('retry',)
+
+    def retry(self, request, queryset):
+        try:
+            count = queryset.exclude(status=Job.RUNNING).update(
+                status=Job.QUEUED, attempts=0, run_at=timezone.now()
+            )
+        except IntegrityError:
+            self.message_user(
+                request, 'Задача с таким ключом уже ждёт в очереди.',
+                messages.ERROR
+            )
+            return
+        self.message_user(request, f'Поставлено в очередь: {count}')
+    retry.short_description = 'Повторить выбранные задачи'
+
+
+admin.site.register(Job, JobAdmin)
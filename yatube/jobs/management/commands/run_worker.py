@@ -0,0 +1,101 @@
+import logging
+import multiprocessing
+import time
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs import pool, queue
+
+logger = logging.getLogger(__name__)
+
+# Как часто, в секундах, возвращать в очередь задачи умерших воркеров
+STALE_CHECK_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = 'Выполняет задачи из очереди в пуле потоков или процессов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.JOBS_WORKERS,
+            help='Сколько задач выполнять одновременно.'
+        )
+        parser.add_argument(
+            '--processes', action='store_true',
+            help='Выполнять задачи в процессах, а не в потоках.'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float,
+            default=settings.JOBS_POLL_INTERVAL,
+            help='Пауза в секундах, когда очередь пуста.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выйти, когда готовые задачи закончатся.'
+        )
+
+    def make_executor(self, workers, processes):
+        if processes:
+            # Процессы запускаются через spawn и открывают свои
+            # соединения: унаследованные после fork делить нельзя.
+            return ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=pool.setup_process,
+            )
+        return ThreadPoolExecutor(max_workers=workers,
+                                  thread_name_prefix='jobs')
+
+    @staticmethod
+    def succeeded(future):
+        try:
+            return future.result()
+        except Exception:
+            # Задача останется взятой и вернётся в очередь через
+            # JOBS_LOCK_TIMEOUT; воркер продолжает работу.
+            logger.exception('Сбой при выполнении задачи')
+            return False
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        worker = queue.worker_name()
+        executor = self.make_executor(workers, options['processes'])
+        self.stdout.write(f'Воркер {worker}: {workers} исполнителей')
+        done = failed = 0
+        running = set()
+        released = float('-inf')
+        try:
+            while True:
+                if time.monotonic() - released > STALE_CHECK_INTERVAL:
+                    queue.release_stale()
+                    released = time.monotonic()
+                ids = []
+                if len(running) < workers:
+                    ids = queue.claim(worker, workers - len(running))
+                running |= {executor.submit(pool.execute,
+                                            job_id, worker)
+                            for job_id in ids}
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                finished, running = wait(
+                    running, timeout=options['poll_interval'],
+                    return_when=FIRST_COMPLETED,
+                )
+                for future in finished:
+                    if self.succeeded(future):
+                        done += 1
+                    else:
+                        failed += 1
+        except KeyboardInterrupt:
+            self.stdout.write('Остановка: ждём начатые задачи')
+        finally:
+            executor.shutdown(wait=True)
+            connections.close_all()
+        self.stdout.write(f'Выполнено задач: {done}, с ошибкой: {failed}')
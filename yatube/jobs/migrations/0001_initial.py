@@ -0,0 +1,40 @@
+# Generated by Django 2.2.28 on 2026-10-18 05:11
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='задача')),
+                ('payload', models.TextField(default='{}', verbose_name='аргументы')),
+                ('key', models.CharField(blank=True, max_length=200, null=True, verbose_name='ключ')),
+                ('status', models.CharField(choices=[('queued', 'В очереди'), ('running', 'Выполняется'), ('dead', 'Не выполнена')], default='queued', max_length=10, verbose_name='статус')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='попытки')),
+                ('max_attempts', models.PositiveIntegerField(verbose_name='предел попыток')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='запустить после')),
+                ('locked_by', models.CharField(blank=True, max_length=100, verbose_name='воркер')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='взята')),
+                ('last_error', models.TextField(blank=True, verbose_name='последняя ошибка')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='создана')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='job',
+            constraint=models.UniqueConstraint(condition=models.Q(status='queued'), fields=('key',), name='job_queued_key_unique'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Класс Job — фоновая задача в очереди, хранящейся в базе."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DEAD = 'dead'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DEAD, 'Не выполнена'),
+    )
+
+    name = models.CharField('задача', max_length=200)
+    payload = models.TextField('аргументы', default='{}')
+    key = models.CharField('ключ', max_length=200, blank=True, null=True)
+    status = models.CharField('статус', max_length=10, choices=STATUSES,
+                              default=QUEUED)
+    attempts = models.PositiveIntegerField('попытки', default=0)
+    max_attempts = models.PositiveIntegerField('предел попыток')
+    run_at = models.DateTimeField('запустить после', default=timezone.now)
+    locked_by = models.CharField('воркер', max_length=100, blank=True)
+    locked_at = models.DateTimeField('взята', blank=True, null=True)
+    last_error = models.TextField('последняя ошибка', blank=True)
+    created = models.DateTimeField('создана', auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'],
+                         name='job_status_run_at_idx'),
+        ]
+        constraints = [
+            # Одинаковая задача с ключом ждёт в очереди не больше одного раза.
+            models.UniqueConstraint(
+                fields=['key'], condition=Q(status='queued'),
+                name='job_queued_key_unique'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
@@ -0,0 +1,20 @@
+"""Точки входа для потоков и процессов пула ``run_worker``.
+
+Модуль не импортирует Django на верхнем уровне: процесс, запущенный
+через spawn, загружает его до ``django.setup()``.
+"""
+
+
+def setup_process():
+    import django
+    django.setup()
+
+
+def execute(job_id, worker):
+    from django.db import close_old_connections
+
+    from .queue import execute
+    try:
+        return execute(job_id, worker)
+    finally:
+        close_old_connections()
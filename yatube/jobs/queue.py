@@ -0,0 +1,216 @@
+"""Очередь фоновых задач в основной базе.
+
+Задача — функция, помеченная ``@task`` в модуле ``tasks.py`` приложения
+(``JobsConfig`` импортирует их при старте). Представление ставит её в
+очередь одним вызовом и сразу отвечает::
+
+    enqueue(generate_thumbnail, post.pk, key=f'thumbnail:{post.pk}')
+
+Аргументы сериализуются в JSON. Строка ``Job`` пишется в текущую
+транзакцию, поэтому воркер увидит задачу не раньше данных, которые она
+обрабатывает. ``key`` не даёт поставить вторую такую же задачу, пока
+первая ждёт в очереди.
+
+Воркер (команда ``run_worker``) забирает задачи так, чтобы одну задачу
+не взяли двое:
+
+* на PostgreSQL и других базах с ``SKIP LOCKED`` — ``SELECT ... FOR
+  UPDATE SKIP LOCKED`` в транзакции;
+* на SQLite — «сравнение с обменом»: ``UPDATE ... WHERE status='queued'``
+  для каждой кандидатки, задача достаётся тому, чей UPDATE изменил строку.
+
+Успешная задача удаляется. Упавшая возвращается в очередь с
+экспоненциальной задержкой (``JOBS_RETRY_DELAY`` · 2ⁿ со случайным
+разбросом, не больше ``JOBS_RETRY_MAX_DELAY``), а после
+``max_attempts`` попыток остаётся в статусе ``dead`` для разбора в
+админке. Задачи воркера, который умер, не закончив их, через
+``JOBS_LOCK_TIMEOUT`` снова становятся доступны. Поэтому задачи должны
+быть идемпотентны: одна и та же задача может выполниться дважды. Если
+задачу с ключом, которую нужно вернуть в очередь, там уже ждёт такая же
+(её поставили, пока эта выполнялась), повтор не нужен, и задача
+удаляется.
+"""
+import json
+import logging
+import os
+import random
+import socket
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+class UnknownTask(Exception):
+    pass
+
+
+def task(func):
+    """Регистрирует функцию как задачу очереди."""
+    func.job_name = f'{func.__module__}.{func.__name__}'
+    registry[func.job_name] = func
+    return func
+
+
+def enqueue(func, *args, key=None, delay=None, max_attempts=None,
+            **kwargs):
+    """Ставит задачу в очередь и возвращает ``Job``.
+
+    Если задача с тем же ``key`` уже ждёт в очереди, новая не ставится
+    и возвращается None. ``delay`` — через сколько секунд задачу можно
+    брать.
+    """
+    name = getattr(func, 'job_name', func)
+    if name not in registry:
+        raise UnknownTask(name)
+    run_at = timezone.now()
+    if delay:
+        run_at += timedelta(seconds=delay)
+    job = Job(
+        name=name, key=key, run_at=run_at,
+        payload=json.dumps({'args': args, 'kwargs': kwargs}),
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    )
+    if key is None:
+        job.save()
+        return job
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        return None
+    return job
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def backoff(attempts):
+    """Задержка перед попыткой ``attempts + 1``, в секундах."""
+    delay = min(settings.JOBS_RETRY_DELAY * 2 ** (attempts - 1),
+                settings.JOBS_RETRY_MAX_DELAY)
+    return delay * random.uniform(0.5, 1)
+
+
+def _ready():
+    return Job.objects.filter(
+        status=Job.QUEUED, run_at__lte=timezone.now()
+    ).order_by('run_at', 'id')
+
+
+def _lock(worker):
+    return {'status': Job.RUNNING, 'locked_by': worker,
+            'locked_at': timezone.now(), 'attempts': F('attempts') + 1}
+
+
+def claim(worker, limit):
+    """Забирает до ``limit`` готовых задач для воркера ``worker``."""
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(_ready().select_for_update(
+                skip_locked=True
+            ).values_list('pk', flat=True)[:limit])
+            Job.objects.filter(pk__in=ids).update(**_lock(worker))
+    else:
+        ids = []
+        # Кандидаток берём с запасом: часть из них заберут другие воркеры.
+        for pk in _ready().values_list('pk', flat=True)[:limit * 2]:
+            claimed = Job.objects.filter(
+                pk=pk, status=Job.QUEUED
+            ).update(**_lock(worker))
+            if claimed:
+                ids.append(pk)
+                if len(ids) == limit:
+                    break
+    return ids
+
+
+def _requeue(jobs, **changes):
+    """Возвращает задачу в очередь; возвращает число изменённых строк.
+
+    Если такая же задача с ключом уже ждёт в очереди, эта удаляется.
+    """
+    try:
+        with transaction.atomic():
+            return jobs.update(status=Job.QUEUED, locked_by='', **changes)
+    except IntegrityError:
+        logger.warning('Задача %s уже ждёт в очереди, повтор не нужен',
+                       list(jobs.values_list('key', flat=True)))
+        return jobs.delete()[0]
+
+
+def release_stale():
+    """Возвращает в очередь задачи воркеров, переставших отвечать."""
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        locked_at__lt=timezone.now() - timedelta(
+            seconds=settings.JOBS_LOCK_TIMEOUT
+        ),
+    )
+    error = 'Воркер не завершил задачу за JOBS_LOCK_TIMEOUT'
+    released = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.DEAD, locked_by='', last_error=error
+    )
+    # По одной: задача, у которой в очереди есть дубликат, не должна
+    # помешать вернуть остальные.
+    for pk in stale.values_list('pk', flat=True):
+        released += _requeue(stale.filter(pk=pk), run_at=timezone.now(),
+                             last_error=error)
+    return released
+
+
+def _fail(job, worker, error):
+    jobs = Job.objects.filter(pk=job.pk, locked_by=worker)
+    if job.attempts >= job.max_attempts:
+        logger.error('Задача %s не выполнена после %s попыток',
+                     job, job.attempts)
+        jobs.update(status=Job.DEAD, locked_by='', last_error=error)
+    else:
+        _requeue(jobs, last_error=error, run_at=timezone.now() + timedelta(
+            seconds=backoff(job.attempts)
+        ))
+
+
+def execute(job_id, worker):
+    """Выполняет взятую задачу и записывает результат.
+
+    Возвращает True, если задача выполнена.
+    """
+    job = Job.objects.filter(
+        pk=job_id, status=Job.RUNNING, locked_by=worker
+    ).first()
+    if job is None:
+        return False
+    try:
+        func = registry.get(job.name)
+        if func is None:
+            raise UnknownTask(job.name)
+        payload = json.loads(job.payload)
+        func(*payload['args'], **payload['kwargs'])
+    except Exception:
+        logger.exception('Ошибка в задаче %s', job)
+        _fail(job, worker, traceback.format_exc())
+        return False
+    Job.objects.filter(pk=job.pk, locked_by=worker).delete()
+    return True
+
+
+def run_pending(worker=None, limit=100):
+    """Выполняет готовые задачи в текущем потоке; удобно в тестах."""
+    worker = worker or worker_name()
+    done = 0
+    while True:
+        ids = claim(worker, limit)
+        if not ids:
+            return done
+        done += sum(execute(job_id, worker) for job_id in ids)
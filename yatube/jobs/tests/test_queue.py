@@ -0,0 +1,168 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .. import queue
+from ..models import Job
+
+calls = []
+
+
+@queue.task
+def record(value, suffix=''):
+    calls.append(f'{value}{suffix}')
+
+
+@queue.task
+def explode():
+    raise RuntimeError('сломалось')
+
+
+class QueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_and_run(self):
+        """Задача выполняется воркером и удаляется из очереди."""
+
+        job = queue.enqueue(record, 'a', suffix='!')
+
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(queue.run_pending(), 1)
+        self.assertEqual(calls, ['a!'])
+        self.assertFalse(Job.objects.exists())
+
+    def test_delayed_job_waits(self):
+        """Отложенная задача не берётся раньше срока."""
+
+        queue.enqueue(record, 'b', delay=60)
+
+        self.assertEqual(queue.run_pending(), 0)
+        self.assertEqual(calls, [])
+
+    def test_unknown_task(self):
+        """Незарегистрированную задачу поставить нельзя."""
+
+        with self.assertRaises(queue.UnknownTask):
+            queue.enqueue('nowhere.task')
+
+    def test_key_deduplicates_queued_jobs(self):
+        """Задача с ключом ждёт в очереди только один раз."""
+
+        self.assertIsNotNone(queue.enqueue(record, 'c', key='same'))
+        self.assertIsNone(queue.enqueue(record, 'c', key='same'))
+
+        queue.claim('worker', 1)
+        self.assertIsNotNone(queue.enqueue(record, 'c', key='same'))
+
+    def test_claim_is_exclusive(self):
+        """Одну задачу не забирают два воркера."""
+
+        for i in range(3):
+            queue.enqueue(record, i)
+
+        first = queue.claim('first', 2)
+        second = queue.claim('second', 2)
+
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertFalse(set(first) & set(second))
+        self.assertEqual(
+            Job.objects.get(pk=second[0]).locked_by, 'second'
+        )
+
+    @override_settings(JOBS_RETRY_DELAY=10)
+    def test_retry_with_backoff_then_dead(self):
+        """Упавшая задача повторяется с задержкой, потом — dead."""
+
+        job = queue.enqueue(explode, max_attempts=2)
+
+        queue.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('сломалось', job.last_error)
+        delay = (job.run_at - timezone.now()).total_seconds()
+        self.assertTrue(4 < delay <= 10)
+
+        Job.objects.update(run_at=timezone.now())
+        queue.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DEAD)
+        self.assertEqual(job.attempts, 2)
+
+    def test_backoff_grows(self):
+        """Задержка растёт экспоненциально и ограничена сверху."""
+
+        with override_settings(JOBS_RETRY_DELAY=10,
+                               JOBS_RETRY_MAX_DELAY=60):
+            self.assertLessEqual(queue.backoff(1), 10)
+            self.assertGreaterEqual(queue.backoff(3), 20)
+            self.assertLessEqual(queue.backoff(10), 60)
+
+    @override_settings(JOBS_LOCK_TIMEOUT=60)
+    def test_release_stale_jobs(self):
+        """Задачи умершего воркера возвращаются в очередь."""
+
+        queue.enqueue(record, 'd')
+        queue.claim('dead-worker', 1)
+        Job.objects.update(locked_at=timezone.now() - timedelta(minutes=5))
+
+        self.assertEqual(queue.release_stale(), 1)
+        self.assertEqual(queue.run_pending(), 1)
+        self.assertEqual(calls, ['d'])
+
+    def test_failed_job_with_queued_duplicate_is_dropped(self):
+        """Упавшая задача не возвращается в очередь, где уже ждёт такая
+        же, а удаляется.
+        """
+        queue.enqueue(explode, key='same')
+        running = queue.claim('worker', 1)[0]
+        waiting = queue.enqueue(explode, key='same')
+
+        self.assertFalse(queue.execute(running, 'worker'))
+
+        self.assertEqual(list(Job.objects.values_list('pk', flat=True)),
+                         [waiting.pk])
+
+    @override_settings(JOBS_LOCK_TIMEOUT=60)
+    def test_release_stale_with_queued_duplicate(self):
+        """Зависшая задача с дубликатом в очереди не мешает вернуть
+        остальные.
+        """
+        queue.enqueue(record, 'e', key='same')
+        queue.enqueue(record, 'f')
+        queue.claim('dead-worker', 2)
+        queue.enqueue(record, 'e', key='same')
+        Job.objects.filter(status=Job.RUNNING).update(
+            locked_at=timezone.now() - timedelta(minutes=5)
+        )
+
+        self.assertEqual(queue.release_stale(), 2)
+        self.assertEqual(queue.run_pending(), 2)
+        self.assertEqual(sorted(calls), ['e', 'f'])
+
+
+class WorkerCommandTests(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_run_worker_once(self):
+        """run_worker выполняет задачи в пуле потоков и выходит."""
+
+        for i in range(5):
+            queue.enqueue(record, i)
+        queue.enqueue(explode, max_attempts=1)
+
+        # Тестовая база SQLite в памяти с общим кэшем не ждёт блокировок,
+        # а сразу падает, поэтому исполнитель здесь один.
+        out = StringIO()
+        call_command('run_worker', workers=1, once=True, stdout=out)
+
+        self.assertEqual(sorted(calls), ['0', '1', '2', '3', '4'])
+        self.assertIn('Выполнено задач: 5, с ошибкой: 1', out.getvalue())
+        self.assertEqual(list(Job.objects.values_list('status', flat=True)),
+                         [Job.DEAD])
@@ -0,0 +1,196 @@
+"""JSON API лент и комментариев только для чтения.
+
+Ответ — ``{"results": [...], "next": ..., "previous": ...}``, где
+``next``/``previous`` — курсоры для ``?after=``/``?before=`` (как в
+HTML-лентах, см. ``CursorPaginator``). Первая страница выбирается без
+подсчёта записей, размер страницы задаёт ``?limit=`` (не больше
+``POSTS_API_MAX_LIMIT``).
+
+``?fields=id,text,author`` оставляет в ответе только перечисленные поля;
+связи и подзапросы, которые для них не нужны, в запрос не попадают.
+Автор и группа встраиваются в пост тем же запросом (``select_related``).
+
+Каждый ответ получает ETag по содержимому, и на совпавший
+``If-None-Match`` отдаётся 304 без тела. Ленты главной страницы, групп
+и авторов кэшируются по поколениям ``feed_cache``, как их HTML-версии,
+поэтому повторный запрос неизменной ленты не доходит до базы.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.utils.cache import get_conditional_response, set_response_etag
+from django.views.decorators.http import require_http_methods
+
+from . import feed_cache, images, objects, timeline
+from .models import Comment, Post
+from .paginators import COMMENT_ORDERING, CursorPaginator
+
+POST_FIELDS = ('id', 'text', 'pub_date', 'author', 'group', 'image',
+               'image_variants', 'comment_count')
+COMMENT_FIELDS = ('id', 'text', 'created', 'author')
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def api_view(view):
+    """GET-представление API: ошибки в JSON, ETag и ответ 304."""
+    @require_http_methods(['GET'])
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            response = view(request, *args, **kwargs)
+        except ApiError as error:
+            return JsonResponse({'detail': str(error)}, status=error.status)
+        except Http404:
+            return JsonResponse({'detail': 'Не найдено.'}, status=404)
+        if response.status_code == 200:
+            set_response_etag(response)
+            response = get_conditional_response(
+                request, etag=response['ETag'], response=response
+            )
+        return response
+    return wrapper
+
+
+def requested_fields(request, allowed):
+    value = request.GET.get('fields')
+    if not value:
+        return allowed
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = set(fields) - set(allowed)
+    if unknown:
+        raise ApiError(f'Неизвестные поля: {", ".join(sorted(unknown))}')
+    return [field for field in allowed if field in fields]
+
+
+def page_size(request):
+    value = request.GET.get('limit')
+    if value is None:
+        return settings.POSTS_PER_PAGE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ApiError('limit должен быть числом.')
+    return max(1, min(limit, settings.POSTS_API_MAX_LIMIT))
+
+
+def paginated(request, queryset, ordering, serialize):
+    paginator = CursorPaginator(queryset, page_size(request),
+                                ordering=ordering)
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    if after or before:
+        page = paginator.cursor_page(after=after, before=before)
+        if page is None:
+            raise ApiError('Некорректный курсор.')
+    else:
+        page = paginator.first_page()
+    return JsonResponse(
+        {
+            'results': [serialize(obj) for obj in page.object_list],
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        },
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')},
+    )
+
+
+def serialize_author(user):
+    return {'username': user.username, 'full_name': user.get_full_name()}
+
+
+def post_serializer(fields):
+    def serialize(post):
+        data = {}
+        for field in fields:
+            if field == 'author':
+                data['author'] = serialize_author(post.author)
+            elif field == 'group':
+                data['group'] = post.group and {
+                    'slug': post.group.slug, 'title': post.group.title
+                }
+            elif field == 'image':
+                data['image'] = post.image.url if post.image else None
+            elif field == 'image_variants':
+                data['image_variants'] = images.variant_urls(post.image)
+            else:
+                data[field] = getattr(post, field)
+        return data
+    return serialize
+
+
+def comment_serializer(fields):
+    def serialize(comment):
+        data = {}
+        for field in fields:
+            if field == 'author':
+                data['author'] = serialize_author(comment.author)
+            else:
+                data[field] = getattr(comment, field)
+        return data
+    return serialize
+
+
+def post_queryset(posts, fields):
+    """Посты только с теми связями и подсчётами, что нужны полям."""
+    related = [field for field in ('author', 'group') if field in fields]
+    if related:
+        posts = posts.select_related(*related)
+    if 'comment_count' in fields:
+        posts = posts.with_comment_count()
+    return posts
+
+
+def post_feed(request, posts, ordering=('-pub_date', '-id')):
+    fields = requested_fields(request, POST_FIELDS)
+    return paginated(request, post_queryset(posts, fields), ordering,
+                     post_serializer(fields))
+
+
+@api_view
+@feed_cache.cache_feed(feed_cache.INDEX)
+def index(request):
+    return post_feed(request, Post.objects.all())
+
+
+@api_view
+@feed_cache.cache_feed(feed_cache.GROUP, 'slug')
+def group_posts(request, slug):
+    group = objects.get_group_or_404(slug)
+    return post_feed(request, group.posts.all())
+
+
+@api_view
+@feed_cache.cache_feed(feed_cache.AUTHOR, 'username')
+def profile(request, username):
+    author = objects.get_user_or_404(username)
+    return post_feed(request, author.posts.all())
+
+
+@api_view
+def follow_index(request):
+    if not request.user.is_authenticated:
+        raise ApiError('Требуется авторизация.', status=401)
+    fields = requested_fields(request, POST_FIELDS)
+    posts = timeline.feed_for(
+        request.user, post_queryset(Post.objects.all(), fields)
+    )
+    return paginated(request, posts, timeline.ORDERING,
+                     post_serializer(fields))
+
+
+@api_view
+def post_comments(request, post_id):
+    if objects.get(objects.POST, post_id) is None:
+        raise Http404
+    fields = requested_fields(request, COMMENT_FIELDS)
+    comments = Comment.objects.filter(post_id=post_id)
+    if 'author' in fields:
+        comments = comments.select_related('author')
+    return paginated(request, comments, COMMENT_ORDERING,
+                     comment_serializer(fields))
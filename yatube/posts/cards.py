@@ -0,0 +1,58 @@
+"""Кэш отрендеренных карточек постов.
+
+Карточка (``includes/post_card.html``) одинакова для всех зрителей и
+кэшируется по ключу ``post_card:<id>:<card_version>``. Версию поднимают
+сигналы при правке поста, новом или удалённом комментарии и при
+изменении группы, поэтому старые карточки просто перестают читаться.
+Части, зависящие от зрителя, рендерит ``includes/post_item.html`` вокруг
+готовой карточки.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import objects
+from .models import Post
+
+TEMPLATE = 'includes/post_card.html'
+
+
+def card_key(post):
+    return f'post_card:{post.pk}:{post.card_version}'
+
+
+def attach(posts):
+    """Кладёт разметку карточки в ``post.card_html`` для каждого поста.
+
+    Все карточки страницы читаются одним ``get_many``, недостающие
+    рендерятся и сохраняются одним ``set_many``.
+    """
+    posts_by_key = {card_key(post): post for post in posts}
+    cached = cache.get_many(list(posts_by_key))
+    rendered = {}
+    for key, post in posts_by_key.items():
+        html = cached.get(key)
+        if html is None:
+            html = rendered[key] = render_to_string(TEMPLATE, {'post': post})
+        post.card_html = mark_safe(html)
+    if rendered:
+        cache.set_many(rendered, settings.POSTS_CARD_CACHE_TIMEOUT)
+
+
+def bump_version(**filters):
+    """Делает устаревшими карточки постов, подходящих под ``filters``.
+
+    Закэшированные объекты этих постов тоже сбрасываются: в них
+    хранится ``card_version``.
+    """
+    posts = Post.objects.filter(**filters)
+    if filters.keys() == {'pk'}:
+        ids = [filters['pk']]
+    elif filters.keys() == {'pk__in'}:
+        ids = list(filters['pk__in'])
+    else:
+        ids = list(posts.values_list('pk', flat=True))
+    posts.update(card_version=F('card_version') + 1)
+    objects.invalidate(objects.POST, *ids)
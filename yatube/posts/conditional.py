@@ -0,0 +1,109 @@
+"""Условные GET-запросы (``ETag``) для страниц.
+
+Перед представлением выполняется дешёвая функция состояния страницы: она
+собирает значения, от которых зависит содержимое, не просматривая все
+посты ленты. Это поколение ленты из ``feed_cache`` (его поднимают сигналы
+при правке и удалении постов, комментариях, подписках и готовности
+миниатюр), самый новый пост по индексу ленты и счётчики автора из
+``UserStats``. Если клиент прислал совпадающий ``If-None-Match``, сразу
+отдаётся 304 — без запроса ленты и рендера шаблона.
+
+``Last-Modified`` не отправляется: одна дата не видит удалений, новых
+подписчиков и готовых миниатюр, и ``If-Modified-Since`` отдавал бы 304
+на изменившуюся страницу. Шапка страницы зависит от пользователя, поэтому
+в ETag входит его id, а ответ помечается ``private, no-cache`` — браузер
+хранит его, но каждый раз переспрашивает сервер.
+"""
+import hashlib
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.utils.cache import (get_conditional_response,
+                                patch_cache_control)
+from django.utils.http import quote_etag
+
+from . import counters, feed_cache
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def _stats(user_id):
+    stats = counters.get_stats(User(pk=user_id))
+    return tuple(getattr(stats, field) for field in counters.FIELDS)
+
+
+def _feed_state(posts, scope, value):
+    # Один шаг по индексу ленты (автора или группы) вместо агрегатов по
+    # всем её постам.
+    newest = posts.order_by('-pub_date', '-id').values_list(
+        'pk', 'modified').first()
+    generation = feed_cache.get_generation(
+        feed_cache.generation_key(scope, value)
+    )
+    return newest, generation
+
+
+def profile_state(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True).first()
+    if author_id is None:
+        return None
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user, author_id=author_id).exists()
+    return (*_feed_state(Post.objects.filter(author_id=author_id),
+                         feed_cache.AUTHOR, username),
+            _stats(author_id), following)
+
+
+def group_state(request, slug):
+    group = Group.objects.filter(slug=slug).values(
+        'pk', 'title', 'description').first()
+    if group is None:
+        return None
+    return (*_feed_state(Post.objects.filter(group_id=group['pk']),
+                         feed_cache.GROUP, slug),
+            group['title'], group['description'])
+
+
+def post_state(request, username, post_id):
+    # Пост один, поэтому сортировка не нужна (и не строит временный индекс).
+    rows = Post.objects.filter(
+        pk=post_id, author__username=username
+    ).order_by().values('modified', 'card_version', 'author_id')[:1]
+    if not rows:
+        return None
+    post = rows[0]
+    comments = Comment.objects.filter(post_id=post_id).count()
+    return (post['modified'], post['card_version'], comments,
+            _stats(post['author_id']))
+
+
+def conditional_page(state):
+    """Отвечает 304, если состояние страницы не изменилось.
+
+    ``state(request, **kwargs)`` возвращает кортеж значений, из которых
+    строится ETag, или None, если страницы нет — тогда 404 отдаст
+    представление.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            page_state = state(request, **kwargs)
+            if page_state is None:
+                return view(request, *args, **kwargs)
+            viewer = request.user.pk if request.user.is_authenticated else 0
+            etag = quote_etag(
+                hashlib.md5(repr((viewer, *page_state)).encode()).hexdigest()
+            )
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response['ETag'] = etag
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
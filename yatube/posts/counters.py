@@ -0,0 +1,65 @@
+"""Денормализованные счётчики подписчиков, подписок и постов.
+
+Строка ``UserStats`` создаётся при первом чтении по фактическим данным,
+дальше сигналы меняют её атомарным ``UPDATE ... SET x = x + 1``. Если
+строки ещё нет, изменение пропускается: его учтёт первый подсчёт.
+Расхождения после сбоев исправляет команда ``reconcile_counters``.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from yatube.replicas import primary
+
+from .models import Follow, Post, UserStats
+
+FIELDS = ('followers_count', 'following_count', 'posts_count')
+
+
+def _count(queryset, field):
+    """Подзапрос с числом строк ``queryset``, связанных с пользователем."""
+    counted = queryset.filter(**{field: OuterRef('pk')}).order_by()
+    counted = counted.values(field).annotate(count=Count('pk'))
+    return Coalesce(
+        Subquery(counted.values('count'), output_field=IntegerField()), 0
+    )
+
+
+def annotate_counts(users):
+    """Пользователи с фактическими значениями счётчиков."""
+    return users.annotate(
+        followers_count=_count(Follow.objects.all(), 'author'),
+        following_count=_count(Follow.objects.all(), 'user'),
+        posts_count=_count(Post.objects.all(), 'author'),
+    )
+
+
+def get_stats(user):
+    """Счётчики пользователя; при первом обращении считаются по базе."""
+    try:
+        return UserStats.objects.get(user_id=user.pk)
+    except UserStats.DoesNotExist:
+        pass
+    # Считаем по основной базе, куда и пишем: на отстающей реплике
+    # счётчики были бы старыми. Строка — служебная запись, посетителя
+    # она за основной базой не закрепляет.
+    with primary(sticky=False):
+        stats = UserStats(
+            user_id=user.pk,
+            followers_count=Follow.objects.filter(author_id=user.pk).count(),
+            following_count=Follow.objects.filter(user_id=user.pk).count(),
+            posts_count=Post.objects.filter(author_id=user.pk).count(),
+        )
+        try:
+            with transaction.atomic():
+                stats.save(force_insert=True)
+        except IntegrityError:
+            return UserStats.objects.get(user_id=user.pk)
+    return stats
+
+
+def change(user_id, **deltas):
+    """Атомарно сдвигает счётчики пользователя на ``deltas``."""
+    UserStats.objects.filter(user_id=user_id).update(**{
+        field: F(field) + delta for field, delta in deltas.items()
+    })
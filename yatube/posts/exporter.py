@@ -0,0 +1,132 @@
+"""Потоковая выгрузка всего, что написал автор.
+
+Посты и комментарии читаются через ``.iterator()`` пачками по
+``CHUNK_SIZE`` строк и сразу превращаются в куски ответа, поэтому память
+не зависит от числа записей, а первые байты уходят клиенту сразу.
+Записи выгружаются в формате, который понимает ``import_content``.
+
+Форматы:
+
+* ``jsonl`` — по записи на строку;
+* ``csv`` — те же записи с колонками ``CSV_FIELDS``;
+* ``zip`` — ``content.jsonl`` и картинки постов в ``images/``. Архив
+  пишется в поток без перемотки (zipfile ставит дескрипторы данных после
+  каждого файла), картинки копируются кусками по ``FILE_CHUNK_SIZE``.
+"""
+import csv
+import json
+import zipfile
+
+from .models import Comment, Post
+
+CHUNK_SIZE = 500
+FILE_CHUNK_SIZE = 64 * 1024
+CSV_FIELDS = ('type', 'id', 'author', 'text', 'group', 'post', 'pub_date',
+              'created', 'image')
+FORMATS = {
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'csv': ('text/csv', 'csv'),
+    'zip': ('application/zip', 'zip'),
+}
+
+
+def _posts(author):
+    return Post.objects.filter(author=author).select_related(
+        'group').order_by('pk').iterator(chunk_size=CHUNK_SIZE)
+
+
+def records(author):
+    """Записи постов и комментариев автора в формате импорта."""
+    for post in _posts(author):
+        yield {
+            'type': 'post',
+            'id': post.pk,
+            'author': author.username,
+            'text': post.text,
+            'group': post.group.slug if post.group_id else None,
+            'pub_date': post.pub_date.isoformat(),
+            'image': post.image.name or None,
+        }
+    comments = Comment.objects.filter(author=author).order_by('pk')
+    for comment in comments.iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            'type': 'comment',
+            'id': comment.pk,
+            'author': author.username,
+            'text': comment.text,
+            'post': comment.post_id,
+            'created': comment.created.isoformat(),
+        }
+
+
+def jsonl_chunks(author):
+    for record in records(author):
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+class _Line:
+    """Файлоподобный объект, отдающий записанную строку обратно."""
+
+    def write(self, value):
+        return value
+
+
+def csv_chunks(author):
+    writer = csv.DictWriter(_Line(), CSV_FIELDS)
+    yield writer.writeheader()
+    for record in records(author):
+        yield writer.writerow(record)
+
+
+class _ZipStream:
+    """Поток для zipfile: копит байты, пока их не заберёт генератор."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.position = 0
+
+    def write(self, data):
+        self.buffer += data
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def zip_chunks(author):
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as archive:
+        with archive.open('content.jsonl', 'w', force_zip64=True) as entry:
+            for line in jsonl_chunks(author):
+                entry.write(line.encode())
+                if len(stream.buffer) >= FILE_CHUNK_SIZE:
+                    yield stream.pop()
+        yield stream.pop()
+        for post in _posts(author):
+            if not post.image:
+                continue
+            name = f'images/{post.image.name}'
+            with archive.open(name, 'w', force_zip64=True) as entry:
+                with post.image.open('rb') as image:
+                    for chunk in image.chunks(FILE_CHUNK_SIZE):
+                        entry.write(chunk)
+                        yield stream.pop()
+            yield stream.pop()
+    yield stream.pop()
+
+
+WRITERS = {'jsonl': jsonl_chunks, 'csv': csv_chunks, 'zip': zip_chunks}
+
+
+def export(author, file_format):
+    """Куски выгрузки автора в формате ``file_format``."""
+    return WRITERS[file_format](author)
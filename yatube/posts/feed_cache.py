@@ -0,0 +1,108 @@
+"""Кэш страниц лент с инвалидацией по поколениям.
+
+У каждой ленты есть счётчик поколения в кэше: общий для главной
+страницы, свой для каждой группы и каждого автора. Ключ закэшированной
+страницы включает текущее поколение, поэтому после ``bump()`` старые
+страницы больше не читаются и вытесняются сами. Сигналы поднимают
+поколения при создании, правке и удалении постов, при комментариях,
+подписках и изменении групп.
+
+Лента подписок страницами не кэшируется, но её поколение (по id
+пользователя) сбрасывает закэшированное число записей в пагинаторе.
+
+Анонимные посетители получают общий вариант страницы, авторизованные —
+свой, потому что шапка и кнопки зависят от пользователя.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+from yatube.replicas import primary
+
+INDEX = 'index'
+GROUP = 'group'
+AUTHOR = 'author'
+FOLLOW = 'follow'
+
+
+def generation_key(scope, value=None):
+    if value is None:
+        return f'feed_generation:{scope}'
+    return f'feed_generation:{scope}:{value}'
+
+
+def _initial_generation():
+    # Счётчик, вытесненный из кэша, начинается с текущего времени,
+    # чтобы не повторить номер поколения, под которым ещё лежат страницы.
+    return time.time_ns() // 1000
+
+
+def get_generation(key):
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, _initial_generation(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump(*keys):
+    """Увеличивает поколения лент, делая их страницы устаревшими."""
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_generation(), None)
+
+
+def invalidate(index=True, groups=(), authors=()):
+    """Сбрасывает главную ленту, ленты групп (по slug) и авторов."""
+    keys = [generation_key(GROUP, slug) for slug in groups if slug]
+    keys += [generation_key(AUTHOR, username) for username in authors]
+    if index:
+        keys.append(generation_key(INDEX))
+    bump(*keys)
+
+
+def invalidate_post(post, *extra_groups):
+    """Сбрасывает все ленты, в которых показан пост."""
+    groups = [post.group.slug if post.group_id else None]
+    invalidate(groups=groups + list(extra_groups),
+               authors=[post.author.username])
+
+
+def page_key(request, scope, value, generation):
+    viewer = 'anon'
+    if request.user.is_authenticated:
+        viewer = f'user:{request.user.pk}'
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'feed_page:{scope}:{value}:{generation}:{viewer}:{path}'
+
+
+def cache_feed(scope, kwarg=None):
+    """Кэширует GET-ответы ленты до смены её поколения.
+
+    ``kwarg`` — имя аргумента представления, которое выделяет ленту
+    внутри ``scope`` (slug группы, username автора).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+            value = kwargs.get(kwarg) if kwarg else None
+            generation = get_generation(generation_key(scope, value))
+            key = page_key(request, scope, value, generation)
+            response = cache.get(key)
+            if response is None:
+                # Страница попадёт в кэш: строим её по основной базе.
+                with primary():
+                    response = view(request, *args, **kwargs)
+                if response.status_code == 200 and not response.cookies:
+                    cache.set(key, response,
+                              settings.POSTS_FEED_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
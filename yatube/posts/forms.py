@@ -1,6 +1,8 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 from django.forms.widgets import Textarea
 
+from . import images
 from .models import Comment, Post
 
 
@@ -14,6 +16,12 @@ class PostForm(forms.ModelForm):
             'image': 'Загрузите изображение'
         }
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            image = images.normalize(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,125 @@
+"""Обработка загруженных картинок постов.
+
+``normalize`` вызывается при валидации формы:
+
+* поворачивает картинку по EXIF-ориентации и не сохраняет EXIF (в нём
+  бывают координаты съёмки), ICC-профиль оставляет;
+* уменьшает до ``POSTS_IMAGE_MAX_SIDE`` по большей стороне; JPEG сразу
+  декодируется в уменьшенном масштабе (``draft``), без полного растра;
+* перекодирует в JPEG, а картинки с прозрачностью — в WebP.
+
+GIF не трогаются: в них бывает анимация. Результат пишется во временный
+файл, который остаётся в памяти только до ``FILE_UPLOAD_MAX_MEMORY_SIZE``;
+сами загрузки больше этого размера Django уже пишет на диск кусками.
+
+``save_variants`` кладёт рядом с картинкой её копии в WebP шириной
+``POSTS_IMAGE_VARIANTS`` (``posts/3a/3a7b...9c.480w.webp``) для
+клиентов, которым не нужен оригинал. Варианты строит фоновая задача миниатюр.
+"""
+import io
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+VARIANT_FORMAT = 'webp'
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+
+
+def normalize(upload):
+    """Нормализованная копия загруженной картинки; GIF — без изменений."""
+    max_side = settings.POSTS_IMAGE_MAX_SIDE
+    upload.seek(0)
+    with Image.open(upload) as original:
+        if original.format == 'GIF':
+            upload.seek(0)
+            return upload
+        if original.format == 'JPEG':
+            original.draft('RGB', (max_side, max_side))
+        icc_profile = original.info.get('icc_profile')
+        image = ImageOps.exif_transpose(original)
+    alpha = _has_alpha(image)
+    image = image.convert('RGBA' if alpha else 'RGB')
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    output = tempfile.SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+    options = {'quality': settings.POSTS_IMAGE_QUALITY}
+    if icc_profile:
+        options['icc_profile'] = icc_profile
+    if alpha:
+        image.save(output, 'WEBP', method=4, **options)
+        extension = 'webp'
+    else:
+        image.save(output, 'JPEG', optimize=True, progressive=True,
+                   **options)
+        extension = 'jpg'
+    output.seek(0)
+    root = os.path.splitext(os.path.basename(upload.name))[0]
+    return File(output, name=f'{root}.{extension}')
+
+
+def variant_name(name, width):
+    root = os.path.splitext(name)[0]
+    return f'{root}.{width}w.{VARIANT_FORMAT}'
+
+
+def has_variants(name):
+    return bool(name) and not name.lower().endswith('.gif')
+
+
+def save_variants(name, storage=default_storage):
+    """Создаёт недостающие варианты картинки ``name``.
+
+    Варианты шире самой картинки не увеличиваются. Возвращает имена
+    созданных файлов.
+    """
+    if not has_variants(name):
+        return []
+    missing = [width for width in settings.POSTS_IMAGE_VARIANTS
+               if not storage.exists(variant_name(name, width))]
+    if not missing:
+        return []
+    created = []
+    with storage.open(name) as file, Image.open(file) as image:
+        image = image.convert('RGBA' if _has_alpha(image) else 'RGB')
+        # От большего варианта к меньшему: каждый следующий уменьшается
+        # из предыдущего, а не из оригинала.
+        for width in sorted(missing, reverse=True):
+            if image.width > width:
+                image.thumbnail((width, image.height), Image.LANCZOS)
+            buffer = io.BytesIO()
+            image.save(buffer, VARIANT_FORMAT,
+                       quality=settings.POSTS_IMAGE_QUALITY, method=4)
+            created.append(storage.save(variant_name(name, width),
+                                        ContentFile(buffer.getvalue())))
+    return created
+
+
+def delete_variants(name, storage=default_storage):
+    """Удаляет варианты картинки ``name``."""
+    if has_variants(name):
+        for width in settings.POSTS_IMAGE_VARIANTS:
+            storage.delete(variant_name(name, width))
+
+
+def variant_urls(image, storage=default_storage):
+    """Ссылки на готовые варианты картинки по ширине."""
+    if not image or not has_variants(image.name):
+        return {}
+    urls = {}
+    for width in settings.POSTS_IMAGE_VARIANTS:
+        name = variant_name(image.name, width)
+        if storage.exists(name):
+            urls[width] = storage.url(name)
+    return urls
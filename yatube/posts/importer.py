@@ -0,0 +1,305 @@
+"""Потоковый импорт групп, постов, комментариев и подписок.
+
+Источник — JSONL или CSV, одна запись на строку, вид записи задаёт
+поле ``type``:
+
+* ``group``: ``slug``, ``title``, ``description``;
+* ``post``: ``id``, ``author``, ``text``, ``group`` (slug), ``pub_date``,
+  ``image`` (путь в хранилище медиа);
+* ``comment``: ``id``, ``post`` (id поста), ``author``, ``text``,
+  ``created``;
+* ``follow``: ``user``, ``author``.
+
+Пользователи указываются по username. ``id`` необязателен, но
+посты, на которые ссылаются комментарии, должны его иметь: тогда пост
+сохраняется с тем же первичным ключом, а повторный импорт той же записи
+ничего не меняет (``ignore_conflicts``). Даты из источника сохраняются,
+несмотря на ``auto_now_add``.
+
+Записи копятся в буферах и пишутся ``bulk_create`` одной транзакцией,
+когда набирается ``batch_size`` записей. Память ограничена размером
+буферов и кэшей имён, а не объёмом файла. После каждой пачки вызывается
+``on_flush`` с числом обработанных записей — по нему команда пишет
+контрольную точку.
+
+``bulk_create`` не отправляет сигналы, поэтому ленты подписок и
+счётчики после импорта пересобираются отдельно (это делает команда
+``import_content``). Полнотекстовый индекс заполняют триггеры.
+"""
+import csv
+import json
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import cards, feed_cache
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+TYPES = ('group', 'post', 'comment', 'follow')
+# Поля записей по типу значения; проверяются в ``Importer.add``.
+INTEGER_FIELDS = ('id', 'post')
+STRING_FIELDS = ('slug', 'title', 'description', 'author', 'user', 'text',
+                 'group', 'image')
+DATE_FIELDS = ('pub_date', 'created')
+
+
+class ImportFormatError(Exception):
+    pass
+
+
+class LRUCache:
+    """Ограниченный словарь: при переполнении забывает давние ключи."""
+
+    def __init__(self, size):
+        self.size = size
+        self.data = OrderedDict()
+
+    def get(self, key):
+        if key in self.data:
+            self.data.move_to_end(key)
+        return self.data.get(key)
+
+    def set(self, key, value):
+        self.data[key] = value
+        self.data.move_to_end(key)
+        if len(self.data) > self.size:
+            self.data.popitem(last=False)
+
+
+def read_jsonl(file):
+    for number, line in enumerate(file, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as error:
+            raise ImportFormatError(f'строка {number}: {error}') from error
+
+
+def read_csv(file):
+    for row in csv.DictReader(file):
+        yield {key: value for key, value in row.items() if value != ''}
+
+
+@contextmanager
+def source_timestamps():
+    """Отключает ``auto_now_add``, чтобы сохранить даты из источника."""
+    fields = [Post._meta.get_field('pub_date'),
+              Comment._meta.get_field('created')]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Importer:
+    def __init__(self, batch_size=1000, cache_size=10000,
+                 create_users=False, on_flush=None):
+        self.batch_size = batch_size
+        self.create_users = create_users
+        self.on_flush = on_flush
+        self.users = LRUCache(cache_size)
+        self.groups = LRUCache(cache_size)
+        self.buffers = {kind: [] for kind in TYPES}
+        self.counts = dict.fromkeys(TYPES, 0)
+        self.skipped = 0
+        self.processed = 0
+        self.resumed_from = 0
+        self.started = time.perf_counter()
+
+    @property
+    def rate(self):
+        """Записей в секунду с начала этого запуска."""
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return (self.processed - self.resumed_from) / elapsed
+
+    def run(self, records, skip=0):
+        """Импортирует записи, пропустив первые ``skip`` (уже записанные)."""
+        self.processed = self.resumed_from = skip
+        with source_timestamps():
+            for number, record in enumerate(records):
+                if number < skip:
+                    continue
+                self.add(record)
+                if sum(map(len, self.buffers.values())) >= self.batch_size:
+                    self.flush()
+            self.flush()
+
+    def add(self, record):
+        kind = record.get('type')
+        if kind not in TYPES:
+            raise ImportFormatError(f'неизвестный тип записи: {kind!r}')
+        try:
+            self.clean(record)
+        except ImportFormatError as error:
+            raise ImportFormatError(
+                f'запись {self.processed + 1}: {error}'
+            ) from None
+        self.buffers[kind].append(record)
+        self.processed += 1
+
+    def flush(self):
+        with transaction.atomic():
+            # Порядок важен: посты ссылаются на группы, комментарии — на
+            # посты из той же пачки.
+            self._write_groups(self.buffers['group'])
+            self._write_posts(self.buffers['post'])
+            self._write_comments(self.buffers['comment'])
+            self._write_follows(self.buffers['follow'])
+        for buffer in self.buffers.values():
+            buffer.clear()
+        if self.on_flush is not None:
+            self.on_flush(self)
+
+    # Разрешение имён
+
+    def user_id(self, username):
+        if not username:
+            return None
+        user_id = self.users.get(username)
+        if user_id is None:
+            user_id = User.objects.filter(username=username).values_list(
+                'pk', flat=True).first()
+            if user_id is None and self.create_users:
+                user = User(username=username)
+                user.set_unusable_password()
+                user.save()
+                user_id = user.pk
+            if user_id is not None:
+                self.users.set(username, user_id)
+        return user_id
+
+    def group_id(self, slug):
+        if not slug:
+            return None
+        group_id = self.groups.get(slug)
+        if group_id is None:
+            group_id = Group.objects.filter(slug=slug).values_list(
+                'pk', flat=True).first()
+            if group_id is not None:
+                self.groups.set(slug, group_id)
+        return group_id
+
+    @classmethod
+    def clean(cls, record):
+        """Приводит поля записи к нужным типам или сообщает об ошибке."""
+        for field in INTEGER_FIELDS:
+            value = record.get(field)
+            if value is None or value == '':
+                continue
+            if isinstance(value, bool) or not isinstance(value, (int, str)):
+                raise ImportFormatError(
+                    f'{field} должно быть числом, а не {value!r}'
+                )
+            try:
+                record[field] = int(value)
+            except ValueError:
+                raise ImportFormatError(
+                    f'{field} должно быть числом, а не {value!r}'
+                ) from None
+        for field in STRING_FIELDS:
+            value = record.get(field)
+            if value is not None and not isinstance(value, str):
+                raise ImportFormatError(
+                    f'{field} должно быть строкой, а не {value!r}'
+                )
+        for field in DATE_FIELDS:
+            if record.get(field):
+                record[field] = cls.timestamp(record[field])
+
+    @staticmethod
+    def timestamp(value):
+        parsed = None
+        if isinstance(value, str):
+            try:
+                parsed = parse_datetime(value)
+            except ValueError:
+                pass
+        if parsed is None:
+            raise ImportFormatError(f'не удалось разобрать дату {value!r}')
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+    # Запись пачек
+
+    def _write_groups(self, records):
+        groups = [
+            Group(slug=record['slug'], title=record.get('title', ''),
+                  description=record.get('description'))
+            for record in records if record.get('slug')
+        ]
+        self.skipped += len(records) - len(groups)
+        Group.objects.bulk_create(groups, ignore_conflicts=True)
+        self.counts['group'] += len(groups)
+
+    def _write_posts(self, records):
+        posts = []
+        for record in records:
+            author_id = self.user_id(record.get('author'))
+            if author_id is None or not record.get('text'):
+                self.skipped += 1
+                continue
+            posts.append(Post(
+                id=record.get('id'), author_id=author_id,
+                text=record['text'],
+                group_id=self.group_id(record.get('group')),
+                pub_date=record.get('pub_date') or timezone.now(),
+                image=record.get('image') or None,
+            ))
+        Post.objects.bulk_create(posts, ignore_conflicts=True)
+        self.counts['post'] += len(posts)
+        feed_cache.invalidate(
+            groups={record.get('group') for record in records},
+            authors={record['author'] for record in records
+                     if record.get('author')},
+        )
+
+    def _write_comments(self, records):
+        post_ids = {record['post'] for record in records
+                    if record.get('post')}
+        posts = dict(Post.objects.filter(pk__in=post_ids).values_list(
+            'pk', 'author__username'))
+        comments = []
+        for record in records:
+            post_id = record.get('post')
+            author_id = self.user_id(record.get('author'))
+            if post_id not in posts or author_id is None:
+                self.skipped += 1
+                continue
+            comments.append(Comment(
+                id=record.get('id'), post_id=post_id, author_id=author_id,
+                text=record.get('text', ''),
+                created=record.get('created') or timezone.now(),
+            ))
+        Comment.objects.bulk_create(comments, ignore_conflicts=True)
+        self.counts['comment'] += len(comments)
+        commented = {comment.post_id for comment in comments}
+        if commented:
+            cards.bump_version(pk__in=commented)
+            feed_cache.invalidate(
+                authors={posts[post_id] for post_id in commented}
+            )
+
+    def _write_follows(self, records):
+        follows = []
+        for record in records:
+            user_id = self.user_id(record.get('user'))
+            author_id = self.user_id(record.get('author'))
+            if None in (user_id, author_id) or user_id == author_id:
+                self.skipped += 1
+                continue
+            follows.append(Follow(user_id=user_id, author_id=author_id))
+        Follow.objects.bulk_create(follows, ignore_conflicts=True)
+        self.counts['follow'] += len(follows)
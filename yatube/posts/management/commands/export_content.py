@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import exporter
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Потоково выгружает посты и комментарии автора в JSONL, CSV '
+            'или zip-архив с картинками.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='Автор, чьи записи выгружать.')
+        parser.add_argument(
+            '--format', choices=exporter.FORMATS, default='jsonl',
+            help='Формат выгрузки.'
+        )
+        parser.add_argument(
+            '--output', default='-',
+            help='Файл для выгрузки или "-" для stdout.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            author = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["username"]} не найден.'
+            )
+        file_format = options['format']
+        output = options['output']
+        if output == '-':
+            if file_format == 'zip':
+                raise CommandError('Архив можно выгрузить только в файл.')
+            for chunk in exporter.export(author, file_format):
+                self.stdout.write(chunk, ending='')
+            return
+        if file_format == 'zip':
+            file = open(output, 'wb')
+        else:
+            file = open(output, 'w', encoding='utf-8', newline='')
+        with file:
+            for chunk in exporter.export(author, file_format):
+                file.write(chunk)
+        self.stdout.write(f'Выгрузка записана в {output}')
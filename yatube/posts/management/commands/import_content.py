@@ -0,0 +1,127 @@
+import json
+import os
+import sys
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection
+
+from posts import feed_cache
+from posts.importer import (Importer, ImportFormatError, read_csv,
+                            read_jsonl)
+from posts.models import Comment, Post
+
+READERS = {'jsonl': read_jsonl, 'csv': read_csv}
+
+
+class Command(BaseCommand):
+    help = ('Потоково импортирует группы, посты, комментарии и подписки '
+            'из JSONL или CSV.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'source', help='Файл с данными или "-" для stdin.'
+        )
+        parser.add_argument(
+            '--format', choices=READERS,
+            help='Формат источника (по умолчанию — по расширению файла).'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько записей писать за одну транзакцию.'
+        )
+        parser.add_argument(
+            '--cache-size', type=int, default=10000,
+            help='Сколько username и slug помнить между пачками.'
+        )
+        parser.add_argument(
+            '--create-users', action='store_true',
+            help='Создавать пользователей, которых нет в базе.'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки: при повторном запуске импорт '
+                 'продолжится с места остановки.'
+        )
+        parser.add_argument(
+            '--skip-derived', action='store_true',
+            help='Не пересобирать ленты подписок и счётчики после импорта.'
+        )
+
+    def handle(self, *args, **options):
+        source = options['source']
+        file_format = options['format'] or os.path.splitext(source)[1][1:]
+        if file_format not in READERS:
+            raise CommandError('Укажите --format: jsonl или csv.')
+        checkpoint = options['checkpoint']
+        skip = self.read_checkpoint(checkpoint, source)
+
+        importer = Importer(
+            batch_size=options['batch_size'],
+            cache_size=options['cache_size'],
+            create_users=options['create_users'],
+            on_flush=lambda importer: self.flushed(
+                importer, checkpoint, source),
+        )
+        file = sys.stdin if source == '-' else open(
+            source, newline='', encoding='utf-8')
+        try:
+            importer.run(READERS[file_format](file), skip=skip)
+        except ImportFormatError as error:
+            raise CommandError(
+                f'Ошибка после записи {importer.processed}: {error}'
+            ) from error
+        finally:
+            if file is not sys.stdin:
+                file.close()
+
+        self.reset_sequences()
+        if not options['skip_derived']:
+            call_command('reconcile_counters', stdout=self.stdout)
+            call_command('reconcile_images', stdout=self.stdout)
+            call_command('rebuild_timelines', stdout=self.stdout)
+        feed_cache.invalidate()
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        counts = ', '.join(f'{kind}: {count}'
+                           for kind, count in importer.counts.items())
+        self.stdout.write(
+            f'Импорт завершён. {counts}, пропущено: {importer.skipped}, '
+            f'{importer.rate:.0f} записей/с'
+        )
+
+    def read_checkpoint(self, checkpoint, source):
+        if not checkpoint or not os.path.exists(checkpoint):
+            return 0
+        with open(checkpoint) as file:
+            state = json.load(file)
+        if state.get('source') != source:
+            raise CommandError(
+                f'Контрольная точка {checkpoint} относится к другому '
+                f'источнику: {state.get("source")}'
+            )
+        self.stdout.write(f'Продолжаем с записи {state["processed"]}')
+        return state['processed']
+
+    def flushed(self, importer, checkpoint, source):
+        if checkpoint:
+            temporary = f'{checkpoint}.tmp'
+            with open(temporary, 'w') as file:
+                json.dump({'source': source,
+                           'processed': importer.processed}, file)
+            os.replace(temporary, checkpoint)
+        self.stdout.write(
+            f'Записей: {importer.processed}, '
+            f'{importer.rate:.0f} записей/с'
+        )
+
+    def reset_sequences(self):
+        # Посты и комментарии могли прийти с явными id: на PostgreSQL
+        # последовательности нужно сдвинуть, SQLite делает это сам.
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [Post, Comment]
+        )
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
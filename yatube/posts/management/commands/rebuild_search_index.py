@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts import search
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Заново строит полнотекстовый индекс постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help='Сколько постов индексировать за одну транзакцию.'
+        )
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError(
+                'Полнотекстовый поиск работает только на SQLite.'
+            )
+        chunk_size = options['chunk_size']
+        search.clear_index()
+        indexed = 0
+        last_pk = 0
+        while True:
+            pks = list(Post.objects.filter(pk__gt=last_pk).order_by(
+                'pk').values_list('pk', flat=True)[:chunk_size])
+            if not pks:
+                break
+            with transaction.atomic():
+                search.index_posts(last_pk, pks[-1])
+            last_pk = pks[-1]
+            indexed += len(pks)
+        search.optimize_index()
+        self.stdout.write(f'Проиндексировано постов: {indexed}')
@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts import counters
+from posts.models import UserStats
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счётчики подписчиков, подписок и постов '
+            'и исправляет разошедшиеся значения.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Сколько пользователей пересчитывать за один проход.'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        checked = fixed = 0
+        last_pk = 0
+        while True:
+            users = counters.annotate_counts(
+                User.objects.filter(pk__gt=last_pk).order_by('pk')
+            ).values_list('pk', *counters.FIELDS)[:chunk_size]
+            rows = list(users)
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            checked += len(rows)
+            fixed += self.reconcile(rows)
+        self.stdout.write(
+            f'Проверено пользователей: {checked}, исправлено: {fixed}'
+        )
+
+    def reconcile(self, rows):
+        stored = UserStats.objects.in_bulk([row[0] for row in rows])
+        created, drifted = [], []
+        for pk, *values in rows:
+            actual = dict(zip(counters.FIELDS, values))
+            stats = stored.get(pk)
+            if stats is None:
+                created.append(UserStats(user_id=pk, **actual))
+                continue
+            if any(getattr(stats, f) != v for f, v in actual.items()):
+                for field, value in actual.items():
+                    setattr(stats, field, value)
+                drifted.append(stats)
+        UserStats.objects.bulk_create(created, ignore_conflicts=True)
+        UserStats.objects.bulk_update(drifted, counters.FIELDS)
+        return len(drifted)
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import storage
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает ссылки постов на картинки и исправляет '
+            'разошедшиеся счётчики.')
+
+    def handle(self, *args, **options):
+        fixed = storage.recount(Post.objects.all(), 'image')
+        self.stdout.write(f'Исправлено счётчиков ссылок на картинки: {fixed}')
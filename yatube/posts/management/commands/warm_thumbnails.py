@@ -0,0 +1,64 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Строит миниатюры для всех картинок постов, у которых их ещё '
+            'нет, в пуле процессов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Сколько процессов использовать (по умолчанию — по числу '
+                 'ядер).'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=20,
+            help='Сколько картинок отдавать процессу за раз.'
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').select_related(
+            'author', 'group'
+        ).only('pk', 'image', 'author__username', 'group__slug')
+        missing = [
+            post for post in posts.iterator()
+            if thumbnails.ready_thumbnail(post.image) is None
+        ]
+        if not missing:
+            self.stdout.write('Все миниатюры уже готовы')
+            return
+        names = sorted({post.image.name for post in missing})
+        # Дочерние процессы не должны унаследовать открытые соединения.
+        connections.close_all()
+        rendered = set()
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            results = pool.map(_render, names,
+                               chunksize=options['chunk_size'])
+            for name, ok in zip(names, results):
+                if ok:
+                    rendered.add(name)
+        # Файлы уже на диске, осталось записать их в key-value store sorl.
+        for name in rendered:
+            thumbnails.generate(name)
+        thumbnails.refresh_many(
+            post for post in missing if post.image.name in rendered
+        )
+        warmed, failed = len(rendered), len(names) - len(rendered)
+        self.stdout.write(
+            f'Построено миниатюр: {warmed}, ошибок: {failed}'
+        )
+
+
+def _render(name):
+    try:
+        thumbnails.render_file(name)
+    except Exception:
+        thumbnails.logger.exception('Не удалось построить миниатюру %s', name)
+        return False
+    return True
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+# Полнотекстовый индекс постов. Создаётся только на SQLite: FTS5 —
+# расширение SQLite. Триггеры синхронизации ставит posts.search после
+# каждой миграции, поэтому здесь таблица только создаётся и заполняется.
+
+
+def create_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_search "
+        "USING fts5(text, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO posts_post_search(rowid, text) "
+        "SELECT id, replace(replace(text, 'ё', 'е'), 'Ё', 'Е') "
+        "FROM posts_post"
+    )
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for trigger in ('insert', 'update', 'delete'):
+        schema_editor.execute(
+            f'DROP TRIGGER IF EXISTS posts_post_search_{trigger}'
+        )
+    schema_editor.execute('DROP TABLE IF EXISTS posts_post_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
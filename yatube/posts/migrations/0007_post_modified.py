@@ -0,0 +1,26 @@
+# Generated by Django 2.2.28 on 2026-10-18 05:05
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_pub_date(apps, schema_editor):
+    # Старые посты не правились после публикации.
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.update(modified=F('pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_post_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, verbose_name='date modified'),
+        ),
+        migrations.RunPython(copy_pub_date, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 2.2.28 on 2026-10-18 05:18
+
+from django.db import migrations, models
+from django.db.models import Count
+import posts.storage
+
+
+def count_references(apps, schema_editor):
+    # Уже загруженные файлы лежат под прежними именами; на каждый из них
+    # ссылается столько постов, сколько их с этим именем.
+    Post = apps.get_model('posts', 'Post')
+    StoredFile = apps.get_model('posts', 'StoredFile')
+    counts = Post.objects.exclude(image='').exclude(
+        image__isnull=True
+    ).order_by().values_list('image').annotate(count=Count('pk'))
+    StoredFile.objects.bulk_create(
+        [StoredFile(name=name, references=count) for name, count in counts],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_post_modified'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('references', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=posts.storage.ContentAddressedStorage(), upload_to='posts/'),
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
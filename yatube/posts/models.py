@@ -1,5 +1,9 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .storage import ContentAddressedStorage
 
 User = get_user_model()
 
@@ -14,22 +18,79 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def with_comment_count(self):
+        """Добавляет ``comment_count`` подзапросом, без GROUP BY по постам."""
+        comments = Comment.objects.filter(post=OuterRef('pk')).order_by()
+        comment_count = comments.values('post').annotate(
+            count=Count('pk')
+        ).values('count')
+        return self.annotate(
+            comment_count=Coalesce(
+                Subquery(comment_count, output_field=IntegerField()), 0
+            )
+        )
+
+    def for_feed(self):
+        """Посты для карточек ленты: автор, группа и число комментариев
+        выбираются тем же запросом, без обращений к базе из шаблона.
+        """
+        return self.select_related('author', 'group').with_comment_count()
+
+
 class Post(models.Model):
     """Класс Post для управления записями постов в проекте."""
     text = models.TextField()
     pub_date = models.DateTimeField('date published', auto_now_add=True)
+    modified = models.DateTimeField('date modified', auto_now=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE,
                                related_name='posts')
     group = models.ForeignKey(Group, on_delete=models.SET_NULL, blank=True,
                               null=True, related_name='posts')
-    image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    image = models.ImageField(upload_to='posts/', blank=True, null=True,
+                              storage=ContentAddressedStorage())
+    card_version = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text
 
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        """Сохраняет пост, не записывая обратно ``card_version``.
+
+        Версию поднимает только ``cards.bump_version`` через ``F()``.
+        Если бы правка поста записала версию, прочитанную вместе с ним,
+        после комментария версия откатилась бы назад, на ключ, под которым
+        в кэше уже лежит старая карточка.
+        """
+        if update_fields is None and not force_insert \
+                and not self._state.adding:
+            deferred = self.get_deferred_fields()
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'card_version'
+                and field.attname not in deferred
+            ]
+        super().save(force_insert, force_update, using, update_fields)
+
 
 class Comment(models.Model):
     """Класс Comment для управления комментариями к постам в проекте."""
@@ -44,6 +105,12 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text
@@ -65,3 +132,65 @@ class Follow(models.Model):
                 name='follow_unique'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'], name='follow_author_user_idx'
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Класс TimelineEntry — запись материализованной ленты подписок.
+
+    Лента пользователя заполняется при публикации поста (fan-out on write),
+    поэтому страница подписок читается по индексу без соединения с Follow.
+    """
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='timeline_entries'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='timeline_unique'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx'
+            )
+        ]
+
+
+class UserStats(models.Model):
+    """Класс UserStats — денормализованные счётчики автора.
+
+    Обновляются атомарными инкрементами при создании и удалении Follow
+    и Post, чтобы карточка автора не считала их через COUNT.
+    """
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True,
+        related_name='stats'
+    )
+    followers_count = models.IntegerField(default=0)
+    following_count = models.IntegerField(default=0)
+    posts_count = models.IntegerField(default=0)
+
+
+class StoredFile(models.Model):
+    """Класс StoredFile — счётчик ссылок на файл в хранилище картинок.
+
+    Файл с одинаковым содержимым хранится один раз, а удаляется, когда
+    на него не ссылается ни один пост.
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    references = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,161 @@
+"""Кэш объектов, которые представления ищут по параметрам URL.
+
+Пост (по id), группа (по slug) и автор (по username) читаются сквозь
+два уровня:
+
+* небольшой LRU в памяти процесса (``POSTS_OBJECT_CACHE_LOCAL_SIZE``
+  записей); другие процессы его не сбрасывают, поэтому записи в нём живут
+  всего ``POSTS_OBJECT_CACHE_LOCAL_TIMEOUT`` секунд;
+* общий кэш Django на ``POSTS_OBJECT_CACHE_TIMEOUT`` секунд.
+
+Промахи тоже кэшируются, на ``POSTS_OBJECT_CACHE_MISS_TIMEOUT``, чтобы
+перебор несуществующих адресов не доходил до базы. Сигналы сбрасывают
+записи при сохранении и удалении объектов, в том числе при создании —
+это убирает закэшированный промах. Внутри транзакции запись сбрасывается
+ещё раз после коммита: иначе параллельный запрос мог бы успеть положить
+в кэш старую версию. Пост сбрасывается и вместе с его карточкой
+(``cards.bump_version``): в нём хранятся версия карточки, число
+комментариев и группа. После переименования автора или смены slug
+группы старый адрес может открываться ещё до
+``POSTS_OBJECT_CACHE_TIMEOUT``.
+
+Объекты хранятся сериализованными, и каждый вызов получает свою копию:
+представления могут менять её, не задевая соседние запросы. Кэш — только
+для чтения: копия может отставать от базы, поэтому представления,
+которые сохраняют объект (правка поста, комментарий), читают его из
+базы, иначе устаревшие поля записались бы обратно.
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.http import Http404
+
+from yatube.replicas import primary
+
+from .models import Group, Post
+
+User = get_user_model()
+
+POST = 'post'
+GROUP = 'group'
+USER = 'user'
+
+LOADERS = {
+    POST: lambda pk: Post.objects.for_feed().filter(pk=pk).first(),
+    GROUP: lambda slug: Group.objects.filter(slug=slug).first(),
+    USER: lambda username: User.objects.filter(username=username).first(),
+}
+
+# Так в кэше записан промах: пустая строка байт не бывает pickle.
+MISSING = b''
+
+
+class LocalCache:
+    """LRU в памяти процесса с коротким сроком жизни записей."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        size = settings.POSTS_OBJECT_CACHE_LOCAL_SIZE
+        expires = time.monotonic() + settings.POSTS_OBJECT_CACHE_LOCAL_TIMEOUT
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > size:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local = LocalCache()
+
+
+def cache_key(kind, value):
+    return f'object:{kind}:{value}'
+
+
+def get(kind, value):
+    """Объект вида ``kind`` по значению из URL или None."""
+    key = cache_key(kind, value)
+    data = local.get(key)
+    if data is None:
+        data = cache.get(key)
+        if data is None:
+            with primary():
+                found = LOADERS[kind](value)
+            if found is None:
+                data = MISSING
+                timeout = settings.POSTS_OBJECT_CACHE_MISS_TIMEOUT
+            else:
+                data = pickle.dumps(found, pickle.HIGHEST_PROTOCOL)
+                timeout = settings.POSTS_OBJECT_CACHE_TIMEOUT
+            cache.set(key, data, timeout)
+        local.set(key, data)
+    if data == MISSING:
+        return None
+    return pickle.loads(data)
+
+
+def invalidate(kind, *values):
+    """Сбрасывает записи вида ``kind`` сейчас и после коммита."""
+    keys = [cache_key(kind, value) for value in values]
+    if not keys:
+        return
+
+    def delete():
+        local.delete(*keys)
+        cache.delete_many(keys)
+
+    delete()
+    if connection.in_atomic_block:
+        transaction.on_commit(delete)
+
+
+def _get_or_404(kind, value):
+    found = get(kind, value)
+    if found is None:
+        raise Http404(f'Не найдено: {kind} {value}')
+    return found
+
+
+def get_post_or_404(username, post_id):
+    """Пост ``post_id``, если его автор — ``username``."""
+    post = _get_or_404(POST, post_id)
+    if post.author.username != username:
+        raise Http404(f'Не найдено: {POST} {post_id}')
+    return post
+
+
+def get_group_or_404(slug):
+    return _get_or_404(GROUP, slug)
+
+
+def get_user_or_404(username):
+    return _get_or_404(USER, username)
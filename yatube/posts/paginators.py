@@ -0,0 +1,218 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from yatube.replicas import primary
+
+from . import feed_cache
+
+COMMENT_ORDERING = ('-created', '-id')
+
+
+def encode_cursor(values):
+    """Упаковывает значения ключа сортировки в непрозрачный токен."""
+    values = [
+        value.isoformat() if isinstance(value, datetime) else value
+        for value in values
+    ]
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен курсора; для испорченного токена вернёт None."""
+    padding = '=' * (-len(token) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + padding))
+    except (binascii.Error, ValueError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор ленты по ключу сортировки (keyset pagination).
+
+    Страница, запрошенная через ``?after=`` или ``?before=``, выбирается
+    условием ``WHERE (pub_date, id) < (...)`` по индексу, поэтому глубокие
+    страницы стоят столько же, сколько первая, а вставка новых записей
+    не сдвигает уже открытую ленту. Номера страниц (``?page=N``) оставлены
+    для первых ``POSTS_PAGE_NUMBER_LIMIT`` страниц, и в шаблоне выводится
+    только окно ссылок вокруг текущей.
+
+    Если передан ``feed`` — ключ поколения ленты из ``feed_cache``, — число
+    записей кэшируется до смены поколения. Больше
+    ``POSTS_PAGINATOR_EXACT_COUNT_LIMIT`` записей не считается: ``count``
+    становится оценкой снизу, а ``count_is_estimated`` — True.
+    """
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id'),
+                 feed=None, **kwargs):
+        self.ordering = tuple(ordering)
+        self.feed = feed
+        self.count_is_estimated = False
+        super().__init__(object_list.order_by(*self.ordering), per_page,
+                         **kwargs)
+
+    @property
+    def page_number_limit(self):
+        return settings.POSTS_PAGE_NUMBER_LIMIT
+
+    @cached_property
+    def count(self):
+        if self.feed is None:
+            return self._bounded_count()
+        generation = feed_cache.get_generation(self.feed)
+        key = f'feed_count:{self.feed}:{generation}'
+        cached = cache.get(key)
+        if cached is None:
+            with primary():
+                cached = (self._bounded_count(), self.count_is_estimated)
+            cache.set(key, cached, settings.POSTS_FEED_CACHE_TIMEOUT)
+        count, self.count_is_estimated = cached
+        return count
+
+    def _bounded_count(self):
+        limit = max(settings.POSTS_PAGINATOR_EXACT_COUNT_LIMIT,
+                    self.page_number_limit * self.per_page)
+        rows = self.object_list.order_by().values('pk')[:limit + 1]
+        count = rows.count()
+        self.count_is_estimated = count > limit
+        return min(count, limit)
+
+    def page_window(self, number):
+        """Номера страниц вокруг ``number``; None обозначает пропуск."""
+        if number is None:
+            return [1, None]
+        last = min(self.num_pages, self.page_number_limit)
+        width = settings.POSTS_PAGINATOR_WINDOW
+        numbers = {1, last}
+        numbers.update(range(max(1, number - width),
+                             min(last, number + width) + 1))
+        window = []
+        previous = 0
+        for current in sorted(numbers):
+            if current - previous > 1:
+                window.append(None)
+            window.append(current)
+            previous = current
+        if last < self.num_pages or self.count_is_estimated:
+            window.append(None)
+        return window
+
+    def cursor_values(self, obj):
+        return [getattr(obj, field.lstrip('-')) for field in self.ordering]
+
+    def _seek(self, values, backwards):
+        """Условие «строго после курсора» в порядке сортировки ленты."""
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            descending = field.startswith('-')
+            lookup = 'lt' if descending != backwards else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def _reversed_ordering(self):
+        return [
+            field[1:] if field.startswith('-') else f'-{field}'
+            for field in self.ordering
+        ]
+
+    def cursor_page(self, after=None, before=None):
+        """Страница после ``after`` или перед ``before``.
+
+        Возвращает None, если токен не удалось разобрать.
+        """
+        backwards = not after
+        values = decode_cursor(after or before)
+        if values is None or len(values) != len(self.ordering):
+            return None
+        try:
+            queryset = self.object_list.filter(self._seek(values, backwards))
+        except (ValidationError, ValueError, TypeError):
+            return None
+        if backwards:
+            queryset = queryset.order_by(*self._reversed_ordering())
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+        page = Page(rows, None, self)
+        self._set_cursors(
+            page,
+            has_previous=has_more if backwards else True,
+            has_next=True if backwards else has_more,
+        )
+        return page
+
+    def first_page(self):
+        """Первая страница без номера и без подсчёта записей."""
+        rows = list(self.object_list[:self.per_page + 1])
+        page = Page(rows[:self.per_page], None, self)
+        self._set_cursors(page, has_previous=False,
+                          has_next=len(rows) > self.per_page)
+        return page
+
+    def number_page(self, number):
+        """Обычная страница по номеру, не глубже ``page_number_limit``."""
+        try:
+            number = min(int(number), self.page_number_limit)
+        except (TypeError, ValueError):
+            number = 1
+        page = self.get_page(number)
+        page.object_list = list(page.object_list)
+        self._set_cursors(
+            page,
+            has_previous=page.has_previous(),
+            has_next=page.has_next(),
+        )
+        return page
+
+    def _set_cursors(self, page, has_previous, has_next):
+        page.window = self.page_window(page.number)
+        rows = page.object_list
+        page.previous_cursor = None
+        page.next_cursor = None
+        if rows and has_previous:
+            page.previous_cursor = encode_cursor(self.cursor_values(rows[0]))
+        if rows and has_next:
+            page.next_cursor = encode_cursor(self.cursor_values(rows[-1]))
+
+    def page_for_request(self, request):
+        after = request.GET.get('after')
+        before = request.GET.get('before')
+        page = None
+        if after or before:
+            page = self.cursor_page(after=after, before=before)
+        if page is None:
+            page = self.number_page(request.GET.get('page'))
+        return page
+
+
+def paginate_comments(request, comments):
+    """Пачка комментариев: первая или следующая после ``?after=``."""
+    paginator = CursorPaginator(
+        comments.select_related('author'), settings.POSTS_COMMENTS_PER_PAGE,
+        ordering=COMMENT_ORDERING,
+    )
+    after = request.GET.get('after')
+    page = paginator.cursor_page(after=after) if after else None
+    return page or paginator.first_page()
+
+
+def paginate(request, object_list, **kwargs):
+    """Страница ленты для запроса: по курсору или по номеру страницы."""
+    paginator = CursorPaginator(object_list, settings.POSTS_PER_PAGE,
+                                **kwargs)
+    return paginator.page_for_request(request)
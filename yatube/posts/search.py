@@ -0,0 +1,179 @@
+"""Полнотекстовый поиск по постам на SQLite FTS5.
+
+Тексты постов лежат в виртуальной таблице ``posts_post_search``
+(rowid совпадает с id поста), которую синхронизируют триггеры на
+``posts_post``. Таблицу создаёт миграция, а триггеры пересоздаются после
+каждой миграции: SQLite теряет их, когда Django пересобирает таблицу.
+
+Токенизатор ``unicode61`` приводит кириллицу к нижнему регистру, а «ё»
+заменяется на «е» и в индексе, и в запросе. Слова запроса проходят
+лёгкий стемминг (отбрасываются окончания) и ищутся как префиксы, так что
+«котами» находит «кот», «кота» и «коты». Результаты упорядочены по bm25
+и листаются курсором по ``(rank, rowid)``.
+"""
+import re
+
+from django.db import DatabaseError, connection
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+from .paginators import decode_cursor, encode_cursor
+
+TABLE = 'posts_post_search'
+
+NORMALIZED = "replace(replace({}, 'ё', 'е'), 'Ё', 'Е')"
+
+TRIGGERS = (
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_insert
+    AFTER INSERT ON posts_post BEGIN
+        INSERT INTO {TABLE}(rowid, text)
+        VALUES (new.id, {NORMALIZED.format('new.text')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_update
+    AFTER UPDATE OF text ON posts_post BEGIN
+        UPDATE {TABLE} SET text = {NORMALIZED.format('new.text')}
+        WHERE rowid = new.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_delete
+    AFTER DELETE ON posts_post BEGIN
+        DELETE FROM {TABLE} WHERE rowid = old.id;
+    END""",
+)
+
+# Окончания русских словоформ, от длинных к коротким.
+ENDINGS = (
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ией',
+    'ах', 'ях', 'ам', 'ям', 'ом', 'ем', 'ой', 'ей', 'ий', 'ый', 'ая', 'яя',
+    'ое', 'ее', 'ые', 'ие', 'ов', 'ев', 'ую', 'юю', 'ию', 'ия', 'ии',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+)
+MIN_STEM = 3
+WORD = re.compile(r'\w+\*?')
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def install_triggers(db_connection):
+    with db_connection.cursor() as cursor:
+        for sql in TRIGGERS:
+            cursor.execute(sql)
+
+
+def clear_index():
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+
+
+def index_posts(first_pk, last_pk):
+    """Индексирует посты с id в полуинтервале ``(first_pk, last_pk]``."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {TABLE}(rowid, text) '
+            f'SELECT id, {NORMALIZED.format("text")} FROM posts_post '
+            f'WHERE id > %s AND id <= %s',
+            [first_pk, last_pk]
+        )
+
+
+def optimize_index():
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('optimize')")
+
+
+def normalize(text):
+    return text.replace('ё', 'е').replace('Ё', 'Е')
+
+
+def stem(word):
+    """Отбрасывает окончание, оставляя основу не короче MIN_STEM."""
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def build_match(query):
+    """Выражение MATCH для FTS5 из пользовательского запроса.
+
+    Каждое слово экранируется кавычками, поэтому синтаксис FTS5 в
+    запросе не интерпретируется. Слова объединяются через AND.
+    """
+    terms = []
+    for word in WORD.findall(normalize(query).lower()):
+        if word.endswith('*'):
+            terms.append(f'"{word[:-1]}"*')
+        elif len(word) < MIN_STEM:
+            terms.append(f'"{word}"')
+        else:
+            terms.append(f'"{stem(word)}"*')
+    return ' '.join(terms)
+
+
+def matching_ids(query):
+    """Подзапрос с id постов, подходящих под запрос (для ``pk__in``)."""
+    return RawSQL(
+        f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s',
+        [build_match(query)]
+    )
+
+
+class SearchResults:
+    """Страница результатов поиска с курсорами соседних страниц."""
+
+    def __init__(self, object_list, previous_cursor=None, next_cursor=None):
+        self.object_list = object_list
+        self.previous_cursor = previous_cursor
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _ranked_rows(match, cursor, backwards, limit):
+    sql = f'SELECT rank, rowid FROM {TABLE} WHERE {TABLE} MATCH %s'
+    params = [match]
+    order = 'DESC' if backwards else 'ASC'
+    if cursor is not None:
+        op = '<' if backwards else '>'
+        sql += f' AND (rank {op} %s OR (rank = %s AND rowid {op} %s))'
+        params += [cursor[0], cursor[0], cursor[1]]
+    sql += f' ORDER BY rank {order}, rowid {order} LIMIT %s'
+    params.append(limit)
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(sql, params)
+        return db_cursor.fetchall()
+
+
+def search(query, per_page, after=None, before=None):
+    """Страница постов по запросу, от самых релевантных."""
+    match = build_match(query)
+    if not match or not is_available():
+        return SearchResults([])
+    backwards = bool(before) and not after
+    cursor = decode_cursor(after or before or '')
+    if cursor is not None and len(cursor) != 2:
+        cursor = None
+    try:
+        rows = _ranked_rows(match, cursor, backwards, per_page + 1)
+    except DatabaseError:
+        return SearchResults([])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+    posts = Post.objects.for_feed().in_bulk([post_id for _, post_id in rows])
+    results = SearchResults([
+        posts[post_id] for _, post_id in rows if post_id in posts
+    ])
+    has_previous = has_more if backwards else cursor is not None
+    has_next = True if backwards else has_more
+    if rows and has_previous:
+        results.previous_cursor = encode_cursor(list(rows[0]))
+    if rows and has_next:
+        results.next_cursor = encode_cursor(list(rows[-1]))
+    return results
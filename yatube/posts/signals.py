@@ -0,0 +1,177 @@
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models.signals import (post_delete, post_migrate, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import (cards, counters, feed_cache, objects, search, suggestions,
+               thumbnails, timeline)
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Post)
+def push_post_to_timelines(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.push_post(instance)
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clean_timeline(sender, instance, **kwargs):
+    timeline.remove(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+def add_follow_to_graph(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        suggestions.follow_added(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def remove_follow_from_graph(sender, instance, **kwargs):
+    suggestions.follow_removed(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change(instance.author_id, followers_count=1)
+        counters.change(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.change(instance.author_id, followers_count=-1)
+    counters.change(instance.user_id, following_count=-1)
+
+
+@receiver(post_save, sender=Post)
+def refresh_edited_post_card(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        cards.bump_version(pk=instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def refresh_commented_post_card(sender, instance, raw=False, **kwargs):
+    if not raw:
+        cards.bump_version(pk=instance.post_id)
+
+
+@receiver(post_save, sender=Group)
+def refresh_group_post_cards(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        cards.bump_version(group=instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_state(sender, instance, raw=False, **kwargs):
+    instance._previous_group_slug = None
+    instance._previous_image = None
+    # Новая загрузка добавит ссылку при сохранении поля, даже если
+    # содержимое (а значит, и имя) совпадёт с прежней картинкой.
+    instance._image_uploaded = bool(instance.image) \
+        and not instance.image._committed
+    if instance.pk and not raw:
+        previous = Post.objects.filter(pk=instance.pk).values_list(
+            'group__slug', 'image'
+        ).first()
+        if previous is not None:
+            instance._previous_group_slug, instance._previous_image = previous
+
+
+@receiver(post_save, sender=Post)
+def release_replaced_image(sender, instance, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_image', None)
+    replaced = getattr(instance, '_image_uploaded', False) \
+        or previous != instance.image.name
+    if previous and not raw and replaced:
+        thumbnails.release(previous)
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    if instance.image:
+        thumbnails.release(instance.image.name)
+
+
+@receiver(post_save, sender=Post)
+def invalidate_post_feeds(sender, instance, raw=False, **kwargs):
+    if not raw:
+        previous = getattr(instance, '_previous_group_slug', None)
+        feed_cache.invalidate_post(instance, previous)
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_deleted_post_feeds(sender, instance, **kwargs):
+    feed_cache.invalidate_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_commented_post_feeds(sender, instance, raw=False, **kwargs):
+    if not raw:
+        feed_cache.invalidate_post(instance.post)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_profiles(sender, instance, raw=False, **kwargs):
+    if not raw:
+        feed_cache.invalidate(index=False, authors=[
+            instance.user.username, instance.author.username
+        ])
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group_feeds(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        authors = Post.objects.filter(group=instance).values_list(
+            'author__username', flat=True
+        ).distinct()
+        feed_cache.invalidate(groups=[instance.slug], authors=authors)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_cached_post(sender, instance, **kwargs):
+    objects.invalidate(objects.POST, instance.pk)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_cached_group(sender, instance, **kwargs):
+    objects.invalidate(objects.GROUP, instance.slug)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    objects.invalidate(objects.USER, instance.username)
+
+
+@receiver(post_migrate)
+def install_search_triggers(sender, using, **kwargs):
+    connection = connections[using]
+    if sender.name != 'posts' or connection.vendor != 'sqlite':
+        return
+    if search.TABLE in connection.introspection.table_names():
+        search.install_triggers(connection)
@@ -0,0 +1,130 @@
+"""Хранилище картинок постов с адресацией по содержимому.
+
+Файл сохраняется под SHA-256 своего содержимого:
+``posts/3a/3a7bd3e2...9c.jpg``. Хэш считается по ходу записи во
+временный файл рядом с целевым, за один проход по загрузке; если такой
+файл уже есть, временный удаляется. Одна и та же картинка, выложенная
+многими пользователями, хранится один раз, а варианты и миниатюры,
+которые строятся по имени файла, тоже получаются общими.
+
+Сколько постов ссылается на файл, хранит ``StoredFile``: сохранение
+увеличивает счётчик, ``delete`` уменьшает, а сам файл удаляется после
+коммита, только если ссылок не осталось. Файлы, записанные до этого
+хранилища, учитываются так же — их счётчики заполнила миграция.
+Расхождения (например, после импорта) исправляет команда
+``reconcile_images``.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils.deconstruct import deconstructible
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _stored_files():
+    # models.py импортирует этот модуль ради поля image.
+    from .models import StoredFile
+    return StoredFile.objects
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # Итоговое имя определяет содержимое, а не имя загрузки.
+        return name
+
+    def hashed_name(self, name, digest):
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return f'{directory}/{digest[:2]}/{digest}{extension}'.lstrip('/')
+
+    def _save(self, name, content):
+        directory = os.path.dirname(self.path(name))
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temporary = tempfile.mkstemp(prefix='.upload-', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks(CHUNK_SIZE):
+                    digest.update(chunk)
+                    file.write(chunk)
+            stored = self.hashed_name(name, digest.hexdigest())
+            self.retain(stored)
+            path = self.path(stored)
+            if os.path.exists(path):
+                os.remove(temporary)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(temporary, path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(path, self.file_permissions_mode)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        return stored
+
+    def retain(self, name):
+        """Добавляет ссылку на файл ``name``."""
+        files = _stored_files()
+        if not files.filter(name=name).update(references=F('references') + 1):
+            _, created = files.get_or_create(name=name,
+                                             defaults={'references': 1})
+            if not created:
+                files.filter(name=name).update(
+                    references=F('references') + 1
+                )
+
+    def release(self, name):
+        """Убирает ссылку на файл; True, если она была последней.
+
+        На файлы без счётчика ссылки неизвестны, и они не трогаются.
+        """
+        files = _stored_files()
+        with transaction.atomic():
+            if not files.filter(name=name).update(
+                    references=F('references') - 1):
+                return False
+            deleted, _ = files.filter(name=name, references__lte=0).delete()
+        return bool(deleted)
+
+    def purge(self, name):
+        """Удаляет файл, если на него так и не появилось новых ссылок."""
+        if _stored_files().filter(name=name).exists():
+            return False
+        super().delete(name)
+        return True
+
+    def delete(self, name):
+        if self.release(name):
+            transaction.on_commit(lambda: self.purge(name))
+
+
+def recount(queryset, field):
+    """Пересчитывает ссылки по значениям ``field`` в ``queryset``.
+
+    Возвращает число исправленных счётчиков.
+    """
+    files = _stored_files()
+    actual = dict(
+        queryset.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+        .order_by().values_list(field).annotate(count=Count('pk'))
+    )
+    stored = dict(files.values_list('name', 'references'))
+    fixed = 0
+    for name, count in actual.items():
+        if stored.get(name) != count:
+            files.update_or_create(name=name, defaults={'references': count})
+            fixed += 1
+    orphaned = set(stored) - set(actual)
+    if orphaned:
+        files.filter(name__in=orphaned).delete()
+        fixed += len(orphaned)
+    return fixed
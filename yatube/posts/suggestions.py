@@ -0,0 +1,214 @@
+"""«Кого почитать»: авторы, на которых подписаны ваши подписки.
+
+Граф подписок держится в памяти процесса в виде CSR — трёх массивов
+``array`` с id пользователей: ``users`` (отсортированные id тех, кто на
+кого-то подписан), ``offsets`` и ``targets``, так что подписки
+``users[i]`` — это ``targets[offsets[i]:offsets[i + 1]]``. Подписка
+занимает 8 байт, а не сотню с лишним, как в множествах Python. Граф
+строится одним проходом по индексу ``follow_unique``.
+
+Кандидаты для пользователя — подписки его подписок, кроме его самого и
+тех, на кого он уже подписан. Чем больше подписок пользователя следят за
+кандидатом, тем выше кандидат в списке.
+
+Подписки и отписки этого процесса применяются к графу после коммита,
+поверх CSR (``added``/``removed``), так что откаченная подписка в граф не
+попадает; когда таких изменений набирается ``MAX_CHANGES``, граф
+перестраивается. Изменения из других процессов граф увидит после
+перестройки раз в ``POSTS_SUGGESTIONS_GRAPH_MAX_AGE`` секунд, поэтому
+перед кэшированием из списка убираются авторы, на которых пользователь
+уже подписан. Готовый список пользователя кэшируется на
+``POSTS_SUGGESTIONS_CACHE_TIMEOUT`` и сбрасывается, когда он сам
+подписывается или отписывается.
+"""
+import heapq
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+
+from yatube.replicas import primary
+
+from .models import Follow
+
+User = get_user_model()
+
+MAX_CHANGES = 10000
+CHUNK_SIZE = 10000
+
+
+class FollowGraph:
+    """Граф подписок: CSR и изменения поверх него."""
+
+    def __init__(self, edges):
+        """``edges`` — пары (подписчик, автор), по возрастанию."""
+        self.users = array('q')
+        self.offsets = array('q', [0])
+        self.targets = array('q')
+        current = None
+        for user_id, author_id in edges:
+            if user_id != current:
+                if current is not None:
+                    self.offsets.append(len(self.targets))
+                self.users.append(user_id)
+                current = user_id
+            self.targets.append(author_id)
+        if current is not None:
+            self.offsets.append(len(self.targets))
+        self.added = {}
+        self.removed = set()
+        self.changes = 0
+        self.built = time.monotonic()
+        # Изменения приходят из разных потоков, пока другие их читают.
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls):
+        # Граф живёт в процессе минуты: строим его по основной базе.
+        with primary():
+            edges = Follow.objects.order_by(
+                'user_id', 'author_id'
+            ).values_list('user_id', 'author_id')
+            return cls(edges.iterator(chunk_size=CHUNK_SIZE))
+
+    def is_stale(self):
+        age = time.monotonic() - self.built
+        return (self.changes >= MAX_CHANGES
+                or age > settings.POSTS_SUGGESTIONS_GRAPH_MAX_AGE)
+
+    def _row(self, user_id):
+        """Подписки ``user_id`` в CSR, по возрастанию id."""
+        index = bisect_left(self.users, user_id)
+        if index < len(self.users) and self.users[index] == user_id:
+            return self.targets[self.offsets[index]:self.offsets[index + 1]]
+        return ()
+
+    def _in_row(self, user_id, author_id):
+        row = self._row(user_id)
+        index = bisect_left(row, author_id)
+        return index < len(row) and row[index] == author_id
+
+    def following(self, user_id):
+        """id авторов, на которых подписан ``user_id``."""
+        row = self._row(user_id)
+        if self.removed:
+            row = [author_id for author_id in row
+                   if (user_id, author_id) not in self.removed]
+        return [*row, *self.added.get(user_id, ())]
+
+    # Граф мог быть построен уже после изменения, поэтому ``add`` и
+    # ``remove`` сверяются с CSR и не удваивают подписку.
+
+    def add(self, user_id, author_id):
+        with self.lock:
+            if self._in_row(user_id, author_id):
+                self.removed.discard((user_id, author_id))
+            else:
+                self.added.setdefault(user_id, set()).add(author_id)
+            self.changes += 1
+
+    def remove(self, user_id, author_id):
+        with self.lock:
+            if self._in_row(user_id, author_id):
+                self.removed.add((user_id, author_id))
+            else:
+                self.added.get(user_id, set()).discard(author_id)
+            self.changes += 1
+
+    def suggest(self, user_id, limit):
+        """До ``limit`` пар (автор, сколько подписок на него подписано)."""
+        with self.lock:
+            following = self.following(user_id)
+            overlap = Counter()
+            for followed_id in following:
+                overlap.update(self.following(followed_id))
+        for excluded in (*following, user_id):
+            overlap.pop(excluded, None)
+        return heapq.nsmallest(limit, overlap.items(),
+                               key=lambda item: (-item[1], item[0]))
+
+
+_graph = None
+_lock = threading.Lock()
+
+
+def get_graph():
+    """Граф процесса; строится при первом обращении и когда устарел."""
+    global _graph
+    graph = _graph
+    if graph is None or graph.is_stale():
+        with _lock:
+            if _graph is graph:
+                _graph = FollowGraph.load()
+            graph = _graph
+    return graph
+
+
+def reset():
+    """Забывает граф процесса; следующее обращение построит новый."""
+    global _graph
+    _graph = None
+
+
+def cache_key(user_id):
+    return f'suggestions:{user_id}'
+
+
+def _on_commit(change, user_id, author_id):
+    def apply():
+        # Под общей блокировкой: изменение не должно потеряться, пока
+        # get_graph строит новый граф.
+        with _lock:
+            if _graph is not None:
+                change(_graph, user_id, author_id)
+        cache.delete(cache_key(user_id))
+
+    transaction.on_commit(apply)
+
+
+def follow_added(user_id, author_id):
+    _on_commit(FollowGraph.add, user_id, author_id)
+
+
+def follow_removed(user_id, author_id):
+    _on_commit(FollowGraph.remove, user_id, author_id)
+
+
+def for_user(user):
+    """Рекомендованные авторы; у каждого в ``overlap`` — сколько ваших
+    подписок на него подписано.
+    """
+    key = cache_key(user.pk)
+    ranked = cache.get(key)
+    if ranked is None:
+        ranked = get_graph().suggest(user.pk,
+                                     settings.POSTS_SUGGESTIONS_COUNT)
+        if ranked:
+            # Граф этого процесса не видит подписок, сделанных в других;
+            # уже читаемых авторов убираем по индексу follow_unique.
+            with primary():
+                followed = set(Follow.objects.filter(
+                    user_id=user.pk,
+                    author_id__in=[author_id for author_id, _ in ranked],
+                ).values_list('author_id', flat=True))
+            ranked = [(author_id, overlap) for author_id, overlap in ranked
+                      if author_id not in followed]
+        cache.set(key, ranked, settings.POSTS_SUGGESTIONS_CACHE_TIMEOUT)
+    if not ranked:
+        return []
+    authors = User.objects.only(
+        'username', 'first_name', 'last_name'
+    ).in_bulk([author_id for author_id, _ in ranked])
+    suggestions = []
+    for author_id, overlap in ranked:
+        author = authors.get(author_id)
+        if author is not None:
+            author.overlap = overlap
+            suggestions.append(author)
+    return suggestions
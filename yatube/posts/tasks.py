@@ -0,0 +1,17 @@
+"""Фоновые задачи постов для очереди ``jobs``."""
+from jobs.queue import task
+
+from . import thumbnails, timeline
+from .models import Post
+
+
+@task
+def generate_thumbnail(post_id):
+    thumbnails.generate_for_post(post_id)
+
+
+@task
+def fan_out_post(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        timeline.fan_out(post)
@@ -0,0 +1,14 @@
+from django import template
+
+from .. import thumbnails
+
+register = template.Library()
+
+
+@register.filter
+def ready_thumbnail(post):
+    """Готовая миниатюра картинки поста; если её нет — ставит в очередь."""
+    thumbnail = thumbnails.ready_thumbnail(post.image)
+    if thumbnail is None:
+        thumbnails.schedule_missing(post)
+    return thumbnail
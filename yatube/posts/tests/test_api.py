@@ -0,0 +1,126 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username='author',
+                                          first_name='Лев')
+        self.reader = User.objects.create(username='reader')
+        self.group = Group.objects.create(title='Коты', slug='cats')
+        self.posts = [
+            Post.objects.create(text=f'Пост {i}', author=self.author,
+                                group=self.group)
+            for i in range(5)
+        ]
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def get(self, name, *args, **params):
+        return self.client.get(reverse(name, args=args), params)
+
+    def test_feeds_embed_author_and_group(self):
+        """Ленты отдают посты с автором и группой в одном запросе."""
+
+        urls = (
+            ('api_index',),
+            ('api_group_posts', 'cats'),
+            ('api_profile', 'author'),
+            ('api_follow_index',),
+        )
+        for name, *args in urls:
+            with self.subTest(name=name):
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.get(name, *args)
+                first = response.json()['results'][0]
+                self.assertEqual(first['text'], 'Пост 4')
+                self.assertEqual(first['author'],
+                                 {'username': 'author', 'full_name': 'Лев'})
+                self.assertEqual(first['group'],
+                                 {'slug': 'cats', 'title': 'Коты'})
+                post_queries = [query for query in queries.captured_queries
+                                if 'FROM "posts_post"' in query['sql']]
+                self.assertEqual(len(post_queries), 1)
+
+    @override_settings(POSTS_PER_PAGE=2)
+    def test_cursor_pagination(self):
+        """Курсоры next/previous проходят ленту без пропусков."""
+
+        texts = []
+        cursor = None
+        while True:
+            params = {'after': cursor} if cursor else {}
+            data = self.get('api_index', fields='text', **params).json()
+            texts += [post['text'] for post in data['results']]
+            cursor = data['next']
+            if cursor is None:
+                break
+        self.assertEqual(texts, [f'Пост {i}' for i in range(4, -1, -1)])
+
+        data = self.get('api_index', before=data['previous']).json()
+        self.assertEqual([post['text'] for post in data['results']],
+                         ['Пост 2', 'Пост 1'])
+
+        response = self.get('api_index', after='испорчен')
+        self.assertEqual(response.status_code, 400)
+
+    def test_field_selection(self):
+        """?fields= оставляет только запрошенные поля."""
+
+        data = self.get('api_index', fields='id,text', limit=1).json()
+        self.assertEqual(data['results'],
+                         [{'id': self.posts[-1].pk, 'text': 'Пост 4'}])
+
+        response = self.get('api_index', fields='text,password')
+        self.assertEqual(response.status_code, 400)
+
+    def test_etag_not_modified(self):
+        """Совпавший If-None-Match даёт 304, новый пост меняет ETag."""
+
+        url = reverse('api_profile', args=['author'])
+        etag = self.client.get(url)['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        Post.objects.create(text='Новый', author=self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_post_comments(self):
+        """Комментарии поста отдаются страницами с автором."""
+
+        post = self.posts[0]
+        for i in range(3):
+            Comment.objects.create(post=post, author=self.reader,
+                                   text=f'Комментарий {i}')
+
+        data = self.get('api_post_comments', post.pk, limit=2).json()
+
+        self.assertEqual([comment['text'] for comment in data['results']],
+                         ['Комментарий 2', 'Комментарий 1'])
+        self.assertEqual(data['results'][0]['author']['username'], 'reader')
+        self.assertIsNotNone(data['next'])
+        self.assertEqual(
+            self.get('api_post_comments', 999).status_code, 404
+        )
+
+    def test_follow_feed_requires_login(self):
+        """Лента подписок без авторизации отвечает 401."""
+
+        response = Client().get(reverse('api_follow_index'))
+
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,91 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class PostCardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username='author')
+        self.group = Group.objects.create(title='Группа', slug='group')
+        self.post = Post.objects.create(
+            text='Исходный текст', author=self.author, group=self.group
+        )
+        self.url = reverse('profile', kwargs={'username': 'author'})
+        self.client = Client()
+
+    def test_card_is_served_from_cache(self):
+        """Без смены версии карточка берётся из кэша."""
+
+        self.client.get(self.url)
+        Post.objects.filter(pk=self.post.pk).update(text='Тихая правка')
+
+        response = self.client.get(self.url)
+
+        self.assertContains(response, 'Исходный текст')
+
+    def test_edit_comment_and_group_rename_refresh_card(self):
+        """Правка поста, комментарий и переименование группы
+        сбрасывают карточку.
+        """
+        posts = Post.objects.filter(pk=self.post.pk)
+        groups = Group.objects.filter(pk=self.group.pk)
+        changes = {
+            'edit': (
+                lambda: posts.update(text='Правка через save'),
+                lambda: posts.get().save(),
+                'Правка через save',
+            ),
+            'comment': (
+                lambda: None,
+                lambda: Comment.objects.create(
+                    post=self.post, author=self.author, text='Да'),
+                'Комментариев: 1',
+            ),
+            'group': (
+                lambda: groups.update(title='Новое название'),
+                lambda: groups.get().save(),
+                '#Новое название',
+            ),
+        }
+
+        for name, (silent_change, change, expected) in changes.items():
+            with self.subTest(change=name):
+                self.client.get(self.url)
+                silent_change()
+                self.assertNotContains(self.client.get(self.url), expected)
+                change()
+
+                response = self.client.get(self.url)
+
+                self.assertContains(response, expected)
+
+    def test_edit_link_is_rendered_per_viewer(self):
+        """Ссылка «Редактировать» не попадает в общую карточку."""
+
+        edit_url = reverse('post_edit', kwargs={
+            'username': 'author', 'post_id': self.post.pk})
+        author_client = Client()
+        author_client.force_login(self.author)
+
+        self.assertContains(author_client.get(self.url), edit_url)
+        self.assertNotContains(self.client.get(self.url), edit_url)
+
+    def test_edit_with_stale_version_does_not_roll_it_back(self):
+        """Правка поста, загруженного до комментария, не откатывает
+        версию карточки.
+        """
+        stale = Post.objects.get(pk=self.post.pk)
+        Comment.objects.create(post=self.post, author=self.author, text='Да')
+        self.client.get(self.url)
+
+        stale.text = 'Новый текст'
+        stale.save()
+
+        self.assertEqual(Post.objects.get(pk=self.post.pk).card_version, 2)
+        self.assertContains(self.client.get(self.url), 'Новый текст')
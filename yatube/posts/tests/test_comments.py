@@ -0,0 +1,74 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import objects
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(POSTS_COMMENTS_PER_PAGE=2)
+class CommentPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username='author')
+        self.post = Post.objects.create(text='Текст', author=self.author)
+        self.client = Client()
+        self.url = reverse('post', args=['author', self.post.pk])
+
+    def add_comments(self, count):
+        start = self.post.comments.count()
+        for i in range(start, start + count):
+            commenter = User.objects.create(username=f'reader{i}')
+            Comment.objects.create(post=self.post, author=commenter,
+                                   text=f'Комментарий {i}')
+
+    def texts(self, response):
+        return re.findall(r'Комментарий \d+', response.content.decode())
+
+    def test_post_page_shows_first_batch(self):
+        """Страница поста показывает первую пачку свежих комментариев."""
+
+        self.add_comments(5)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(self.texts(response),
+                         ['Комментарий 4', 'Комментарий 3'])
+        self.assertContains(response, 'js-more-comments')
+
+    def test_load_more_fragment(self):
+        """Фрагмент «Показать ещё» отдаёт следующие пачки до конца."""
+
+        self.add_comments(5)
+        texts = []
+        url = self.url
+        while url:
+            response = self.client.get(url)
+            texts += self.texts(response)
+            more = re.search(r'data-url="([^"]+)"', response.content.decode())
+            url = more and more.group(1).replace('&amp;', '&')
+        self.assertEqual(texts, [f'Комментарий {i}' for i in range(4, -1, -1)])
+        self.assertNotContains(response, '<html>')
+
+    def test_query_count_does_not_depend_on_comments(self):
+        """Число запросов страницы поста не растёт с числом комментариев."""
+
+        def count_queries():
+            cache.clear()
+            objects.local.clear()
+            with CaptureQueriesContext(connection) as context:
+                self.client.get(self.url)
+            return len(context)
+
+        self.add_comments(2)
+        count_queries()  # первый запрос заводит счётчики автора
+        expected = count_queries()
+        self.add_comments(10)
+        self.assertEqual(count_queries(), expected)
@@ -0,0 +1,98 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import http_date
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username='author')
+        self.group = Group.objects.create(title='Коты', slug='cats')
+        self.post = Post.objects.create(text='Текст', author=self.author,
+                                        group=self.group)
+        self.client = Client()
+        self.client.force_login(self.author)
+        self.urls = (
+            reverse('profile', args=['author']),
+            reverse('group_name', args=['cats']),
+            reverse('post', args=['author', self.post.pk]),
+        )
+
+    def test_unchanged_page_not_modified(self):
+        """Неизменная страница отдаёт 304 без запроса постов и рендера."""
+
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response['Cache-Control'],
+                                 'private, no-cache')
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag']
+                    )
+                self.assertEqual(response.status_code, 304)
+                for query in queries.captured_queries:
+                    self.assertNotIn('"posts_post"."text"', query['sql'])
+                    if 'FROM "posts_post"' in query['sql']:
+                        self.assertNotRegex(query['sql'], r'(COUNT|MAX|SUM)\(')
+
+    def test_if_modified_since_is_ignored(self):
+        """Без Last-Modified страница не устаревает по одной дате."""
+
+        url = reverse('profile', args=['author'])
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        if_modified_since = http_date(time.time() + 60)
+
+        Follow.objects.create(
+            user=User.objects.create(username='reader'), author=self.author
+        )
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=if_modified_since
+        )
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_changes_invalidate_etag(self):
+        """Правка поста и комментарий меняют ETag страниц."""
+
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        old_modified = self.post.modified
+
+        self.client.post(
+            reverse('post_edit', args=['author', self.post.pk]),
+            {'text': 'Новый текст', 'group': self.group.pk},
+        )
+        self.post.refresh_from_db()
+        self.assertGreater(self.post.modified, old_modified)
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+        url = self.urls[2]
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='Комментарий')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Комментарий')
+
+    def test_etag_depends_on_viewer(self):
+        """Другой посетитель не получает чужую версию страницы."""
+
+        url = self.urls[0]
+        etag = self.client.get(url)['ETag']
+
+        response = Client().get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
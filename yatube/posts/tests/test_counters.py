@@ -0,0 +1,85 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from yatube import replicas
+
+from .. import counters
+from ..models import Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class UserStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username='author')
+        self.reader = User.objects.create(username='reader')
+
+    def test_first_read_counts_existing_rows(self):
+        """Первое чтение считает счётчики по базе."""
+
+        Post.objects.create(text='Текст', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+
+        stats = counters.get_stats(self.author)
+
+        self.assertEqual(
+            (stats.followers_count, stats.following_count, stats.posts_count),
+            (1, 0, 1)
+        )
+
+    def test_first_read_does_not_stick_to_primary(self):
+        """Строка счётчиков, созданная при GET, не закрепляет посетителя
+        за основной базой.
+        """
+        response = Client().get(reverse('profile', args=['author']))
+
+        self.assertTrue(UserStats.objects.filter(user=self.author).exists())
+        self.assertNotIn(replicas.COOKIE_NAME, response.cookies)
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются при создании и удалении Follow и Post."""
+
+        counters.get_stats(self.author)
+        counters.get_stats(self.reader)
+
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Текст', author=self.author)
+        self.assertEqual(counters.get_stats(self.author).followers_count, 1)
+        self.assertEqual(counters.get_stats(self.reader).following_count, 1)
+        self.assertEqual(counters.get_stats(self.author).posts_count, 1)
+
+        follow.delete()
+        post.delete()
+        self.assertEqual(counters.get_stats(self.author).followers_count, 0)
+        self.assertEqual(counters.get_stats(self.reader).following_count, 0)
+        self.assertEqual(counters.get_stats(self.author).posts_count, 0)
+
+    def test_reconcile_counters_fixes_drift(self):
+        """Команда reconcile_counters исправляет разошедшиеся значения."""
+
+        Post.objects.create(text='Текст', author=self.author)
+        counters.get_stats(self.author)
+        UserStats.objects.filter(user=self.author).update(posts_count=42)
+
+        call_command('reconcile_counters', chunk_size=1, stdout=StringIO())
+
+        self.assertEqual(counters.get_stats(self.author).posts_count, 1)
+        self.assertTrue(UserStats.objects.filter(user=self.reader).exists())
+
+    def test_profile_shows_stored_counters(self):
+        """Карточка автора берёт значения из UserStats."""
+
+        counters.get_stats(self.author)
+        UserStats.objects.filter(user=self.author).update(followers_count=7)
+
+        response = Client().get(
+            reverse('profile', kwargs={'username': self.author.username})
+        )
+
+        self.assertContains(response, 'Подписчиков: 7')
@@ -0,0 +1,136 @@
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.http import StreamingHttpResponse
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR))
+class ExportTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.reader = User.objects.create(username='reader')
+        group = Group.objects.create(title='Коты', slug='cats')
+        self.post = Post.objects.create(
+            text='Пост с картинкой', author=self.author, group=group,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        Post.objects.create(text='Пост без группы', author=self.author)
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='Свой комментарий')
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Чужой комментарий')
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def export(self, file_format, client=None):
+        response = (client or self.client).get(
+            reverse('export_posts', args=['author']), {'format': file_format}
+        )
+        self.assertIsInstance(response, StreamingHttpResponse)
+        return b''.join(response.streaming_content)
+
+    def test_jsonl_export(self):
+        """JSONL содержит посты и комментарии автора в формате импорта."""
+
+        records = [json.loads(line)
+                   for line in self.export('jsonl').decode().splitlines()]
+
+        self.assertEqual(
+            [(record['type'], record['text']) for record in records],
+            [('post', 'Пост с картинкой'), ('post', 'Пост без группы'),
+             ('comment', 'Свой комментарий')]
+        )
+        self.assertEqual(records[0]['group'], 'cats')
+        self.assertEqual(records[0]['image'], self.post.image.name)
+        self.assertEqual(records[2]['post'], self.post.pk)
+
+    def test_csv_export(self):
+        """CSV выгружает те же записи с заголовком."""
+
+        rows = list(csv.DictReader(
+            io.StringIO(self.export('csv').decode())
+        ))
+
+        self.assertEqual([row['type'] for row in rows],
+                         ['post', 'post', 'comment'])
+        self.assertEqual(rows[1]['group'], '')
+
+    def test_zip_export_contains_images(self):
+        """Архив содержит записи и картинки постов."""
+
+        archive = zipfile.ZipFile(io.BytesIO(self.export('zip')))
+
+        self.assertEqual(
+            archive.namelist(),
+            ['content.jsonl', f'images/{self.post.image.name}']
+        )
+        self.assertEqual(
+            archive.read(f'images/{self.post.image.name}'), SMALL_GIF
+        )
+        self.assertEqual(
+            len(archive.read('content.jsonl').decode().splitlines()), 3
+        )
+
+    def test_export_access(self):
+        """Чужую выгрузку видит только персонал."""
+
+        reader = Client()
+        reader.force_login(self.reader)
+        response = reader.get(reverse('export_posts', args=['author']))
+        self.assertRedirects(response, reverse('profile', args=['author']))
+
+        self.reader.is_staff = True
+        self.reader.save()
+        self.assertTrue(self.export('jsonl', client=reader))
+
+        response = self.client.get(reverse('export_posts', args=['author']),
+                                   {'format': 'xml'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_command_round_trip(self):
+        """Выгрузку команды можно загрузить обратно через import_content."""
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, 'author.jsonl')
+        call_command('export_content', 'author', output=path,
+                     stdout=io.StringIO())
+        Post.objects.filter(author=self.author).delete()
+
+        call_command('import_content', path, stdout=io.StringIO())
+
+        self.assertEqual(
+            set(self.author.posts.values_list('text', flat=True)),
+            {'Пост с картинкой', 'Пост без группы'}
+        )
+        self.assertTrue(Comment.objects.filter(
+            post=self.post.pk, text='Свой комментарий').exists())
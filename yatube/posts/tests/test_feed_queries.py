@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import counters, objects, suggestions
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedQueryCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        counters.get_stats(cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def add_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(
+                text=str(i), author=self.author, group=self.group
+            )
+            Comment.objects.create(post=post, author=self.reader, text='Да')
+
+    def count_queries(self, url):
+        cache.clear()
+        objects.local.clear()
+        suggestions.reset()
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        return len(context)
+
+    def test_feed_query_count_does_not_depend_on_posts(self):
+        """Число запросов ленты не зависит от числа постов на странице."""
+
+        urls = (
+            reverse('index'),
+            reverse('group_name', kwargs={'slug': self.group.slug}),
+            reverse('profile', kwargs={'username': self.author.username}),
+            reverse('follow_index'),
+        )
+        self.add_posts(1)
+        expected = {url: self.count_queries(url) for url in urls}
+        self.add_posts(9)
+
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), expected[url])
+
+    def test_feed_cards_show_comment_count(self):
+        """Карточка показывает число комментариев из аннотации."""
+
+        self.add_posts(1)
+        cache.clear()
+
+        response = self.client.get(reverse('index'))
+
+        self.assertEqual(response.context['page'][0].comment_count, 1)
+        self.assertContains(response, 'Комментариев: 1')
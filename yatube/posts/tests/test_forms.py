@@ -69,7 +69,8 @@ class PostFormTests(TestCase):
                 text=form_data['text'],
                 author=self.user,
                 group=form_data['group'],
-                image='posts/small.gif',
+                image__startswith='posts/',
+                image__endswith='.gif',
             ).exists()
         )
 
@@ -0,0 +1,104 @@
+import io
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import images
+from ..models import Post
+
+User = get_user_model()
+
+ORIENTATION = 0x0112
+
+
+def make_image(name, size, mode='RGB', image_format='JPEG', color='red',
+               **options):
+    buffer = io.BytesIO()
+    Image.new(mode, size, color).save(buffer, image_format, **options)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+def rotated_photo(size):
+    exif = Image.Exif()
+    exif[ORIENTATION] = 6  # повернуть на 90° по часовой стрелке
+    exif[0x010F] = 'Телефон'
+    return make_image('photo.jpeg', size, exif=exif.tobytes())
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR),
+                   POSTS_IMAGE_MAX_SIDE=200, POSTS_IMAGE_VARIANTS=(40, 80))
+class ImageNormalizationTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='author')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_photo_is_rotated_capped_and_stripped(self):
+        """Фото поворачивается по EXIF, уменьшается и теряет EXIF."""
+
+        result = images.normalize(rotated_photo((600, 300)))
+
+        self.assertEqual(result.name, 'photo.jpg')
+        with Image.open(result) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (100, 200))
+            self.assertNotIn(ORIENTATION, image.getexif())
+            self.assertFalse(image.info.get('exif'))
+
+    def test_transparent_image_becomes_webp(self):
+        """Картинка с прозрачностью перекодируется в WebP."""
+
+        upload = make_image('logo.png', (50, 50), 'RGBA', 'PNG',
+                            color=(255, 0, 0, 128))
+
+        result = images.normalize(upload)
+
+        self.assertEqual(result.name, 'logo.webp')
+        with Image.open(result) as image:
+            self.assertEqual(image.format, 'WEBP')
+            self.assertEqual(image.mode, 'RGBA')
+
+    def test_gif_is_untouched(self):
+        """GIF сохраняется как есть."""
+
+        upload = make_image('anim.gif', (300, 300), 'P', 'GIF', color=1)
+
+        self.assertIs(images.normalize(upload), upload)
+
+    @override_settings(POSTS_THUMBNAILS_ASYNC=False)
+    def test_new_post_stores_normalized_image_and_variants(self):
+        """Пост хранит обработанную картинку и её варианты."""
+
+        self.client.post(reverse('new_post'), {
+            'text': 'Фото', 'image': rotated_photo((600, 300)),
+        })
+        post = Post.objects.get(text='Фото')
+
+        self.assertRegex(post.image.name, r'^posts/\w{2}/\w{64}\.jpg$')
+        for width in (40, 80):
+            name = images.variant_name(post.image.name, width)
+            with default_storage.open(name) as file, \
+                    Image.open(file) as variant:
+                self.assertEqual(variant.format, 'WEBP')
+                self.assertEqual(variant.width, width)
+        data = self.client.get(reverse('api_index'),
+                               {'fields': 'image_variants'}).json()
+        root = post.image.name[:-len('.jpg')]
+        self.assertEqual(
+            data['results'][0]['image_variants'],
+            {'40': f'/media/{root}.40w.webp', '80': f'/media/{root}.80w.webp'}
+        )
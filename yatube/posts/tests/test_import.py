@@ -0,0 +1,148 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from .. import search
+from ..importer import LRUCache
+from ..models import Comment, Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+
+RECORDS = [
+    {'type': 'group', 'slug': 'cats', 'title': 'Коты'},
+    {'type': 'post', 'id': 101, 'author': 'author', 'text': 'Первый кот',
+     'group': 'cats', 'pub_date': '2015-03-01T10:00:00+00:00'},
+    {'type': 'post', 'id': 102, 'author': 'author', 'text': 'Второй кот',
+     'pub_date': '2016-03-01T10:00:00'},
+    {'type': 'comment', 'post': 101, 'author': 'reader', 'text': 'Мяу',
+     'created': '2015-03-02T10:00:00+00:00'},
+    {'type': 'comment', 'post': 999, 'author': 'reader', 'text': 'Мимо'},
+    {'type': 'follow', 'user': 'reader', 'author': 'author'},
+    {'type': 'follow', 'user': 'reader', 'author': 'author'},
+]
+
+
+class ImportContentTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        User.objects.create(username='author')
+        User.objects.create(username='reader')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write_jsonl(self, records, name='data.jsonl'):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            for record in records:
+                file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        return path
+
+    def import_file(self, path, **options):
+        call_command('import_content', path, stdout=StringIO(), **options)
+
+    def test_jsonl_import(self):
+        """Импорт JSONL создаёт записи и сохраняет даты источника."""
+
+        self.import_file(self.write_jsonl(RECORDS), batch_size=2)
+
+        post = Post.objects.get(pk=101)
+        self.assertEqual(post.group, Group.objects.get(slug='cats'))
+        self.assertEqual(
+            post.pub_date, datetime(2015, 3, 1, 10, tzinfo=timezone.utc)
+        )
+        self.assertEqual(Comment.objects.get().created.year, 2015)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user__username='reader').count(), 2
+        )
+        self.assertEqual(len(search.search('кот', 10)), 2)
+
+    def test_timestamps_are_restored_after_import(self):
+        """После импорта auto_now_add снова проставляет дату."""
+
+        self.import_file(self.write_jsonl(RECORDS))
+
+        post = Post.objects.create(
+            text='Новый', author=User.objects.get(username='author')
+        )
+        self.assertEqual(post.pub_date.year, datetime.now().year)
+
+    def test_csv_import_with_new_users(self):
+        """CSV импортируется, недостающие пользователи создаются."""
+
+        path = os.path.join(self.directory, 'data.csv')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('type,id,author,user,text,post\n'
+                       'post,7,newbie,,Привет,\n'
+                       'comment,,author,,Ответ,7\n'
+                       'follow,,newbie,author,,\n')
+
+        self.import_file(path, create_users=True)
+
+        newbie = User.objects.get(username='newbie')
+        self.assertFalse(newbie.has_usable_password())
+        self.assertEqual(Post.objects.get(pk=7).author, newbie)
+        self.assertEqual(Comment.objects.get().post_id, 7)
+        self.assertTrue(Follow.objects.filter(user__username='author',
+                                              author=newbie).exists())
+
+    def test_import_resumes_from_checkpoint(self):
+        """После ошибки импорт продолжается с контрольной точки."""
+
+        checkpoint = os.path.join(self.directory, 'checkpoint.json')
+        broken = self.write_jsonl(RECORDS[:3] + [{'type': 'unknown'}])
+
+        with self.assertRaises(CommandError):
+            self.import_file(broken, batch_size=2, checkpoint=checkpoint)
+        with open(checkpoint) as file:
+            self.assertEqual(json.load(file)['processed'], 2)
+
+        fixed = self.write_jsonl(RECORDS)
+        os.replace(fixed, broken)
+        self.import_file(broken, batch_size=2, checkpoint=checkpoint)
+
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(Group.objects.count(), 1)
+        self.assertFalse(os.path.exists(checkpoint))
+
+    def test_malformed_fields_are_format_errors(self):
+        """Поле неверного типа — ошибка формата с номером записи."""
+
+        malformed = {
+            'comment post': {'type': 'comment', 'post': 'сто один'},
+            'post id': {'type': 'post', 'id': 'x', 'author': 'author',
+                        'text': 'Текст'},
+            'pub_date': {'type': 'post', 'author': 'author', 'text': 'Текст',
+                         'pub_date': 20150301},
+            'created': {'type': 'comment', 'post': 101, 'author': 'reader',
+                        'created': ['2015']},
+            'bad date': {'type': 'post', 'author': 'author', 'text': 'Текст',
+                         'pub_date': '2015-13-45T10:00:00'},
+            'author': {'type': 'post', 'author': ['author'], 'text': 'Текст'},
+        }
+        for name, record in malformed.items():
+            with self.subTest(field=name):
+                broken = self.write_jsonl(RECORDS[:2] + [record])
+
+                with self.assertRaisesMessage(CommandError, 'запись 3'):
+                    self.import_file(broken)
+
+    def test_lru_cache_is_bounded(self):
+        """Кэш имён не растёт больше заданного размера."""
+
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(list(cache.data), ['a', 'c'])
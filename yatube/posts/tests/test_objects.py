@@ -0,0 +1,117 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import Http404
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import objects
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ObjectCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        objects.local.clear()
+        self.author = User.objects.create(username='author')
+        self.post = Post.objects.create(text='Текст', author=self.author)
+
+    def test_hit_skips_database(self):
+        """Повторный поиск поста не обращается к базе."""
+
+        objects.get_post_or_404('author', self.post.pk)
+        with self.assertNumQueries(0):
+            post = objects.get_post_or_404('author', self.post.pk)
+        self.assertEqual(post.author.username, 'author')
+
+        objects.local.clear()
+        with self.assertNumQueries(0):
+            objects.get_post_or_404('author', self.post.pk)
+
+    def test_copies_are_independent(self):
+        """Каждый вызов получает свою копию объекта."""
+
+        first = objects.get(objects.POST, self.post.pk)
+        first.text = 'Изменено'
+
+        self.assertEqual(objects.get(objects.POST, self.post.pk).text,
+                         'Текст')
+
+    def test_wrong_author_is_404(self):
+        """Пост ищется только вместе с именем автора из URL."""
+
+        with self.assertRaises(Http404):
+            objects.get_post_or_404('someone', self.post.pk)
+
+    def test_miss_is_cached_until_created(self):
+        """Промах кэшируется, создание объекта его сбрасывает."""
+
+        with self.assertRaises(Http404):
+            objects.get_group_or_404('cats')
+        with self.assertNumQueries(0), self.assertRaises(Http404):
+            objects.get_group_or_404('cats')
+
+        Group.objects.create(title='Коты', slug='cats')
+
+        self.assertEqual(objects.get_group_or_404('cats').title, 'Коты')
+
+    def test_signals_invalidate(self):
+        """Правка, комментарий и удаление сбрасывают закэшированный пост."""
+
+        objects.get(objects.POST, self.post.pk)
+        Comment.objects.create(post=self.post, author=self.author, text='Да')
+        self.assertEqual(
+            objects.get(objects.POST, self.post.pk).comment_count, 1
+        )
+
+        self.author.first_name = 'Лев'
+        self.author.save()
+        self.assertEqual(objects.get_user_or_404('author').first_name, 'Лев')
+
+        self.post.delete()
+        self.assertIsNone(objects.get(objects.POST, self.post.pk))
+
+    @override_settings(POSTS_OBJECT_CACHE_LOCAL_SIZE=2)
+    def test_local_cache_is_bounded(self):
+        """LRU процесса вытесняет самые давние записи."""
+
+        for username in ('a', 'b', 'c'):
+            objects.get(objects.USER, username)
+
+        self.assertIsNone(objects.local.get(objects.cache_key('user', 'a')))
+        self.assertIsNotNone(
+            objects.local.get(objects.cache_key('user', 'c'))
+        )
+
+    def test_views_use_cache(self):
+        """Страница поста и профиль находят объекты через кэш."""
+
+        client = Client()
+        url = reverse('post', args=['author', self.post.pk])
+        client.get(url)
+
+        self.assertEqual(client.get(url).status_code, 200)
+        self.assertEqual(
+            client.get(reverse('post', args=['other', self.post.pk]))
+            .status_code, 404
+        )
+        self.assertEqual(
+            client.get(reverse('profile', args=['nobody'])).status_code, 404
+        )
+
+    def test_edit_reads_post_from_database(self):
+        """Правка поста не записывает обратно устаревшую копию из кэша."""
+
+        objects.get(objects.POST, self.post.pk)
+        # Изменение из другого процесса, которое этот кэш ещё не видел.
+        Post.objects.filter(pk=self.post.pk).update(image='posts/cat.gif')
+        client = Client()
+        client.force_login(self.author)
+
+        client.post(reverse('post_edit', args=['author', self.post.pk]),
+                    {'text': 'Новый текст'})
+
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.text, 'Новый текст')
+        self.assertEqual(post.image.name, 'posts/cat.gif')
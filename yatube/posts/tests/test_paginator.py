@@ -1,9 +1,10 @@
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
 from ..models import Post
+from ..paginators import CursorPaginator
 
 User = get_user_model()
 
@@ -33,3 +34,111 @@ class PaginatorViewsTest(TestCase):
         response = self.client.get(reverse('index') + '?page=2')
 
         self.assertEqual(len(response.context.get('page').object_list), 3)
+
+
+class CursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='cursoruser')
+        Post.objects.bulk_create(
+            (Post(text=str(i), author=cls.user) for i in range(13)))
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.url = reverse('profile', kwargs={'username': self.user.username})
+
+    def test_next_cursor_leads_to_rest_of_feed(self):
+        """По курсору ?after= открываются оставшиеся три поста."""
+
+        first = self.client.get(self.url).context['page']
+        response = self.client.get(f'{self.url}?after={first.next_cursor}')
+        page = response.context['page']
+
+        self.assertEqual(len(page.object_list), 3)
+        self.assertIsNone(page.next_cursor)
+        self.assertTrue(set(first).isdisjoint(page))
+
+    def test_previous_cursor_returns_first_page(self):
+        """Курсор ?before= со второй страницы возвращает на первую."""
+
+        first = self.client.get(self.url).context['page']
+        second = self.client.get(
+            f'{self.url}?after={first.next_cursor}').context['page']
+        response = self.client.get(
+            f'{self.url}?before={second.previous_cursor}')
+        page = response.context['page']
+
+        self.assertEqual(list(page), list(first))
+        self.assertIsNone(page.previous_cursor)
+
+    def test_cursor_page_is_stable_under_inserts(self):
+        """Новые посты не сдвигают ленту, открытую по курсору."""
+
+        first = self.client.get(self.url).context['page']
+        expected = list(self.client.get(
+            f'{self.url}?after={first.next_cursor}').context['page'])
+        Post.objects.create(text='Свежий пост', author=self.user)
+
+        response = self.client.get(f'{self.url}?after={first.next_cursor}')
+
+        self.assertEqual(list(response.context['page']), expected)
+
+    def test_broken_cursor_falls_back_to_first_page(self):
+        """Испорченный курсор открывает первую страницу."""
+
+        for token in ('garbage', 'WyJ4Il0', 'WyJ4IiwieSJd'):
+            with self.subTest(token=token):
+                response = self.client.get(f'{self.url}?after={token}')
+
+                self.assertEqual(response.context['page'].number, 1)
+
+
+@override_settings(POSTS_PER_PAGE=1, POSTS_PAGE_NUMBER_LIMIT=10,
+                   POSTS_PAGINATOR_WINDOW=2)
+class WindowedPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='windowuser')
+        Post.objects.bulk_create(
+            (Post(text=str(i), author=cls.user) for i in range(30)))
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('profile', kwargs={'username': 'windowuser'})
+
+    def test_only_window_of_page_links_is_shown(self):
+        """Выводится только окно номеров вокруг текущей страницы."""
+
+        expected = [1, None, 3, 4, 5, 6, 7, None, 10, None]
+
+        response = Client().get(f'{self.url}?page=5')
+
+        self.assertEqual(response.context['page'].window, expected)
+        self.assertNotContains(response, '?page=2"')
+
+    def test_feed_count_is_cached_until_generation_changes(self):
+        """Число записей берётся из кэша до смены поколения ленты."""
+
+        feed = 'feed_generation:author:windowuser'
+        posts = Post.objects.filter(author=self.user)
+        self.assertEqual(CursorPaginator(posts, 1, feed=feed).count, 30)
+
+        Post.objects.bulk_create([
+            Post(text='мимо сигналов', author=self.user)
+        ])
+        self.assertEqual(CursorPaginator(posts, 1, feed=feed).count, 30)
+
+        Post.objects.create(text='Новый пост', author=self.user)
+        self.assertEqual(CursorPaginator(posts, 1, feed=feed).count, 32)
+
+    @override_settings(POSTS_PAGINATOR_EXACT_COUNT_LIMIT=20)
+    def test_large_feed_count_is_estimated(self):
+        """Выше порога число записей не считается целиком."""
+
+        paginator = CursorPaginator(Post.objects.all(), 1)
+
+        self.assertEqual(paginator.count, 20)
+        self.assertTrue(paginator.count_is_estimated)
@@ -0,0 +1,89 @@
+import re
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from ..paginators import encode_cursor
+
+User = get_user_model()
+
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?(?!subquery$)\w+$')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN есть в SQLite')
+class QueryPlanTests(TestCase):
+    """Запросы лент идут по индексам: без полного просмотра таблиц
+    и без сортировки во временном B-дереве.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(15):
+            cls.post = Post.objects.create(
+                text=str(i), author=cls.author, group=cls.group
+            )
+            Comment.objects.create(post=cls.post, author=cls.reader, text='Да')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def view_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+        ]
+
+    def query_plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assert_indexed(self, url):
+        for sql in self.view_queries(url):
+            for step in self.query_plan(sql):
+                self.assertIsNone(
+                    FULL_SCAN.match(step), f'{step} в запросе {sql}'
+                )
+                self.assertNotIn('TEMP B-TREE', step, f'в запросе {sql}')
+
+    def test_feed_views_use_indexes(self):
+        """Первая и следующая страницы лент читаются по индексам."""
+
+        feeds = (
+            reverse('index'),
+            reverse('group_name', kwargs={'slug': self.group.slug}),
+            reverse('profile', kwargs={'username': self.author.username}),
+            reverse('follow_index'),
+        )
+
+        tenth = Post.objects.order_by('-pub_date', '-id')[9]
+        cursor = encode_cursor([tenth.pub_date, tenth.id])
+
+        for url in feeds:
+            with self.subTest(url=url):
+                self.assert_indexed(url)
+                self.assert_indexed(f'{url}?after={cursor}')
+                self.assert_indexed(f'{url}?before={cursor}')
+
+    def test_post_view_uses_indexes(self):
+        """Страница поста с комментариями читается по индексам."""
+
+        self.assert_indexed(reverse('post', kwargs={
+            'username': self.author.username, 'post_id': self.post.id
+        }))
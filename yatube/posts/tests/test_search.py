@@ -0,0 +1,132 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import search
+from ..models import Post
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.client = Client()
+
+    def found(self, query, **params):
+        response = self.client.get(reverse('search'), {'q': query, **params})
+        return response, [post.text for post in response.context['page']]
+
+    def test_index_follows_post_changes(self):
+        """Индекс обновляется при создании, правке и удалении поста."""
+
+        post = Post.objects.create(text='Рыжий кот', author=self.author)
+        self.assertEqual(self.found('кот')[1], ['Рыжий кот'])
+
+        post.text = 'Серый пёс'
+        post.save()
+        self.assertEqual(self.found('кот')[1], [])
+        self.assertEqual(self.found('пес')[1], ['Серый пёс'])
+
+        post.delete()
+        self.assertEqual(self.found('пес')[1], [])
+
+    def test_russian_word_forms_and_prefixes(self):
+        """Поиск находит словоформы, префиксы и не различает «ё» и «е»."""
+
+        Post.objects.create(text='Ёлка у КОТОВ', author=self.author)
+
+        self.assertEqual(self.found('котами')[1], ['Ёлка у КОТОВ'])
+        self.assertEqual(self.found('ёл*')[1], ['Ёлка у КОТОВ'])
+        self.assertEqual(self.found('ёлка кот')[1], ['Ёлка у КОТОВ'])
+        self.assertEqual(self.found('ёлка собака')[1], [])
+
+    def test_fts_syntax_in_query_is_escaped(self):
+        """Операторы FTS5 в запросе не ломают поиск."""
+
+        Post.objects.create(text='Кот NEAR дом', author=self.author)
+
+        response, texts = self.found('"кот" OR NEAR(')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(texts, [])
+        self.assertEqual(self.found('near')[1], ['Кот NEAR дом'])
+
+    def test_results_are_ranked(self):
+        """Более релевантный пост выводится выше."""
+
+        Post.objects.create(
+            text='Кот и очень длинная история про собак, птиц, рыб и прочих '
+                 'зверей',
+            author=self.author
+        )
+        Post.objects.create(text='Кот, кот и ещё раз кот', author=self.author)
+
+        self.assertEqual(self.found('кот')[1][0], 'Кот, кот и ещё раз кот')
+
+    @override_settings(POSTS_PER_PAGE=2)
+    def test_cursor_pagination(self):
+        """Результаты листаются курсором вперёд и назад без повторов."""
+
+        for i in range(5):
+            Post.objects.create(text=f'Кот номер {i}', author=self.author)
+
+        response, first = self.found('кот')
+        page = response.context['page']
+        response, second = self.found('кот', after=page.next_cursor)
+        page = response.context['page']
+        response, third = self.found('кот', after=page.next_cursor)
+        self.assertEqual(len(set(first + second + third)), 5)
+        self.assertIsNone(response.context['page'].next_cursor)
+
+        response, back = self.found('кот', before=page.previous_cursor)
+        self.assertEqual(back, first)
+        self.assertIsNone(response.context['page'].previous_cursor)
+
+    def test_rebuild_search_index(self):
+        """Команда rebuild_search_index восстанавливает индекс."""
+
+        Post.objects.create(text='Рыжий кот', author=self.author)
+        Post.objects.create(text='Серый кот', author=self.author)
+        search.clear_index()
+        self.assertEqual(self.found('кот')[1], [])
+
+        call_command('rebuild_search_index', chunk_size=1, stdout=StringIO())
+
+        self.assertEqual(len(self.found('кот')[1]), 2)
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт через полнотекстовый индекс."""
+
+        Post.objects.create(text='Рыжие коты', author=self.author)
+        Post.objects.create(text='Собака', author=self.author)
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(admin)
+
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'кот'}
+        )
+
+        self.assertEqual(
+            [post.text for post in response.context['cl'].result_list],
+            ['Рыжие коты']
+        )
+
+    def test_triggers_survive_migrations(self):
+        """Триггеры синхронизации установлены в тестовой базе."""
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+                "AND tbl_name = 'posts_post'"
+            )
+            triggers = {row[0] for row in cursor.fetchall()}
+        self.assertEqual(triggers, {
+            f'{search.TABLE}_insert', f'{search.TABLE}_update',
+            f'{search.TABLE}_delete',
+        })
@@ -0,0 +1,122 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+
+from .. import thumbnails
+from ..models import Post, StoredFile
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+OTHER_GIF = SMALL_GIF.replace(b'\xFF\xFF\xFF', b'\x00\xFF\x00')
+
+
+# Файлы удаляются после коммита, поэтому тесты идут вне общей транзакции.
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR))
+class ContentAddressedStorageTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='author')
+
+    def create_post(self, content=SMALL_GIF, name='small.gif'):
+        return Post.objects.create(
+            text='Текст', author=self.user,
+            image=SimpleUploadedFile(name, content, 'image/gif'),
+        )
+
+    def references(self, name):
+        return StoredFile.objects.get(name=name).references
+
+    def test_same_content_is_stored_once(self):
+        """Одинаковые картинки хранятся одним файлом с общим счётчиком."""
+
+        first = self.create_post(name='cat.gif')
+        second = self.create_post(name='другой кот.GIF')
+        other = self.create_post(OTHER_GIF)
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, other.image.name)
+        self.assertRegex(first.image.name, r'^posts/\w{2}/\w{64}\.gif$')
+        self.assertEqual(self.references(first.image.name), 2)
+        self.assertEqual(
+            len(default_storage.listdir(first.image.name[:9])[1]), 1
+        )
+
+    def test_file_removed_with_last_reference(self):
+        """Файл и миниатюра удаляются вместе с последним постом."""
+
+        first, second = self.create_post(), self.create_post()
+        name = first.image.name
+        thumbnails.generate_for_post(first.pk)
+        thumbnail = thumbnails.ready_thumbnail(second.image)
+        self.assertIsNotNone(thumbnail)
+
+        first.delete()
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(self.references(name), 1)
+
+        second.delete()
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(default_storage.exists(thumbnail.name))
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
+
+    def test_replaced_image_is_released(self):
+        """Заменённая при правке картинка теряет ссылку."""
+
+        post = self.create_post()
+        old = post.image.name
+
+        post.image = SimpleUploadedFile('new.gif', OTHER_GIF, 'image/gif')
+        post.save()
+
+        self.assertFalse(default_storage.exists(old))
+        self.assertEqual(self.references(post.image.name), 1)
+
+    def test_reuploaded_image_keeps_one_reference(self):
+        """Повторная загрузка той же картинки не добавляет лишнюю ссылку."""
+
+        post = self.create_post()
+        name = post.image.name
+
+        post.image = SimpleUploadedFile('again.gif', SMALL_GIF, 'image/gif')
+        post.save()
+
+        self.assertEqual(post.image.name, name)
+        self.assertEqual(self.references(name), 1)
+        post.delete()
+        self.assertFalse(default_storage.exists(name))
+
+    def test_reconcile_images_recounts_references(self):
+        """reconcile_images исправляет счётчики ссылок."""
+
+        post = self.create_post()
+        self.create_post()
+        StoredFile.objects.update(references=7)
+        StoredFile.objects.create(name='posts/lost.gif', references=1)
+
+        call_command('reconcile_images', stdout=StringIO())
+
+        self.assertEqual(
+            dict(StoredFile.objects.values_list('name', 'references')),
+            {post.image.name: 2}
+        )
@@ -0,0 +1,140 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from .. import suggestions
+from ..models import Follow
+
+User = get_user_model()
+
+
+class FollowGraphTests(TestCase):
+    def test_csr_rows_and_overlay(self):
+        """Граф отдаёт подписки из CSR с учётом изменений поверх него."""
+
+        graph = suggestions.FollowGraph([(1, 2), (1, 3), (2, 3), (5, 1)])
+
+        self.assertEqual(list(graph.users), [1, 2, 5])
+        self.assertEqual(list(graph.offsets), [0, 2, 3, 4])
+        self.assertEqual(graph.following(1), [2, 3])
+        self.assertEqual(graph.following(4), [])
+
+        graph.remove(1, 2)
+        graph.add(1, 5)
+        graph.add(4, 1)
+        self.assertEqual(sorted(graph.following(1)), [3, 5])
+        self.assertEqual(graph.following(4), [1])
+
+        graph.add(1, 2)
+        graph.remove(4, 1)
+        self.assertEqual(sorted(graph.following(1)), [2, 3, 5])
+        self.assertEqual(graph.following(4), [])
+
+        graph.add(1, 3)
+        graph.remove(4, 1)
+        self.assertEqual(sorted(graph.following(1)), [2, 3, 5])
+        self.assertEqual(graph.following(4), [])
+
+    def test_ranked_by_overlap(self):
+        """Кандидаты — подписки подписок, по числу общих подписок."""
+
+        graph = suggestions.FollowGraph(sorted([
+            (1, 2), (1, 3), (1, 4),
+            (2, 5), (2, 6), (2, 1),
+            (3, 5), (3, 6), (3, 7), (3, 4),
+            (4, 5),
+        ]))
+
+        self.assertEqual(graph.suggest(1, 2), [(5, 3), (6, 2)])
+        self.assertEqual(graph.suggest(1, 10), [(5, 3), (6, 2), (7, 1)])
+        self.assertEqual(graph.suggest(7, 10), [])
+
+
+# Граф меняется после коммита, поэтому тесты идут вне общей транзакции.
+class SuggestionViewTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        suggestions.reset()
+        self.users = {
+            name: User.objects.create(username=name)
+            for name in ('reader', 'friend', 'other', 'writer', 'poet')
+        }
+        self.follow('reader', 'friend')
+        self.follow('reader', 'other')
+        self.follow('friend', 'writer')
+        self.follow('other', 'writer')
+        self.follow('other', 'poet')
+        self.client = Client()
+        self.client.force_login(self.users['reader'])
+
+    def follow(self, user, author):
+        Follow.objects.create(user=self.users[user],
+                              author=self.users[author])
+
+    def shown(self):
+        response = self.client.get(reverse('follow_index'))
+        return [(author.username, author.overlap)
+                for author in response.context['suggestions']]
+
+    def test_follow_page_shows_suggestions(self):
+        """Страница подписок предлагает авторов с числом общих подписок."""
+
+        self.assertEqual(self.shown(), [('writer', 2), ('poet', 1)])
+        response = self.client.get(reverse('follow_index'))
+        self.assertContains(response, 'Кого почитать')
+        self.assertContains(
+            response, reverse('profile_follow', args=['writer'])
+        )
+
+    def test_follow_and_unfollow_update_suggestions(self):
+        """Подписка и отписка сразу меняют список, без перестройки графа."""
+
+        self.shown()
+        graph = suggestions.get_graph()
+
+        self.client.get(reverse('profile_unfollow', args=['other']))
+        self.assertEqual(self.shown(), [('writer', 1)])
+
+        self.client.get(reverse('profile_follow', args=['other']))
+        self.client.get(reverse('profile_follow', args=['writer']))
+        self.assertEqual(self.shown(), [('poet', 1)])
+        self.assertIs(suggestions.get_graph(), graph)
+
+    def test_follow_from_other_process_is_not_suggested(self):
+        """Автор, на которого подписались мимо графа, не предлагается."""
+
+        graph = suggestions.get_graph()
+        # bulk_create не отправляет сигналов — как подписка, сделанная
+        # в другом процессе.
+        Follow.objects.bulk_create([
+            Follow(user=self.users['reader'], author=self.users['writer'])
+        ])
+
+        self.assertEqual(self.shown(), [('poet', 1)])
+        self.assertIs(suggestions.get_graph(), graph)
+
+    def test_rolled_back_follow_does_not_reach_graph(self):
+        """Откаченная подписка не появляется в графе."""
+
+        graph = suggestions.get_graph()
+
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.follow('reader', 'poet')
+            raise RuntimeError
+
+        self.assertNotIn(self.users['poet'].pk,
+                         graph.following(self.users['reader'].pk))
+
+    def test_list_is_cached_per_user(self):
+        """Повторный показ берёт список из кэша, не из графа."""
+
+        self.shown()
+        suggestions.reset()
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                [author.username for author in
+                 suggestions.for_user(self.users['reader'])],
+                ['writer', 'poet']
+            )
@@ -0,0 +1,133 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from jobs import queue
+from jobs.models import Job
+
+from .. import thumbnails
+from ..models import Post
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+PLACEHOLDER = 'Изображение обрабатывается'
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR))
+class ThumbnailTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='author')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def create_post(self, name='small.gif'):
+        return Post.objects.create(
+            text='Текст', author=self.user,
+            image=SimpleUploadedFile(name, SMALL_GIF, 'image/gif'),
+        )
+
+    def test_missing_thumbnail_renders_placeholder(self):
+        """Пока миниатюры нет, карточка показывает заглушку."""
+
+        self.create_post()
+
+        response = self.client.get(reverse('index'))
+
+        self.assertContains(response, PLACEHOLDER)
+        self.assertNotContains(response, '<img class="card-img"')
+
+    @override_settings(POSTS_THUMBNAILS_ASYNC=False)
+    def test_new_post_generates_thumbnail(self):
+        """После публикации с картинкой миниатюра уже готова."""
+
+        self.client.post(reverse('new_post'), {
+            'text': 'С картинкой',
+            'image': SimpleUploadedFile('new.gif', SMALL_GIF, 'image/gif'),
+        })
+        post = Post.objects.get(text='С картинкой')
+
+        self.assertIsNotNone(thumbnails.ready_thumbnail(post.image))
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, '<img class="card-img"')
+        self.assertNotContains(response, PLACEHOLDER)
+
+    def test_new_post_enqueues_thumbnail_job(self):
+        """Публикация ставит миниатюру в очередь, воркер её строит."""
+
+        self.client.post(reverse('new_post'), {
+            'text': 'С картинкой',
+            'image': SimpleUploadedFile('job.gif', SMALL_GIF, 'image/gif'),
+        })
+        post = Post.objects.get(text='С картинкой')
+        self.assertEqual(Job.objects.get().key, f'thumbnail:{post.pk}')
+        self.assertIsNone(thumbnails.ready_thumbnail(post.image))
+
+        queue.run_pending()
+
+        self.assertIsNotNone(thumbnails.ready_thumbnail(post.image))
+        self.assertContains(self.client.get(reverse('index')),
+                            '<img class="card-img"')
+
+    def test_thumbnail_replaces_cached_placeholder(self):
+        """Готовая миниатюра сбрасывает закэшированную заглушку."""
+
+        post = self.create_post()
+        self.assertContains(self.client.get(reverse('index')), PLACEHOLDER)
+
+        with override_settings(POSTS_THUMBNAILS_ASYNC=False):
+            thumbnails.schedule(post)
+
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, '<img class="card-img"')
+
+    def test_scheduled_posts_are_bounded_and_expire(self):
+        """Память о поставленных задачах ограничена по размеру и сроку."""
+
+        self.addCleanup(thumbnails._scheduled.clear)
+        for post_id in range(thumbnails.SCHEDULED_SIZE + 10):
+            thumbnails._remember_scheduled(post_id)
+
+        self.assertEqual(len(thumbnails._scheduled), thumbnails.SCHEDULED_SIZE)
+        self.assertFalse(thumbnails._recently_scheduled(0))
+        self.assertTrue(thumbnails._recently_scheduled(20))
+
+        thumbnails._scheduled[20] -= thumbnails.SCHEDULED_TIMEOUT
+        self.assertFalse(thumbnails._recently_scheduled(20))
+
+    def test_warm_thumbnails(self):
+        """Команда warm_thumbnails строит недостающие миниатюры."""
+
+        posts = [self.create_post(f'image{i}.gif') for i in range(3)]
+
+        out = StringIO()
+        call_command('warm_thumbnails', workers=2, stdout=out)
+
+        # Картинки одинаковые, поэтому файл и миниатюра у них общие.
+        self.assertIn('Построено миниатюр: 1, ошибок: 0', out.getvalue())
+        for post in posts:
+            self.assertIsNotNone(thumbnails.ready_thumbnail(post.image))
+        out = StringIO()
+        call_command('warm_thumbnails', stdout=out)
+        self.assertIn('Все миниатюры уже готовы', out.getvalue())
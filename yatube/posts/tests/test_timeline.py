@@ -0,0 +1,118 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from jobs import queue
+from jobs.models import Job
+
+from .. import timeline
+from ..models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.reader = User.objects.create(username='reader')
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_new_post_goes_to_followers_timeline(self):
+        """Новый пост раскладывается по лентам подписчиков."""
+
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Текст', author=self.author)
+
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post, pub_date=post.pub_date
+        ).exists())
+
+    @override_settings(POSTS_FANOUT_SYNC_LIMIT=1)
+    def test_large_fan_out_goes_to_job_queue(self):
+        """Пост автора с большой аудиторией раскладывает задача очереди."""
+
+        other = User.objects.create(username='other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        post = Post.objects.create(text='Текст', author=self.author)
+
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(Job.objects.get().key, f'fan_out:{post.pk}')
+
+        queue.run_pending()
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(post=post).values_list(
+                'user', flat=True)),
+            {self.reader.pk, other.pk}
+        )
+
+    def test_follow_backfills_and_unfollow_cleans_timeline(self):
+        """Подписка дозаполняет ленту, отписка её очищает."""
+
+        post = Post.objects.create(text='Текст', author=self.author)
+
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(
+            list(self.reader.timeline.values_list('post', flat=True)),
+            [post.id]
+        )
+        follow.delete()
+        self.assertFalse(self.reader.timeline.exists())
+
+    @override_settings(POSTS_TIMELINE_SIZE=3)
+    def test_timeline_is_trimmed_to_size(self):
+        """Лента хранит только POSTS_TIMELINE_SIZE последних записей."""
+
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(text=str(i), author=self.author)
+            for i in range(5)
+        ]
+
+        response = self.client.get(reverse('follow_index'))
+
+        self.assertEqual(self.reader.timeline.count(), 3)
+        self.assertEqual(list(response.context['page']), posts[:1:-1])
+
+    @override_settings(POSTS_TIMELINE_SIZE=2)
+    def test_trim_touches_only_full_timelines_and_keeps_ties(self):
+        """Обрезка — SELECT и один DELETE; равные даты не удаляются разом,
+        ленты в пределах размера не трогаются.
+        """
+
+        other = User.objects.create(username='other')
+        posts = [
+            Post.objects.create(text=str(i), author=self.author)
+            for i in range(4)
+        ]
+        pub_date = posts[0].pub_date
+        TimelineEntry.objects.bulk_create([
+            TimelineEntry(user=user, post=post, pub_date=pub_date)
+            for user in (self.reader, other) for post in posts
+        ])
+
+        with self.assertNumQueries(2):
+            timeline.trim(self.reader.pk, other.pk)
+
+        for user in (self.reader, other):
+            self.assertEqual(
+                sorted(user.timeline.values_list('post', flat=True)),
+                [posts[2].pk, posts[3].pk]
+            )
+        with self.assertNumQueries(1):
+            timeline.trim(self.reader.pk, other.pk)
+
+    def test_rebuild_timelines_command(self):
+        """Команда rebuild_timelines восстанавливает ленту по Follow."""
+
+        Post.objects.create(text='Текст', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        TimelineEntry.objects.all().delete()
+
+        call_command('rebuild_timelines', stdout=StringIO())
+
+        self.assertEqual(self.reader.timeline.count(), 1)
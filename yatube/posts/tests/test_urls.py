@@ -101,3 +101,17 @@ class URLTests(TestCase):
         response = self.authorized_client.get(url)
 
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_reserved_usernames_are_rejected_at_signup(self):
+        """Имена, совпадающие с разделами сайта, нельзя занять."""
+
+        for username in ('search', 'metrics', 'Follow'):
+            with self.subTest(username=username):
+                response = self.guest_client.post(reverse('signup'), {
+                    'username': username,
+                    'password1': 'Kj8-secret-pass',
+                    'password2': 'Kj8-secret-pass',
+                })
+
+                self.assertFormError(response, 'form', 'username',
+                                     'Это имя пользователя занято.')
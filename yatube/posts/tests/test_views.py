@@ -165,18 +165,43 @@ class PostPagesTests(TestCase):
         self.assertTrue(self.post not in response.context['page'])
 
     def test_works_cache_index_page(self):
-        """Кэширование страницы index."""
+        """Кэширование страницы index до смены поколения ленты."""
 
         url = reverse('index')
 
         response = self.guest_client.get(url)
-        Post.objects.create(text='Поста в кэше нет.', author=self.user)
+        Post.objects.filter(pk=self.post.pk).update(text='Правка без сигналов')
 
         self.assertEqual(response.content, self.guest_client.get(url).content)
-        cache.clear()
-        self.assertNotEqual(
-            response.content, self.guest_client.get(url).content
-        )
+        Post.objects.create(text='Новый пост виден сразу.', author=self.user)
+        self.assertContains(self.guest_client.get(url), 'Новый пост виден')
+
+    def test_feed_cache_is_split_by_viewer(self):
+        """Анонимный и авторизованный пользователь получают свои варианты."""
+
+        url = reverse('group_name', kwargs={'slug': self.group.slug})
+
+        self.guest_client.get(url)
+        response = self.authorized_client.get(url)
+
+        self.assertContains(response, self.user.username)
+        self.assertNotContains(self.guest_client.get(url), 'Выйти')
+
+    def test_group_feed_is_invalidated_by_its_posts(self):
+        """Пост сбрасывает кэш своей группы и не трогает чужую."""
+
+        url = reverse('group_name', kwargs={'slug': self.group.slug})
+        other_url = reverse(
+            'group_name', kwargs={'slug': self.group_test_one.slug})
+        self.guest_client.get(url)
+        other = self.guest_client.get(other_url)
+
+        Post.objects.create(
+            text='Пост в группе', author=self.user, group=self.group)
+
+        self.assertContains(self.guest_client.get(url), 'Пост в группе')
+        self.assertEqual(
+            self.guest_client.get(other_url).content, other.content)
 
 
 class FollowPagesTests(TestCase):
@@ -0,0 +1,205 @@
+"""Предварительная генерация миниатюр картинок постов.
+
+Миниатюра для карточки строится не во время рендера страницы, а
+задачей в очереди ``jobs`` сразу после сохранения поста с картинкой.
+Пока она не готова, шаблон показывает заглушку и ставит генерацию в
+очередь, так что ни один запрос не ждёт декодирования и ресайза в PIL.
+
+Для уже загруженных картинок есть команда ``warm_thumbnails``.
+
+Миниатюры и варианты ищутся по имени файла, а хранилище картинок
+называет файлы по хэшу содержимого, поэтому одинаковые картинки разных
+постов делят одну миниатюру. Она удаляется вместе с файлом, когда на
+него не остаётся ссылок (``release``).
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from sorl.thumbnail import default, delete, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from jobs.queue import enqueue
+from yatube import metrics
+from yatube.replicas import primary
+
+from . import cards, feed_cache, images
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+GEOMETRY = '960x339'
+OPTIONS = {'crop': 'center', 'upscale': True}
+
+# Посты, чьи миниатюры этот процесс недавно ставил в очередь: id и время
+# постановки. Через SCHEDULED_TIMEOUT секунд пост, у которого миниатюры
+# так и нет, ставится снова; старые id вытесняются после SCHEDULED_SIZE.
+SCHEDULED_SIZE = 10000
+SCHEDULED_TIMEOUT = 600
+_scheduled = OrderedDict()
+_scheduled_lock = threading.Lock()
+
+
+def _remember_scheduled(post_id):
+    with _scheduled_lock:
+        _scheduled[post_id] = time.monotonic()
+        _scheduled.move_to_end(post_id)
+        while len(_scheduled) > SCHEDULED_SIZE:
+            _scheduled.popitem(last=False)
+
+
+def _recently_scheduled(post_id):
+    with _scheduled_lock:
+        scheduled = _scheduled.get(post_id)
+    return (scheduled is not None
+            and time.monotonic() - scheduled < SCHEDULED_TIMEOUT)
+
+
+class PregeneratingBackend(ThumbnailBackend):
+    """Бэкенд sorl, разделяющий проверку, рендер и регистрацию миниатюры."""
+
+    def _prepare(self, file_, geometry_string, options):
+        # Имя миниатюры считается так же, как в get_thumbnail().
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return source, ImageFile(name, default.storage)
+
+    def get_ready_thumbnail(self, file_, geometry_string, **options):
+        """Миниатюра из key-value store sorl или None, без генерации."""
+        _, thumbnail = self._prepare(file_, geometry_string, options)
+        return default.kvstore.get(thumbnail)
+
+    def render_file(self, file_, geometry_string, **options):
+        """Записывает файл миниатюры, не обращаясь к базе.
+
+        Подходит для дочерних процессов: зарегистрировать готовый файл
+        потом дёшево — get_thumbnail() найдёт его и не станет рендерить.
+        """
+        source, thumbnail = self._prepare(file_, geometry_string, options)
+        if thumbnail.exists():
+            return
+        source_image = default.engine.get_image(source)
+        try:
+            options['image_info'] = default.engine.get_image_info(
+                source_image
+            )
+            self._create_thumbnail(source_image, geometry_string, options,
+                                   thumbnail)
+            self._create_alternative_resolutions(
+                source_image, geometry_string, options, thumbnail.name
+            )
+        finally:
+            default.engine.cleanup(source_image)
+
+
+backend = PregeneratingBackend()
+
+
+def ready_thumbnail(image):
+    """Готовая миниатюра картинки или None, без генерации."""
+    if not image:
+        return None
+    with metrics.timer(metrics.THUMBNAIL):
+        # По имени, как в generate(): ключ sorl включает хранилище.
+        return backend.get_ready_thumbnail(image.name, GEOMETRY, **OPTIONS)
+
+
+def render_file(name):
+    """Рендерит файл миниатюры для ``name`` без записи в базу."""
+    backend.render_file(name, GEOMETRY, **OPTIONS)
+
+
+def generate(name):
+    """Строит миниатюру файла ``name`` и регистрирует её в sorl."""
+    with metrics.timer(metrics.THUMBNAIL):
+        return get_thumbnail(name, GEOMETRY, **OPTIONS)
+
+
+def refresh_many(posts, batch_size=500):
+    """Сбрасывает закэшированные карточки и ленты, где была заглушка."""
+    posts = list(posts)
+    for start in range(0, len(posts), batch_size):
+        batch = posts[start:start + batch_size]
+        cards.bump_version(pk__in=[post.pk for post in batch])
+    feed_cache.invalidate(
+        groups={post.group.slug for post in posts if post.group_id},
+        authors={post.author.username for post in posts},
+    )
+
+
+def generate_for_post(post_id):
+    """Строит варианты картинки и миниатюру поста, сбрасывает карточки
+    с заглушкой.
+    """
+    post = Post.objects.select_related('author', 'group').filter(
+        pk=post_id).first()
+    if post is not None and post.image:
+        images.save_variants(post.image.name)
+        generate(post.image.name)
+        refresh_many([post])
+
+
+def release(name):
+    """Убирает ссылку поста на картинку ``name``.
+
+    Если ссылка была последней, после коммита удаляются файл картинки,
+    её варианты и миниатюры.
+    """
+    storage = Post._meta.get_field('image').storage
+
+    def purge():
+        if storage.purge(name):
+            images.delete_variants(name, storage)
+            delete(name, delete_file=False)
+
+    if storage.release(name):
+        transaction.on_commit(purge)
+
+
+def schedule(post):
+    """Ставит генерацию миниатюры поста в очередь задач.
+
+    Задача пишется в текущую транзакцию, так что воркер увидит её вместе
+    с постом; одинаковые задачи, ждущие в очереди, склеивает ``key``.
+    С ``POSTS_THUMBNAILS_ASYNC = False`` миниатюра строится сразу, в
+    текущем потоке.
+    """
+    if not post.image:
+        return
+    if not settings.POSTS_THUMBNAILS_ASYNC:
+        try:
+            generate_for_post(post.pk)
+        except Exception:
+            logger.exception('Не удалось построить миниатюру поста %s',
+                             post.pk)
+        return
+    from .tasks import generate_thumbnail
+    enqueue(generate_thumbnail, post.pk, key=f'thumbnail:{post.pk}')
+    _remember_scheduled(post.pk)
+
+
+def schedule_missing(post):
+    """``schedule`` для шаблона, встретившего пост без миниатюры.
+
+    Пост, недавно поставленный в очередь этим процессом, пропускается,
+    чтобы рендер ленты не писал в базу на каждый запрос. Задача —
+    служебная запись и не закрепляет посетителя за основной базой.
+    """
+    if (not settings.POSTS_THUMBNAILS_ASYNC
+            or not _recently_scheduled(post.pk)):
+        with primary(sticky=False):
+            schedule(post)
@@ -0,0 +1,178 @@
+"""Материализованные ленты подписок (fan-out on write).
+
+Каждый пост при публикации копируется в ленты подписчиков автора
+(у популярных авторов — задачей в очереди ``jobs``),
+а подписка и отписка дозаполняют и чистят ленту подписчика. Страница
+``follow_index`` после этого читает диапазон индекса
+``(user, pub_date, post)`` вместо соединения ``Post`` с ``Follow``.
+В каждой ленте хранится не больше ``POSTS_TIMELINE_SIZE`` записей.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, OuterRef, Q, Subquery
+
+from jobs.queue import enqueue
+
+from . import feed_cache
+from .models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+BATCH_SIZE = 500
+
+ORDERING = ('-feed_date', '-feed_id')
+
+
+def _size():
+    return settings.POSTS_TIMELINE_SIZE
+
+
+def feed_for(user, posts=None):
+    """Посты ленты подписок в порядке, заданном ``ORDERING``.
+
+    ``posts`` — исходный queryset постов, по умолчанию ``for_feed()``.
+    """
+    if posts is None:
+        posts = Post.objects.for_feed()
+    return posts.filter(timeline_entries__user=user).annotate(
+        feed_date=F('timeline_entries__pub_date'),
+        feed_id=F('timeline_entries__post_id'),
+    )
+
+
+# Сколько лент обрезать одним DELETE: условие растёт с каждой лентой.
+TRIM_CHUNK = 100
+
+
+def _cutoffs(user_ids):
+    """(пользователь, pub_date, post_id) первой лишней записи — только для
+    лент длиннее ``POSTS_TIMELINE_SIZE``.
+
+    Подзапрос для каждой ленты проходит по индексу
+    ``(user, pub_date, post)`` до позиции ``POSTS_TIMELINE_SIZE``, без
+    сортировки и без чтения остальных записей.
+    """
+    extra = TimelineEntry.objects.filter(
+        user_id=OuterRef('pk')
+    ).order_by('-pub_date', '-post_id')[_size():_size() + 1]
+    return User.objects.filter(pk__in=user_ids).annotate(
+        cut_date=Subquery(extra.values('pub_date')),
+        cut_post=Subquery(extra.values('post_id')),
+    ).filter(cut_date__isnull=False).values_list(
+        'pk', 'cut_date', 'cut_post'
+    )
+
+
+def trim(*user_ids):
+    """Оставляет в лентах ``user_ids`` по ``POSTS_TIMELINE_SIZE`` записей.
+
+    Один SELECT находит переполненные ленты и их границу, затем один
+    DELETE на ``TRIM_CHUNK`` лент удаляет записи не новее границы. Граница
+    — пара ``(pub_date, post)``, как в ``ORDERING``, поэтому посты с
+    одинаковой датой не удаляются все разом.
+    """
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        cutoffs = list(_cutoffs(user_ids[start:start + BATCH_SIZE]))
+        for chunk in range(0, len(cutoffs), TRIM_CHUNK):
+            condition = Q()
+            for user_id, cut_date, cut_post in \
+                    cutoffs[chunk:chunk + TRIM_CHUNK]:
+                condition |= Q(user_id=user_id, pub_date__lt=cut_date)
+                condition |= Q(user_id=user_id, pub_date=cut_date,
+                               post_id__lte=cut_post)
+            TimelineEntry.objects.filter(condition).delete()
+
+
+def _invalidate(*user_ids):
+    feed_cache.bump(*[
+        feed_cache.generation_key(feed_cache.FOLLOW, user_id)
+        for user_id in user_ids
+    ])
+
+
+def _insert(entries):
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def push_post(post):
+    """Добавляет новый пост в ленты подписчиков автора.
+
+    Если подписчиков не больше ``POSTS_FANOUT_SYNC_LIMIT``, это делается
+    сразу, иначе — задачей в очереди, чтобы публикация у автора с большой
+    аудиторией не ждала тысяч вставок.
+    """
+    limit = settings.POSTS_FANOUT_SYNC_LIMIT
+    follower_ids = list(Follow.objects.filter(
+        author_id=post.author_id
+    ).order_by().values_list('user_id', flat=True)[:limit + 1])
+    if len(follower_ids) > limit:
+        from .tasks import fan_out_post
+        enqueue(fan_out_post, post.pk, key=f'fan_out:{post.pk}')
+    elif follower_ids:
+        _push_to(follower_ids, post)
+
+
+def fan_out(post):
+    """Добавляет пост в ленты всех подписчиков автора пачками."""
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    batch = []
+    for user_id in follower_ids.iterator(chunk_size=BATCH_SIZE):
+        batch.append(user_id)
+        if len(batch) == BATCH_SIZE:
+            _push_to(batch, post)
+            batch = []
+    if batch:
+        _push_to(batch, post)
+
+
+def _push_to(user_ids, post):
+    _insert([
+        TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in user_ids
+    ])
+    trim(*user_ids)
+    _invalidate(*user_ids)
+
+
+def backfill(user_id, author_id):
+    """Дозаполняет ленту подписчика последними постами нового автора."""
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id'
+    ).values_list('id', 'pub_date')[:_size()]
+    _insert([
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts
+    ])
+    trim(user_id)
+    _invalidate(user_id)
+
+
+def remove(user_id, author_id):
+    """Убирает из ленты подписчика посты автора, от которого он отписался.
+
+    Записи других авторов, вытесненные ранее из-за ограничения размера,
+    не возвращаются: их восстановит команда ``rebuild_timelines``.
+    """
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+    _invalidate(user_id)
+
+
+def rebuild(user_id):
+    """Собирает ленту пользователя заново по Follow и Post."""
+    posts = Post.objects.filter(author__following__user_id=user_id).order_by(
+        '-pub_date', '-id'
+    ).values_list('id', 'pub_date')[:_size()]
+    with transaction.atomic():
+        TimelineEntry.objects.filter(user_id=user_id).delete()
+        _insert([
+            TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in posts.iterator(chunk_size=BATCH_SIZE)
+        ])
+    _invalidate(user_id)
@@ -1,20 +1,31 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('', views.index, name='index'),
     path('new/', views.new_post, name='new_post'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search_posts, name='search'),
+    path('api/posts/', api.index, name='api_index'),
+    path('api/posts/<int:post_id>/comments/', api.post_comments,
+         name='api_post_comments'),
+    path('api/group/<slug:slug>/posts/', api.group_posts,
+         name='api_group_posts'),
+    path('api/users/<str:username>/posts/', api.profile, name='api_profile'),
+    path('api/follow/', api.follow_index, name='api_follow_index'),
     path('group/<slug:slug>/', views.group_posts, name='group_name'),
     path('<str:username>/', views.profile, name='profile'),
     path('<str:username>/follow/', views.profile_follow,
          name='profile_follow'),
     path('<str:username>/unfollow/', views.profile_unfollow,
          name='profile_unfollow'),
+    path('<str:username>/export/', views.export_posts, name='export_posts'),
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
     path('<str:username>/<int:post_id>/comment/', views.add_comment,
          name='add_comment'),
+    path('<str:username>/<int:post_id>/comments/', views.post_comments,
+         name='post_comments'),
     path('<str:username>/<int:post_id>/edit/', views.post_edit,
          name='post_edit'),
 ]
@@ -1,69 +1,102 @@
-from django.contrib.auth import get_user_model
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
 from django.views.decorators.http import require_http_methods
 
+from . import (cards, conditional, counters, exporter, feed_cache, objects,
+               search, suggestions, thumbnails, timeline)
 from .forms import CommentForm, PostForm
-from .models import Comment, Follow, Group, Post
+from .models import Follow, Post
+from .paginators import paginate, paginate_comments
 
-User = get_user_model()
 
-
-@cache_page(20, key_prefix='index_page')
+@feed_cache.cache_feed(feed_cache.INDEX)
 @require_http_methods(['GET'])
 def index(request):
-    posts = Post.objects.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    posts = Post.objects.for_feed()
+    page = paginate(
+        request, posts, feed=feed_cache.generation_key(feed_cache.INDEX)
+    )
+    cards.attach(page.object_list)
     context = {'page': page}
     return render(request, 'posts/index.html', context)
 
 
+@conditional.conditional_page(conditional.group_state)
+@feed_cache.cache_feed(feed_cache.GROUP, 'slug')
 @require_http_methods(['GET'])
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    group = objects.get_group_or_404(slug)
+    posts = group.posts.for_feed()
+    page = paginate(
+        request, posts, feed=feed_cache.generation_key(feed_cache.GROUP, slug)
+    )
+    cards.attach(page.object_list)
     context = {'page': page, 'group': group}
     return render(request, 'posts/group.html', context)
 
 
+@require_http_methods(['GET'])
+def search_posts(request):
+    query = request.GET.get('q', '').strip()
+    page = search.search(
+        query, settings.POSTS_PER_PAGE,
+        after=request.GET.get('after'), before=request.GET.get('before'),
+    )
+    cards.attach(page.object_list)
+    context = {'page': page, 'query': query}
+    return render(request, 'posts/search.html', context)
+
+
+@conditional.conditional_page(conditional.profile_state)
+@feed_cache.cache_feed(feed_cache.AUTHOR, 'username')
 @require_http_methods(['GET'])
 def profile(request, username):
-    page_author = get_object_or_404(User, username=username)
-    posts = page_author.posts.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    page_author = objects.get_user_or_404(username)
+    posts = page_author.posts.for_feed()
+    page = paginate(request, posts, feed=feed_cache.generation_key(
+        feed_cache.AUTHOR, username
+    ))
+    cards.attach(page.object_list)
     following = False
     if request.user.is_authenticated:
         following = Follow.objects.filter(
             user=request.user, author=page_author).exists()
     context = {
-        'page': page, 'author': page_author, 'following': following
+        'page': page,
+        'author': page_author,
+        'stats': counters.get_stats(page_author),
+        'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@conditional.conditional_page(conditional.post_state)
 @require_http_methods(['GET'])
 def post_view(request, username, post_id):
-    post = get_object_or_404(Post, author__username=username, id=post_id)
+    post = objects.get_post_or_404(username, post_id)
+    cards.attach([post])
     form = CommentForm(request.POST or None)
-    comments = Comment.objects.filter(post_id=post_id)
+    comments = paginate_comments(request, post.comments.all())
     context = {
         'post': post,
         'author': post.author,
+        'stats': counters.get_stats(post.author),
         'form': form,
         'comments': comments
     }
     return render(request, 'posts/post.html', context)
 
 
+@require_http_methods(['GET'])
+def post_comments(request, username, post_id):
+    post = objects.get_post_or_404(username, post_id)
+    comments = paginate_comments(request, post.comments.all())
+    context = {'post': post, 'comments': comments}
+    return render(request, 'includes/comment_list.html', context)
+
+
 @require_http_methods(['GET', 'POST'])
 @login_required
 def new_post(request):
@@ -73,6 +106,7 @@ def new_post(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        thumbnails.schedule(post)
         return redirect('index')
     context = {'form': form, 'edit': edit}
     return render(request, 'posts/new_post.html', context)
@@ -92,6 +126,8 @@ def post_edit(request, username, post_id):
 
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post)
         return redirect('post', username=username, post_id=post_id)
 
     context = {'form': form, 'edit': edit, 'post': post}
@@ -116,18 +152,24 @@ def add_comment(request, username, post_id):
 @require_http_methods(['GET'])
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    context = {'page': page, 'paginator': paginator}
+    posts = timeline.feed_for(request.user)
+    page = paginate(
+        request, posts, ordering=timeline.ORDERING,
+        feed=feed_cache.generation_key(feed_cache.FOLLOW, request.user.pk)
+    )
+    cards.attach(page.object_list)
+    context = {
+        'page': page,
+        'paginator': page.paginator,
+        'suggestions': suggestions.for_user(request.user),
+    }
     return render(request, 'posts/follow.html', context)
 
 
 @require_http_methods(['GET'])
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = objects.get_user_or_404(username)
     if request.user != author:
         Follow.objects.get_or_create(user=request.user, author=author)
     return redirect('profile', username=username)
@@ -136,9 +178,28 @@ def profile_follow(request, username):
 @require_http_methods(['GET'])
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = objects.get_user_or_404(username)
     follow = get_object_or_404(Follow.objects.filter(
         user=request.user, author=author
     ))
     follow.delete()
     return redirect('profile', username=username)
+
+
+@require_http_methods(['GET'])
+@login_required
+def export_posts(request, username):
+    author = objects.get_user_or_404(username)
+    if request.user != author and not request.user.is_staff:
+        return redirect('profile', username=username)
+    file_format = request.GET.get('format', 'jsonl')
+    if file_format not in exporter.FORMATS:
+        raise Http404(f'Неизвестный формат выгрузки: {file_format}')
+    content_type, extension = exporter.FORMATS[file_format]
+    response = StreamingHttpResponse(
+        exporter.export(author, file_format), content_type=content_type
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{username}.{extension}"'
+    )
+    return response
@@ -6,12 +6,25 @@ from .models import Contact
 
 User = get_user_model()
 
+# Первые сегменты адресов сайта: профиль пользователя с таким именем
+# (``/<username>/``) перекрывался бы этими страницами.
+RESERVED_USERNAMES = frozenset({
+    'about', 'admin', 'api', 'auth', 'follow', 'group', 'media', 'metrics',
+    'new', 'search', 'static',
+})
+
 
 class CreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
         model = User
         fields = ['first_name', 'last_name', 'username', 'email']
 
+    def clean_username(self):
+        username = self.cleaned_data['username']
+        if username.lower() in RESERVED_USERNAMES:
+            raise forms.ValidationError('Это имя пользователя занято.')
+        return username
+
 
 class ContactForm(forms.ModelForm):
     class Meta:
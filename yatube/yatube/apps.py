@@ -0,0 +1,27 @@
+from django.apps import AppConfig
+from django.conf import settings
+from django.core import checks
+from django.db.backends.signals import connection_created
+
+from . import sqlite
+
+
+class YatubeConfig(AppConfig):
+    """Приложение проекта: общие команды и проверки настроек."""
+    name = 'yatube'
+
+    def ready(self):
+        checks.register(check_replicas)
+        connection_created.connect(sqlite.configure_connection)
+
+
+def check_replicas(app_configs, **kwargs):
+    return [
+        checks.Error(
+            f'Реплика {alias!r} из DATABASE_REPLICAS не описана в '
+            f'DATABASES.',
+            id='yatube.E001',
+        )
+        for alias in settings.DATABASE_REPLICAS
+        if alias not in settings.DATABASES
+    ]
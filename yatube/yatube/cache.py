@@ -0,0 +1,322 @@
+"""Кэш в файле SQLite, общий для всех процессов на одной машине.
+
+``LocMemCache`` у каждого воркера свой: страницы лент и метаданные
+миниатюр дублируются в памяти, а сброс поколения в одном процессе не
+виден остальным. Этот бэкенд хранит записи в одном файле SQLite в режиме
+WAL, поэтому читатели не блокируют друг друга, а запись сериализует сама
+база.
+
+Целые числа хранятся как INTEGER, всё остальное — как pickle;
+``incr``/``decr`` читают и пишут значение внутри ``BEGIN IMMEDIATE``,
+поэтому параллельные увеличения из разных процессов не теряются.
+Время последнего чтения обновляется не чаще раза в ``LRU_RESOLUTION``
+секунд, и при переполнении (``MAX_ENTRIES`` записей или ``MAX_SIZE``
+байт) сначала удаляются просроченные записи, а затем давно не читанные.
+Число записей и их общий размер триггеры держат в строке ``cache_stats``,
+поэтому проверка переполнения при записи не перебирает всю таблицу.
+
+Пример настройки::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'yatube.cache.SQLiteCache',
+            'LOCATION': '/var/tmp/yatube/cache.sqlite3',
+            'OPTIONS': {'MAX_ENTRIES': 10000, 'MAX_SIZE': 64 * 2 ** 20},
+        }
+    }
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# SQLite ограничивает число параметров запроса (999 в старых сборках).
+BATCH_SIZE = 500
+LRU_RESOLUTION = 1.0
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS cache (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        expires REAL,
+        accessed REAL NOT NULL,
+        size INTEGER NOT NULL
+    ) WITHOUT ROWID""",
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)',
+    """CREATE TABLE IF NOT EXISTS cache_stats (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        entries INTEGER NOT NULL,
+        size INTEGER NOT NULL
+    )""",
+    # Файл, созданный до появления счётчиков, считается один раз.
+    """INSERT OR IGNORE INTO cache_stats
+        SELECT 1, count(*), coalesce(sum(size), 0) FROM cache""",
+    """CREATE TRIGGER IF NOT EXISTS cache_stats_insert
+    AFTER INSERT ON cache BEGIN
+        UPDATE cache_stats SET entries = entries + 1, size = size + new.size;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS cache_stats_update
+    AFTER UPDATE OF size ON cache BEGIN
+        UPDATE cache_stats SET size = size - old.size + new.size;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS cache_stats_delete
+    AFTER DELETE ON cache BEGIN
+        UPDATE cache_stats SET entries = entries - 1, size = size - old.size;
+    END""",
+)
+UPSERT = (
+    'INSERT INTO cache VALUES (?, ?, ?, ?, ?) '
+    'ON CONFLICT (key) DO UPDATE SET value = excluded.value, '
+    'expires = excluded.expires, accessed = excluded.accessed, '
+    'size = excluded.size'
+)
+ALIVE = '(expires IS NULL OR expires > ?)'
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_size = options.get('MAX_SIZE')
+        self._busy_timeout = options.get('BUSY_TIMEOUT', 5)
+        self._local = threading.local()
+
+    # Соединения
+
+    def _connection(self):
+        """Соединение текущего потока; после fork открывается заново."""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.connection = self._connect()
+            local.pid = os.getpid()
+        return local.connection
+
+    def _connect(self):
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(
+            self._path, timeout=self._busy_timeout, isolation_level=None,
+            check_same_thread=False,
+        )
+        connection.execute('PRAGMA journal_mode = WAL')
+        connection.execute('PRAGMA synchronous = NORMAL')
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            for statement in SCHEMA:
+                connection.execute(statement)
+        return connection
+
+    def close(self, **kwargs):
+        # Соединения живут всё время процесса: открывать файл на каждый
+        # запрос дороже, чем держать его открытым.
+        pass
+
+    # Сериализация
+
+    @staticmethod
+    def _dump(value):
+        if type(value) is int:
+            return value
+        return sqlite3.Binary(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+    @staticmethod
+    def _load(value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    @staticmethod
+    def _size(value):
+        return 8 if isinstance(value, int) else len(value)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    # Чтение
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys_map = {self._key(key, version): key for key in keys}
+        now = time.time()
+        connection = self._connection()
+        found, stale = {}, []
+        made_keys = list(keys_map)
+        for start in range(0, len(made_keys), BATCH_SIZE):
+            batch = made_keys[start:start + BATCH_SIZE]
+            rows = connection.execute(
+                f'SELECT key, value, accessed FROM cache '
+                f'WHERE key IN ({", ".join("?" * len(batch))}) AND {ALIVE}',
+                [*batch, now]
+            )
+            for made_key, value, accessed in rows:
+                found[keys_map[made_key]] = self._load(value)
+                if accessed < now - LRU_RESOLUTION:
+                    stale.append(made_key)
+        if stale:
+            self._mark_accessed(connection, stale, now)
+        return found
+
+    def _mark_accessed(self, connection, made_keys, now):
+        # Отметка для LRU не должна ждать чужую запись: если база занята,
+        # её можно пропустить.
+        try:
+            with connection:
+                connection.execute('BEGIN')
+                connection.executemany(
+                    'UPDATE cache SET accessed = ? WHERE key = ?',
+                    [(now, made_key) for made_key in made_keys]
+                )
+        except sqlite3.OperationalError:
+            pass
+
+    def has_key(self, key, version=None):
+        row = self._connection().execute(
+            f'SELECT 1 FROM cache WHERE key = ? AND {ALIVE}',
+            [self._key(key, version), time.time()]
+        ).fetchone()
+        return row is not None
+
+    # Запись
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        rows = []
+        for key, value in data.items():
+            value = self._dump(value)
+            rows.append((self._key(key, version), value, expires, now,
+                         self._size(value)))
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.executemany(UPSERT, rows)
+            self._cull(connection, now)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        value = self._dump(value)
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            cursor = connection.execute(
+                f'{UPSERT} '
+                f'WHERE cache.expires IS NOT NULL AND cache.expires <= ?',
+                [self._key(key, version), value, expires, now,
+                 self._size(value), now]
+            )
+            added = cursor.rowcount > 0
+            if added:
+                self._cull(connection, now)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        cursor = self._connection().execute(
+            f'UPDATE cache SET expires = ?, accessed = ? '
+            f'WHERE key = ? AND {ALIVE}',
+            [expires, now, self._key(key, version), now]
+        )
+        return cursor.rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        now = time.time()
+        made_key = self._key(key, version)
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            row = connection.execute(
+                f'SELECT value FROM cache WHERE key = ? AND {ALIVE}',
+                [made_key, now]
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = self._load(row[0]) + delta
+            dumped = self._dump(value)
+            connection.execute(
+                'UPDATE cache SET value = ?, accessed = ?, size = ? '
+                'WHERE key = ?',
+                [dumped, now, self._size(dumped), made_key]
+            )
+        return value
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def delete_many(self, keys, version=None):
+        made_keys = [self._key(key, version) for key in keys]
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            for start in range(0, len(made_keys), BATCH_SIZE):
+                batch = made_keys[start:start + BATCH_SIZE]
+                connection.execute(
+                    f'DELETE FROM cache '
+                    f'WHERE key IN ({", ".join("?" * len(batch))})', batch
+                )
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+    # Вытеснение
+
+    def _cull(self, connection, now):
+        """Удаляет просроченные, а при переполнении — давно не читанные."""
+        count, size = self._stats(connection)
+        if not self._overflows(count, size):
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?',
+            [now]
+        )
+        count, size = self._stats(connection)
+        if not self._overflows(count, size):
+            return
+        if self._cull_frequency == 0:
+            connection.execute('DELETE FROM cache')
+            return
+        # Как и встроенные бэкенды, удаляем 1/CULL_FREQUENCY записей, а
+        # при превышении MAX_SIZE — столько, чтобы уложиться в лимит.
+        victims = count // self._cull_frequency
+        if self._max_size is not None and size > self._max_size:
+            rows = connection.execute(
+                'SELECT size FROM cache ORDER BY accessed'
+            )
+            excess, freed, needed = size - self._max_size, 0, 0
+            for (row_size,) in rows:
+                if freed >= excess:
+                    break
+                freed += row_size
+                needed += 1
+            victims = max(victims, needed)
+        connection.execute(
+            'DELETE FROM cache WHERE key IN '
+            '(SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+            [victims]
+        )
+
+    @staticmethod
+    def _stats(connection):
+        return connection.execute(
+            'SELECT entries, size FROM cache_stats'
+        ).fetchone()
+
+    def _overflows(self, count, size):
+        if count > self._max_entries:
+            return True
+        return self._max_size is not None and size > self._max_size
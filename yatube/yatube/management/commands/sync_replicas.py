@@ -0,0 +1,51 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файлы реплик из '
+            'DATABASE_REPLICAS (для проверки реплик локально).')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=None,
+            help='Повторять копирование каждые столько секунд, пока '
+                 'команду не остановят.'
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('В DATABASE_REPLICAS нет реплик')
+        databases = [settings.DATABASES[alias] for alias in
+                     (DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS)]
+        if any(db['ENGINE'] != 'django.db.backends.sqlite3'
+               for db in databases):
+            raise CommandError('Копировать можно только базы SQLite; '
+                               'другие реплики наполняет репликация СУБД')
+        primary, *replicas = [db['NAME'] for db in databases]
+        while True:
+            started = time.monotonic()
+            for replica in replicas:
+                copy_database(primary, replica)
+            self.stdout.write(
+                f'Реплик обновлено: {len(replicas)} за '
+                f'{time.monotonic() - started:.2f} с'
+            )
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
+
+
+def copy_database(source, target):
+    """Копирует файл SQLite через backup API, не останавливая запись."""
+    primary = sqlite3.connect(source)
+    replica = sqlite3.connect(target)
+    try:
+        primary.backup(replica)
+    finally:
+        replica.close()
+        primary.close()
@@ -0,0 +1,322 @@
+"""Замеры каждого запроса: SQL, шаблоны, кэш и миниатюры.
+
+``RequestMetricsMiddleware`` на время запроса подключает обёртку
+``execute_wrapper`` ко всем соединениям с базой и собирает:
+
+* число SQL-запросов и их суммарное время;
+* время рендера шаблонов (считается только внешний ``Template.render``,
+  вложенные ``include`` не складываются дважды);
+* попадания и промахи кэша и время обращений к нему;
+* время работы с миниатюрами (``timer(THUMBNAIL)`` в ``posts.thumbnails``).
+
+Результат уходит в заголовок ``Server-Timing`` (его показывает вкладка
+Network в браузере; только при ``DEBUG`` и сотрудникам — число и время
+SQL-запросов посторонним знать незачем), строкой в логгер
+``yatube.requests`` и в гистограммы
+по имени URL, которые отдаёт страница ``/metrics/`` в текстовом формате
+Prometheus. Гистограммы живут в памяти процесса: каждый воркер
+показывает свои.
+"""
+import bisect
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger('yatube.requests')
+
+SQL = 'sql'
+TEMPLATE = 'template'
+CACHE = 'cache'
+THUMBNAIL = 'thumbnail'
+TOTAL = 'total'
+TIMERS = (SQL, TEMPLATE, CACHE, THUMBNAIL)
+
+# Границы корзин гистограмм: секунды для времени, штуки для запросов.
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+_local = threading.local()
+_patched = False
+_patch_lock = threading.Lock()
+
+
+class WatchedFileHandler(logging.handlers.WatchedFileHandler):
+    """Журнал, который сам создаёт свою папку.
+
+    Файл пишут все воркеры, поэтому ротацию делает внешняя программа
+    (logrotate), а обработчик переоткрывает файл, когда тот сменился.
+    С ``delay=True`` файл, а с ним и папка, появляются при первой записи,
+    а не при импорте настроек.
+    """
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings = dict.fromkeys(TIMERS, 0.0)
+        self.queries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.depth = dict.fromkeys(TIMERS, 0)
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.started
+
+
+def current():
+    """Замеры текущего запроса или None вне запроса."""
+    return getattr(_local, 'metrics', None)
+
+
+@contextmanager
+def timer(name):
+    """Добавляет время блока к таймеру ``name`` текущего запроса.
+
+    Вложенные блоки одного таймера не суммируются повторно.
+    """
+    metrics = current()
+    if metrics is None:
+        yield
+        return
+    metrics.depth[name] += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.depth[name] -= 1
+        if not metrics.depth[name]:
+            metrics.timings[name] += time.perf_counter() - started
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = current()
+    if metrics is not None:
+        metrics.queries += 1
+    with timer(SQL):
+        return execute(sql, params, many, context)
+
+
+# Перехват шаблонов и кэша
+
+def _timed_render(render):
+    @wraps(render)
+    def wrapper(self, context):
+        with timer(TEMPLATE):
+            return render(self, context)
+    return wrapper
+
+
+_MISSING = object()
+
+
+def _counted_get(get):
+    @wraps(get)
+    def wrapper(self, key, default=None, version=None):
+        metrics = current()
+        if metrics is None or metrics.depth[CACHE]:
+            return get(self, key, default, version)
+        with timer(CACHE):
+            value = get(self, key, _MISSING, version)
+        if value is _MISSING:
+            metrics.cache_misses += 1
+            return default
+        metrics.cache_hits += 1
+        return value
+    return wrapper
+
+
+def _counted_get_many(get_many):
+    @wraps(get_many)
+    def wrapper(self, keys, version=None):
+        metrics = current()
+        if metrics is None or metrics.depth[CACHE]:
+            return get_many(self, keys, version)
+        keys = list(keys)
+        with timer(CACHE):
+            found = get_many(self, keys, version)
+        metrics.cache_hits += len(found)
+        metrics.cache_misses += len(keys) - len(found)
+        return found
+    return wrapper
+
+
+def _timed(method):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with timer(CACHE):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def install():
+    """Один раз на процесс оборачивает рендер шаблонов и методы кэша."""
+    global _patched
+    with _patch_lock:
+        if _patched:
+            return
+        Template.render = _timed_render(Template.render)
+        backends = {type(caches[alias]) for alias in settings.CACHES}
+        for backend in backends:
+            backend.get = _counted_get(backend.get)
+            backend.get_many = _counted_get_many(backend.get_many)
+            for name in ('set', 'set_many', 'add', 'delete', 'incr'):
+                setattr(backend, name, _timed(getattr(backend, name)))
+        _patched = True
+
+
+# Гистограммы
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+
+class Registry:
+    """Гистограммы и счётчики по имени URL, общие для потоков процесса."""
+
+    HISTOGRAMS = {
+        'request_duration_seconds': SECONDS_BUCKETS,
+        'sql_duration_seconds': SECONDS_BUCKETS,
+        'template_duration_seconds': SECONDS_BUCKETS,
+        'cache_duration_seconds': SECONDS_BUCKETS,
+        'thumbnail_duration_seconds': SECONDS_BUCKETS,
+        'sql_queries': QUERY_BUCKETS,
+    }
+    COUNTERS = ('cache_hits_total', 'cache_misses_total')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def observe(self, view, metrics, total):
+        values = {
+            'request_duration_seconds': total,
+            'sql_duration_seconds': metrics.timings[SQL],
+            'template_duration_seconds': metrics.timings[TEMPLATE],
+            'cache_duration_seconds': metrics.timings[CACHE],
+            'thumbnail_duration_seconds': metrics.timings[THUMBNAIL],
+            'sql_queries': metrics.queries,
+        }
+        with self.lock:
+            stats = self.views.get(view)
+            if stats is None:
+                stats = self.views[view] = {
+                    name: Histogram(buckets)
+                    for name, buckets in self.HISTOGRAMS.items()
+                }
+                stats.update(dict.fromkeys(self.COUNTERS, 0))
+            for name, value in values.items():
+                stats[name].observe(value)
+            stats['cache_hits_total'] += metrics.cache_hits
+            stats['cache_misses_total'] += metrics.cache_misses
+
+    def render(self):
+        """Текст в формате экспозиции Prometheus."""
+        lines = []
+        with self.lock:
+            for name, buckets in self.HISTOGRAMS.items():
+                lines.append(f'# TYPE yatube_{name} histogram')
+                for view, stats in sorted(self.views.items()):
+                    histogram = stats[name]
+                    cumulative = 0
+                    bounds = [*map(str, buckets), '+Inf']
+                    for bound, count in zip(bounds, histogram.counts):
+                        cumulative += count
+                        lines.append(
+                            f'yatube_{name}_bucket{{view="{view}",'
+                            f'le="{bound}"}} {cumulative}'
+                        )
+                    lines.append(f'yatube_{name}_sum{{view="{view}"}} '
+                                 f'{histogram.sum:.6f}')
+                    lines.append(f'yatube_{name}_count{{view="{view}"}} '
+                                 f'{histogram.count}')
+            for name in self.COUNTERS:
+                lines.append(f'# TYPE yatube_{name} counter')
+                for view, stats in sorted(self.views.items()):
+                    lines.append(
+                        f'yatube_{name}{{view="{view}"}} {stats[name]}'
+                    )
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+# Middleware
+
+def server_timing(metrics, total):
+    parts = [
+        f'{SQL};dur={metrics.timings[SQL] * 1000:.1f};'
+        f'desc="{metrics.queries} queries"',
+        f'{TEMPLATE};dur={metrics.timings[TEMPLATE] * 1000:.1f}',
+        f'{CACHE};dur={metrics.timings[CACHE] * 1000:.1f};'
+        f'desc="{metrics.cache_hits} hits, {metrics.cache_misses} misses"',
+        f'{THUMBNAIL};dur={metrics.timings[THUMBNAIL] * 1000:.1f}',
+        f'{TOTAL};dur={total * 1000:.1f}',
+    ]
+    return ', '.join(parts)
+
+
+def _is_staff(request):
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_staff
+
+
+class RequestMetricsMiddleware:
+    """Меряет запрос и отдаёт замеры в Server-Timing, лог и /metrics/."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install()
+
+    def __call__(self, request):
+        metrics = _local.metrics = RequestMetrics()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(_record_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            _local.metrics = None
+        total = metrics.total
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        if settings.DEBUG or _is_staff(request):
+            response['Server-Timing'] = server_timing(metrics, total)
+        registry.observe(view, metrics, total)
+        logger.info(
+            '%s %s %s view=%s total=%.1fms sql=%d/%.1fms template=%.1fms '
+            'cache=%d/%d/%.1fms thumbnail=%.1fms',
+            request.method, request.get_full_path(), response.status_code,
+            view, total * 1000, metrics.queries,
+            metrics.timings[SQL] * 1000, metrics.timings[TEMPLATE] * 1000,
+            metrics.cache_hits, metrics.cache_misses,
+            metrics.timings[CACHE] * 1000, metrics.timings[THUMBNAIL] * 1000,
+        )
+        return response
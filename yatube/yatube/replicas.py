@@ -0,0 +1,121 @@
+"""Чтение с реплик базы и «чтение своих записей».
+
+``ReplicaRouter`` отправляет запись в основную базу (``default``), а
+чтение — на случайную реплику из ``DATABASE_REPLICAS``, но только:
+
+* внутри запроса GET или HEAD, который прошёл через
+  ``ReadYourWritesMiddleware``; команды, воркер очереди и сами записи
+  читают основную базу;
+* вне транзакции на основной базе;
+* если пользователь недавно ничего не записывал.
+
+После любой записи (``db_for_write``) запрос до конца читает основную
+базу, а middleware ставит cookie на ``DATABASE_STICKY_SECONDS``: пока
+она жива, запросы этого клиента тоже читают основную базу, и автор сразу
+видит свой пост, комментарий или подписку, даже если реплика отстаёт.
+Сессии и очередь задач всегда читаются с основной базы.
+
+Другие посетители в это время могут получить с реплики старые данные.
+Поэтому всё, что кладётся в общий кэш (страницы и счётчики лент,
+объекты из ``posts.objects``, граф подписок), читается внутри
+``primary()``: иначе строка, прочитанная с отстающей реплики уже после
+сброса кэша, осталась бы в кэше до конца его срока и досталась бы даже
+автору, закреплённому за основной базой.
+
+Служебные записи во время GET (первый подсчёт ``UserStats``, постановка
+миниатюры в очередь) делаются в ``primary(sticky=False)``: они не
+означают, что посетитель что-то изменил, и не должны закреплять его за
+основной базой.
+
+``DATABASE_STICKY_SECONDS`` должен быть больше отставания реплик. Иначе
+после окончания срока cookie автор снова увидит старые данные, а только
+что зарегистрированный пользователь — выход из аккаунта: сессия
+читается с основной базы, но пользователь по ней ищется на реплике, где
+его ещё нет.
+
+Локально репликами служат копии файла SQLite (``SQLITE_REPLICAS`` в
+настройках), их обновляет команда ``sync_replicas``. В тестах реплики —
+зеркала тестовой базы (``TEST['MIRROR']``).
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+COOKIE_NAME = 'read_primary'
+# Приложения, которые читаются только с основной базы: сессия,
+# записанная при входе, и задачи, взятые воркером, нужны сразу.
+PRIMARY_ONLY_APPS = {'sessions', 'jobs'}
+SAFE_METHODS = ('GET', 'HEAD')
+
+_local = threading.local()
+
+
+def replicas_allowed():
+    """Можно ли сейчас читать с реплики."""
+    return (getattr(_local, 'replicas', False)
+            and not getattr(_local, 'wrote', False))
+
+
+@contextmanager
+def primary(sticky=True):
+    """Блок читает только основную базу, даже в запросе GET.
+
+    С ``sticky=False`` записи блока не ставят cookie и не переключают
+    остаток запроса на основную базу.
+    """
+    previous = getattr(_local, 'replicas', False)
+    wrote = getattr(_local, 'wrote', False)
+    _local.replicas = False
+    try:
+        yield
+    finally:
+        _local.replicas = previous
+        if not sticky:
+            _local.wrote = wrote
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (not settings.DATABASE_REPLICAS or not replicas_allowed()
+                or model._meta.app_label in PRIMARY_ONLY_APPS
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        _local.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы, объекты из них совместимы.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схема попадает на реплики вместе с данными.
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReadYourWritesMiddleware:
+    """Разрешает чтение с реплик и закрепляет писавших за основной базой."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _local.replicas = (request.method in SAFE_METHODS
+                           and COOKIE_NAME not in request.COOKIES)
+        _local.wrote = False
+        try:
+            response = self.get_response(request)
+            wrote = _local.wrote
+        finally:
+            _local.replicas = _local.wrote = False
+        if wrote:
+            response.set_cookie(
+                COOKIE_NAME, '1', max_age=settings.DATABASE_STICKY_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
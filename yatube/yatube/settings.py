@@ -10,7 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -36,9 +40,11 @@ ALLOWED_HOSTS = [
 # Application definition
 
 INSTALLED_APPS = [
+    'yatube.apps.YatubeConfig',
     'about.apps.AboutConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
+    'jobs.apps.JobsConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -49,6 +55,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yatube.metrics.RequestMetricsMiddleware',
+    'yatube.replicas.ReadYourWritesMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -90,6 +98,42 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения (yatube.replicas). Локально это копии файла
+# базы db.replicaN.sqlite3, их обновляет команда sync_replicas
+SQLITE_REPLICAS = 0
+for number in range(1, SQLITE_REPLICAS + 1):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'db.replica{number}.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['yatube.replicas.ReplicaRouter']
+# Сколько секунд после записи клиент читает только основную базу; должно
+# быть больше отставания реплик, иначе новый пользователь после регистрации
+# не найдётся на реплике и окажется разлогинен
+DATABASE_STICKY_SECONDS = 5
+
+# Профиль SQLite для нагрузки (yatube.sqlite): PRAGMA при подключении,
+# BEGIN IMMEDIATE, повтор записи при «database is locked» и постоянные
+# соединения. Включается на сервере переменной окружения
+# SQLITE_PRODUCTION=1
+SQLITE_PRODUCTION = os.environ.get('SQLITE_PRODUCTION', '').lower() in (
+    '1', 'true', 'yes', 'on'
+)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 2 ** 20,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+SQLITE_LOCK_RETRIES = 3
+SQLITE_LOCK_RETRY_DELAY = 0.05
+if SQLITE_PRODUCTION:
+    for database in DATABASES.values():
+        database['CONN_MAX_AGE'] = 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -134,6 +178,74 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Загрузки больше этого размера пишутся во временный файл кусками
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2 ** 20
+
+# Пагинация лент постов
+POSTS_PER_PAGE = 10
+# Сколько первых страниц доступно по номеру (?page=N),
+# дальше лента листается только по курсору (?after=/?before=)
+POSTS_PAGE_NUMBER_LIMIT = 10
+# Сколько ссылок на страницы показывать по обе стороны от текущей
+POSTS_PAGINATOR_WINDOW = 2
+# Точный COUNT(*) ленты делается до этого числа записей, дальше — оценка
+POSTS_PAGINATOR_EXACT_COUNT_LIMIT = 1000
+
+# Сколько комментариев показывать на странице поста и подгружать за раз
+POSTS_COMMENTS_PER_PAGE = 20
+
+# Сколько последних записей хранит лента подписок каждого пользователя
+POSTS_TIMELINE_SIZE = 1000
+
+# Сколько хранить отрендеренную карточку поста (ключ версионирован)
+POSTS_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Сколько хранить страницу ленты; раньше её сбросит смена поколения
+POSTS_FEED_CACHE_TIMEOUT = 60 * 10
+
+# Кэш постов, групп и авторов, которых представления ищут по URL:
+# сколько хранить объект и промах в общем кэше, сколько записей и
+# секунд держать в памяти процесса
+POSTS_OBJECT_CACHE_TIMEOUT = 60 * 5
+POSTS_OBJECT_CACHE_MISS_TIMEOUT = 30
+POSTS_OBJECT_CACHE_LOCAL_SIZE = 512
+POSTS_OBJECT_CACHE_LOCAL_TIMEOUT = 5
+
+# Наибольший размер страницы JSON API (?limit=)
+POSTS_API_MAX_LIMIT = 100
+
+# Картинки постов при загрузке уменьшаются до POSTS_IMAGE_MAX_SIDE
+# по большей стороне и перекодируются с качеством POSTS_IMAGE_QUALITY;
+# рядом кладутся варианты в WebP шириной POSTS_IMAGE_VARIANTS
+POSTS_IMAGE_MAX_SIDE = 2048
+POSTS_IMAGE_QUALITY = 85
+POSTS_IMAGE_VARIANTS = (480, 960)
+
+# Миниатюры картинок постов строятся задачами в очереди jobs;
+# False — сразу, в запросе
+POSTS_THUMBNAILS_ASYNC = True
+
+# До скольких подписчиков пост раскладывается по лентам прямо в запросе;
+# для авторов с большей аудиторией это делает задача в очереди
+POSTS_FANOUT_SYNC_LIMIT = 1000
+
+# «Кого почитать» на странице подписок: сколько авторов показывать,
+# сколько хранить список пользователя и как часто перестраивать граф
+# подписок в памяти процесса
+POSTS_SUGGESTIONS_COUNT = 5
+POSTS_SUGGESTIONS_CACHE_TIMEOUT = 60 * 10
+POSTS_SUGGESTIONS_GRAPH_MAX_AGE = 60 * 10
+
+# Очередь фоновых задач (приложение jobs)
+JOBS_WORKERS = 4
+JOBS_POLL_INTERVAL = 1
+JOBS_MAX_ATTEMPTS = 5
+# Задержка перед повтором: JOBS_RETRY_DELAY * 2**(попытка - 1) секунд
+JOBS_RETRY_DELAY = 10
+JOBS_RETRY_MAX_DELAY = 60 * 60
+# Через сколько секунд задача зависшего воркера снова доступна другим
+JOBS_LOCK_TIMEOUT = 60 * 10
+
 # Login
 
 LOGIN_URL = '/auth/login/'
@@ -147,9 +259,51 @@ EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
 
-# подключение бэкенда кеширования
+# тесты (manage.py test и pytest) получают свои временные кэш и журнал,
+# чтобы не делить их с запущенным сайтом и другими прогонами
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
+# подключение бэкенда кеширования: файл SQLite, общий для всех воркеров
+CACHE_DIR = os.path.join(BASE_DIR, 'cache')
+if TESTING:
+    CACHE_DIR = tempfile.mkdtemp(prefix='yatube-cache-')
+    atexit.register(shutil.rmtree, CACHE_DIR, True)
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'yatube.cache.SQLiteCache',
+        'LOCATION': os.path.join(CACHE_DIR, 'default.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+            'MAX_SIZE': 64 * 2 ** 20,
+        },
     }
 }
+
+# Журнал замеров запросов (yatube.metrics). Его пишут все воркеры, поэтому
+# ротация внешняя (logrotate), а обработчик переоткрывает сменившийся файл
+LOG_DIR = os.path.join(BASE_DIR, 'logs')
+if TESTING:
+    LOG_DIR = tempfile.mkdtemp(prefix='yatube-logs-')
+    atexit.register(shutil.rmtree, LOG_DIR, True)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'request': {'format': '%(asctime)s %(process)d %(message)s'},
+    },
+    'handlers': {
+        'requests_file': {
+            'class': 'yatube.metrics.WatchedFileHandler',
+            'filename': os.path.join(LOG_DIR, 'requests.log'),
+            'formatter': 'request',
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'yatube.requests': {
+            'handlers': ['requests_file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,73 @@
+"""Профиль SQLite для нагрузки с параллельной записью.
+
+Включается переменной окружения ``SQLITE_PRODUCTION=1`` (настройка
+``SQLITE_PRODUCTION``). Тогда при каждом новом соединении (сигнал
+``connection_created``):
+
+* выполняются ``PRAGMA`` из ``SQLITE_PRAGMAS``: журнал WAL (читатели не
+  ждут писателя), ``synchronous=NORMAL`` (в режиме WAL теряются только
+  последние транзакции при сбое питания, но не целостность),
+  ``mmap_size``, ``busy_timeout`` — сколько ждать чужую запись, прежде
+  чем вернуть «database is locked»;
+* к соединению добавляется обёртка запросов. Транзакции начинаются с
+  ``BEGIN IMMEDIATE``: блокировка на запись берётся сразу и ждёт
+  ``busy_timeout``, а не падает посреди транзакции, когда та пытается
+  из читающей стать пишущей. Если блокировку так и не удалось получить,
+  ``BEGIN`` и записи вне транзакций повторяются до
+  ``SQLITE_LOCK_RETRIES`` раз с растущей паузой. Запрос внутри
+  начатой транзакции не повторяется: её целиком откатит вызывающий код.
+
+Соединения живут ``CONN_MAX_AGE`` секунд (задаётся в настройках вместе
+с профилем), и ``PRAGMA`` выполняются один раз на соединение, а не на
+каждый запрос.
+
+Сравнить пропускную способность с профилем и без него можно бенчмарком
+``benchmarks/write_contention.py``.
+"""
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError
+
+logger = logging.getLogger(__name__)
+
+READ_STATEMENTS = ('SELECT', 'PRAGMA', 'EXPLAIN')
+
+
+def is_locked(error):
+    message = str(error)
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def retry_locked(execute, sql, params, many, context):
+    """Обёртка ``execute_wrapper``: ``BEGIN IMMEDIATE`` и повтор записи."""
+    connection = context['connection']
+    if sql == 'BEGIN':
+        sql = 'BEGIN IMMEDIATE'
+    elif (connection.in_atomic_block
+          or sql.lstrip()[:7].upper().startswith(READ_STATEMENTS)):
+        return execute(sql, params, many, context)
+    delay = settings.SQLITE_LOCK_RETRY_DELAY
+    for attempt in range(settings.SQLITE_LOCK_RETRIES):
+        try:
+            return execute(sql, params, many, context)
+        except OperationalError as error:
+            if not is_locked(error):
+                raise
+            logger.warning('База занята, повтор %s: %s', attempt + 1, sql)
+            time.sleep(delay * random.uniform(1, 2))
+            delay *= 2
+    return execute(sql, params, many, context)
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Обработчик ``connection_created``: PRAGMA и обёртка запросов."""
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRODUCTION:
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+    if retry_locked not in connection.execute_wrappers:
+        connection.execute_wrappers.append(retry_locked)
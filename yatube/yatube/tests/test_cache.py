@@ -0,0 +1,155 @@
+import shutil
+import tempfile
+import time
+from multiprocessing import Pool
+from os import path
+
+from django.test import SimpleTestCase
+
+from ..cache import SQLiteCache
+
+
+def make_cache(location, **options):
+    return SQLiteCache(location, {'OPTIONS': options})
+
+
+def increment(location):
+    cache = make_cache(location)
+    for _ in range(50):
+        cache.incr('counter')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = path.join(self.directory, 'cache.sqlite3')
+        self.cache = make_cache(self.location)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_basic_operations(self):
+        """get/set/add/delete и пакетные операции работают как в Django."""
+
+        self.cache.set('a', {'value': 1})
+        self.cache.set_many({'b': 2, 'c': [3]})
+
+        self.assertEqual(self.cache.get('a'), {'value': 1})
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c', 'd']),
+                         {'a': {'value': 1}, 'b': 2, 'c': [3]})
+        self.assertFalse(self.cache.add('b', 20))
+        self.assertTrue(self.cache.add('d', True))
+        self.assertIs(self.cache.get('d'), True)
+        self.cache.delete_many(['a', 'b'])
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.get('missing', 'default'), 'default')
+        self.cache.clear()
+        self.assertFalse(self.cache.has_key('c'))
+
+    def test_timeouts(self):
+        """Просроченная запись не читается, а add может её заменить."""
+
+        self.cache.set('short', 'value', timeout=0.1)
+        self.cache.set('forever', 'value', timeout=None)
+        time.sleep(0.2)
+
+        self.assertIsNone(self.cache.get('short'))
+        self.assertEqual(self.cache.get('forever'), 'value')
+        self.assertTrue(self.cache.add('short', 'new'))
+        self.assertEqual(self.cache.get('short'), 'new')
+        self.assertTrue(self.cache.touch('short', timeout=0.1))
+        self.assertFalse(self.cache.touch('missing'))
+
+    def test_incr(self):
+        """incr и decr меняют целое значение, для пропавшего ключа — ошибка."""
+
+        self.cache.set('counter', 1)
+
+        self.assertEqual(self.cache.incr('counter', 5), 6)
+        self.assertEqual(self.cache.decr('counter'), 5)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_incr_is_shared_between_processes(self):
+        """Увеличения из нескольких процессов не теряются."""
+
+        self.cache.set('counter', 0)
+
+        with Pool(4) as pool:
+            pool.map(increment, [self.location] * 4)
+
+        self.assertEqual(self.cache.get('counter'), 200)
+
+    def test_evicts_least_recently_read(self):
+        """При переполнении вытесняются давно не читанные записи."""
+
+        cache = make_cache(self.location, MAX_ENTRIES=4, CULL_FREQUENCY=2)
+        for i in range(4):
+            cache.set(f'key{i}', i)
+            # Времена доступа должны различаться.
+            time.sleep(0.01)
+        cache._connection().execute(
+            'UPDATE cache SET accessed = accessed - 10 '
+            "WHERE key NOT LIKE '%key0'"
+        )
+        cache.get('key0')
+
+        cache.set('key4', 4)
+
+        self.assertEqual(
+            sorted(cache.get_many([f'key{i}' for i in range(5)])),
+            ['key0', 'key3', 'key4']
+        )
+
+    def test_evicts_by_size(self):
+        """Суммарный размер записей не превышает MAX_SIZE."""
+
+        cache = make_cache(self.location, MAX_SIZE=10000)
+        for i in range(10):
+            cache.set(f'key{i}', 'x' * 2000)
+
+        size = cache._connection().execute(
+            'SELECT total(size) FROM cache'
+        ).fetchone()[0]
+        self.assertLessEqual(size, 10000)
+        self.assertIsNotNone(cache.get('key9'))
+
+    def test_stats_follow_every_write(self):
+        """Счётчики в cache_stats совпадают с содержимым таблицы."""
+
+        def assert_stats():
+            connection = self.cache._connection()
+            self.assertEqual(
+                connection.execute(
+                    'SELECT entries, size FROM cache_stats'
+                ).fetchone(),
+                connection.execute(
+                    'SELECT count(*), coalesce(sum(size), 0) FROM cache'
+                ).fetchone()
+            )
+
+        self.cache.set_many({'a': 'x' * 100, 'b': 1})
+        self.cache.set('a', 'y' * 10)
+        self.cache.add('c', [1, 2])
+        self.cache.incr('b', 10)
+        assert_stats()
+        self.cache.delete('a')
+        assert_stats()
+        self.cache.clear()
+        assert_stats()
+
+    def test_stats_are_counted_for_existing_file(self):
+        """Файл без cache_stats получает счётчики при открытии."""
+
+        self.cache.set_many({'a': 'x' * 100, 'b': 1})
+        connection = self.cache._connection()
+        connection.execute('DROP TABLE cache_stats')
+
+        reopened = make_cache(self.location)
+
+        self.assertEqual(
+            reopened._connection().execute(
+                'SELECT entries FROM cache_stats'
+            ).fetchone(),
+            (2,)
+        )
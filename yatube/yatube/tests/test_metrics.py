@@ -0,0 +1,117 @@
+import os
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from .. import metrics
+
+User = get_user_model()
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='author')
+        Post.objects.create(text='Текст', author=self.user)
+        self.client = Client()
+
+    @override_settings(DEBUG=True)
+    def test_server_timing_header(self):
+        """Ответ содержит Server-Timing с SQL, шаблонами и кэшем."""
+
+        response = self.client.get(reverse('index'))
+
+        header = response['Server-Timing']
+        for name in ('sql', 'template', 'cache', 'thumbnail', 'total'):
+            with self.subTest(name=name):
+                self.assertIn(f'{name};dur=', header)
+        self.assertRegex(header, r'sql;dur=[\d.]+;desc="[1-9]\d* queries"')
+
+    @override_settings(DEBUG=True)
+    def test_cache_hits_and_misses_are_counted(self):
+        """Повторный запрос ленты попадает в кэш страниц."""
+
+        self.client.get(reverse('index'))
+        response = self.client.get(reverse('index'))
+
+        self.assertRegex(response['Server-Timing'],
+                         r'desc="[1-9]\d* hits, \d+ misses"')
+        self.assertIn('desc="0 queries"', response['Server-Timing'])
+
+    def test_server_timing_is_for_staff_only(self):
+        """Без DEBUG Server-Timing получают только сотрудники."""
+
+        self.assertFalse(self.client.get(reverse('index'))
+                         .has_header('Server-Timing'))
+
+        staff = User.objects.create(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        self.assertTrue(self.client.get(reverse('index'))
+                        .has_header('Server-Timing'))
+
+    def test_metrics_are_aggregated_by_url_name(self):
+        """Гистограммы на /metrics/ собираются по имени URL."""
+
+        self.client.get(reverse('profile', args=[self.user.username]))
+        staff = User.objects.create(username='staff', is_staff=True)
+        self.client.force_login(staff)
+
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(
+            response, 'yatube_request_duration_seconds_count{view="profile"}'
+        )
+        self.assertContains(response, 'yatube_sql_queries_bucket{view=')
+
+    def test_metrics_are_staff_only(self):
+        """Страница /metrics/ недоступна обычным пользователям."""
+
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('metrics'))
+
+        self.assertNotEqual(response.status_code, 200)
+        self.assertNotIn(b'yatube_', response.content)
+
+    def test_nested_timers_are_not_summed_twice(self):
+        """Вложенные замеры одного таймера считаются один раз."""
+
+        request_metrics = metrics._local.metrics = metrics.RequestMetrics()
+        try:
+            with metrics.timer(metrics.TEMPLATE):
+                with metrics.timer(metrics.TEMPLATE):
+                    time.sleep(0.02)
+                time.sleep(0.01)
+        finally:
+            metrics._local.metrics = None
+
+        self.assertGreaterEqual(request_metrics.timings[metrics.TEMPLATE],
+                                0.03)
+        # Двойной учёт дал бы не меньше 0.05 с.
+        self.assertLess(request_metrics.timings[metrics.TEMPLATE], 0.045)
+
+
+class WatchedFileHandlerTests(TestCase):
+    def test_directory_is_created_on_first_record(self):
+        """Папка журнала появляется при первой записи, а не раньше."""
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        filename = os.path.join(directory.name, 'logs', 'requests.log')
+
+        handler = metrics.WatchedFileHandler(filename, delay=True)
+        self.addCleanup(handler.close)
+        self.assertFalse(os.path.exists(os.path.dirname(filename)))
+
+        handler.handle(metrics.logger.makeRecord(
+            'yatube.requests', 20, __file__, 0, 'GET /', (), None
+        ))
+
+        self.assertTrue(os.path.exists(filename))
@@ -0,0 +1,147 @@
+import os
+import sqlite3
+import tempfile
+
+from django.contrib.sessions.models import Session
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from posts.models import Post
+
+from .. import replicas
+from ..apps import check_replicas
+from ..management.commands.sync_replicas import copy_database
+
+REPLICAS = ['replica1', 'replica2']
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS, DATABASE_STICKY_SECONDS=5)
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = replicas.ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def handle(self, request, write=False, model=Post):
+        """Пропускает запрос через middleware и запоминает, куда шло
+        чтение до и после записи.
+        """
+        reads = []
+
+        def view(request):
+            reads.append(self.router.db_for_read(model))
+            if write:
+                self.router.db_for_write(model)
+                reads.append(self.router.db_for_read(model))
+            return HttpResponse()
+
+        response = replicas.ReadYourWritesMiddleware(view)(request)
+        return reads, response
+
+    def test_get_reads_from_replica(self):
+        """GET читает с одной из реплик и не ставит cookie."""
+
+        reads, response = self.handle(self.factory.get('/'))
+
+        self.assertIn(reads[0], REPLICAS)
+        self.assertNotIn(replicas.COOKIE_NAME, response.cookies)
+
+    def test_write_sticks_to_primary(self):
+        """После записи запрос и следующие запросы читают основную базу."""
+
+        reads, response = self.handle(self.factory.post('/'), write=True)
+
+        self.assertEqual(reads, ['default', 'default'])
+        cookie = response.cookies[replicas.COOKIE_NAME]
+        self.assertEqual(cookie['max-age'], 5)
+
+        request = self.factory.get('/')
+        request.COOKIES[replicas.COOKIE_NAME] = cookie.value
+        reads, _ = self.handle(request)
+        self.assertEqual(reads, ['default'])
+
+    def test_write_during_get(self):
+        """Запись посреди GET переключает остаток запроса на основную базу."""
+
+        reads, response = self.handle(self.factory.get('/'), write=True)
+
+        self.assertIn(reads[0], REPLICAS)
+        self.assertEqual(reads[1], 'default')
+        self.assertIn(replicas.COOKIE_NAME, response.cookies)
+
+    def test_primary_outside_requests_and_for_sessions(self):
+        """Вне запроса и для сессий чтение идёт с основной базы."""
+
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        reads, _ = self.handle(self.factory.get('/'), model=Session)
+        self.assertEqual(reads, ['default'])
+
+    def test_primary_block(self):
+        """Внутри primary() GET читает основную базу, после — снова
+        реплики.
+        """
+        reads = []
+
+        def view(request):
+            with replicas.primary():
+                reads.append(self.router.db_for_read(Post))
+            reads.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        replicas.ReadYourWritesMiddleware(view)(self.factory.get('/'))
+
+        self.assertEqual(reads[0], 'default')
+        self.assertIn(reads[1], REPLICAS)
+
+    def test_service_write_does_not_stick(self):
+        """Запись в primary(sticky=False) не закрепляет клиента."""
+        reads = []
+
+        def view(request):
+            with replicas.primary(sticky=False):
+                self.router.db_for_write(Post)
+                reads.append(self.router.db_for_read(Post))
+            reads.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        response = replicas.ReadYourWritesMiddleware(view)(
+            self.factory.get('/')
+        )
+
+        self.assertEqual(reads[0], 'default')
+        self.assertIn(reads[1], REPLICAS)
+        self.assertNotIn(replicas.COOKIE_NAME, response.cookies)
+
+    def test_allow_migrate(self):
+        """Миграции применяются только к основной базе."""
+
+        self.assertTrue(self.router.allow_migrate('default', 'posts'))
+        self.assertFalse(self.router.allow_migrate('replica1', 'posts'))
+
+    def test_check_unknown_replica(self):
+        """Проверка находит реплику без описания в DATABASES."""
+
+        errors = check_replicas(None)
+
+        self.assertEqual([error.id for error in errors],
+                         ['yatube.E001', 'yatube.E001'])
+
+
+class SyncReplicasTests(SimpleTestCase):
+    def test_copy_database(self):
+        """Реплика SQLite получает копию основной базы."""
+
+        with tempfile.TemporaryDirectory() as directory:
+            primary = os.path.join(directory, 'primary.sqlite3')
+            replica = os.path.join(directory, 'replica.sqlite3')
+            connection = sqlite3.connect(primary)
+            connection.execute('CREATE TABLE post (text TEXT)')
+            connection.execute("INSERT INTO post VALUES ('Текст')")
+            connection.commit()
+            connection.close()
+
+            copy_database(primary, replica)
+
+            connection = sqlite3.connect(replica)
+            rows = connection.execute('SELECT text FROM post').fetchall()
+            connection.close()
+            self.assertEqual(rows, [('Текст',)])
@@ -0,0 +1,101 @@
+import os
+import tempfile
+from types import SimpleNamespace
+
+from django.db import OperationalError
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase, override_settings
+
+from .. import sqlite
+
+
+def open_connection(directory):
+    handler = ConnectionHandler({'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(directory, 'db.sqlite3'),
+    }})
+    connection = handler['default']
+    connection.ensure_connection()
+    return connection
+
+
+def pragma(connection, name):
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
+
+
+class SQLiteProfileTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    @override_settings(SQLITE_PRODUCTION=True)
+    def test_profile_applies_pragmas(self):
+        """С профилем соединение получает PRAGMA и обёртку запросов."""
+
+        connection = open_connection(self.directory)
+        self.addCleanup(connection.close)
+
+        self.assertEqual(pragma(connection, 'journal_mode'), 'wal')
+        self.assertEqual(pragma(connection, 'synchronous'), 1)
+        self.assertEqual(pragma(connection, 'busy_timeout'), 5000)
+        self.assertIn(sqlite.retry_locked, connection.execute_wrappers)
+
+    @override_settings(SQLITE_PRODUCTION=False)
+    def test_profile_is_opt_in(self):
+        """Без профиля соединение не меняется."""
+
+        connection = open_connection(self.directory)
+        self.addCleanup(connection.close)
+
+        self.assertEqual(pragma(connection, 'journal_mode'), 'delete')
+        self.assertEqual(connection.execute_wrappers, [])
+
+
+@override_settings(SQLITE_LOCK_RETRIES=3, SQLITE_LOCK_RETRY_DELAY=0)
+class RetryLockedTests(SimpleTestCase):
+    def call(self, sql, failures, in_atomic_block=False):
+        executed = []
+
+        def execute(sql, params, many, context):
+            executed.append(sql)
+            if len(executed) <= failures:
+                raise OperationalError('database is locked')
+            return 'ok'
+
+        context = {'connection': SimpleNamespace(
+            in_atomic_block=in_atomic_block
+        )}
+        return sqlite.retry_locked(execute, sql, (), False, context), executed
+
+    def test_write_is_retried(self):
+        """Запись вне транзакции повторяется, пока база занята."""
+
+        result, executed = self.call('INSERT INTO post VALUES (1)', 2)
+
+        self.assertEqual(result, 'ok')
+        self.assertEqual(len(executed), 3)
+
+    def test_gives_up_after_retries(self):
+        """После SQLITE_LOCK_RETRIES повторов ошибка пробрасывается."""
+
+        with self.assertRaises(OperationalError):
+            self.call('UPDATE post SET text = 1', 10)
+
+    def test_transactions_begin_immediate(self):
+        """Транзакция начинается с BEGIN IMMEDIATE и тоже повторяется."""
+
+        _, executed = self.call('BEGIN', 1)
+
+        self.assertEqual(executed, ['BEGIN IMMEDIATE', 'BEGIN IMMEDIATE'])
+
+    def test_no_retry_inside_transaction_or_for_reads(self):
+        """Внутри транзакции и для SELECT повторов нет."""
+
+        for sql, in_atomic_block in (('UPDATE post SET text = 1', True),
+                                     ('SELECT 1', False)):
+            with self.subTest(sql=sql), \
+                    self.assertRaises(OperationalError):
+                self.call(sql, 1, in_atomic_block)
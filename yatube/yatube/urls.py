@@ -20,6 +20,8 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from . import views
+
 handler404 = 'yatube.views.page_not_found'  # noqa
 handler500 = 'yatube.views.server_error'  # noqa
 
@@ -27,6 +29,7 @@ urlpatterns = [
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('admin/', admin.site.urls),
+    path('metrics/', views.metrics, name='metrics'),
     path('', include('posts.urls')),
     path('about/', include('about.urls', namespace='about')),
 ]
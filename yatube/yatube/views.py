@@ -1,8 +1,12 @@
 from http import HTTPStatus
 
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse
 from django.shortcuts import render
 from django.views.decorators.http import require_http_methods
 
+from . import metrics as request_metrics
+
 
 @require_http_methods(['GET'])
 def page_not_found(request, exception):
@@ -17,3 +21,12 @@ def server_error(request):
     return render(
         request, 'misc/500.html', status=HTTPStatus.INTERNAL_SERVER_ERROR
     )
+
+
+@require_http_methods(['GET'])
+@staff_member_required
+def metrics(request):
+    return HttpResponse(
+        request_metrics.registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )